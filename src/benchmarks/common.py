@@ -0,0 +1,43 @@
+"""Общие утилиты бенчмарков.
+
+Бенчмарки запускаются из директории `src`, например: `python -m benchmarks.handler_latency`.
+"""
+import os
+import statistics
+import tempfile
+
+
+def use_temporary_database() -> str:
+    """Перенаправляет бота на временную базу данных.
+
+    Должна вызываться до импорта `database`/`dao`, так как соединение создается при импорте.
+
+    :return: Путь к временному файлу базы данных.
+    """
+    db_dir = tempfile.mkdtemp(prefix="todo_bench_")
+    db_name = os.path.join(db_dir, "todo_db.db")
+    os.environ["DB_NAME"] = db_name
+    return db_name
+
+
+def percentile(values: list, pct: float) -> float:
+    """Возвращает перцентиль выборки (ближайший ранг)."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+def format_latencies(name: str, latencies: list) -> str:
+    """Форматирует строку отчета с задержками в миллисекундах."""
+    if not latencies:
+        return f"{name:<28} n=0"
+    ms = [value * 1000 for value in latencies]
+    return (
+        f"{name:<28} n={len(ms):<6} "
+        f"mean={statistics.fmean(ms):8.2f}ms "
+        f"p50={percentile(ms, 50):8.2f}ms "
+        f"p99={percentile(ms, 99):8.2f}ms "
+        f"max={max(ms):8.2f}ms"
+    )
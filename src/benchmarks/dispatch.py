@@ -0,0 +1,85 @@
+"""Микробенчмарк маршрутизации обновлений.
+
+Сравнивает время обработки обновления цепочкой роутеров с lambda-фильтрами
+и через индекс состояний (`dispatching.StateDispatchMiddleware`). Выбраны
+хэндлеры без запросов к БД, поэтому разница - это стоимость маршрутизации.
+
+Запуск из директории `src`:
+    python -m benchmarks.dispatch --iterations 20000
+"""
+import argparse
+import asyncio
+import time
+
+from benchmarks.common import use_temporary_database
+
+use_temporary_database()
+
+from aiogram import Dispatcher  # noqa: E402
+
+from benchmarks.fake_bot import make_bot, make_callback_update, make_message_update  # noqa: E402
+from dispatching import StateDispatchMiddleware  # noqa: E402
+from handlers import routers  # noqa: E402
+from states import task_states  # noqa: E402
+from utils import fsm  # noqa: E402
+
+TELEGRAM_ID = 1
+
+# (название, состояние перед обновлением, фабрика обновления)
+SCENARIOS = (
+    (
+        "message, last router",
+        task_states.WAIT_FOR_TASK_DESCRIPTION,
+        lambda: make_message_update(TELEGRAM_ID, "description"),
+    ),
+    (
+        "callback, last router",
+        task_states.SUBMIT_TITLE,
+        lambda: make_callback_update(TELEGRAM_ID, "cancel"),
+    ),
+    (
+        "unhandled message",
+        task_states.LOOK_AT_TASKS,
+        lambda: make_message_update(TELEGRAM_ID, "text"),
+    ),
+)
+
+
+async def measure(disp: Dispatcher, bot, state: str, make_update, iterations: int) -> float:
+    """Возвращает среднее время обработки обновления в микросекундах."""
+    updates = [make_update() for _ in range(iterations)]
+    started = time.perf_counter()
+    for update in updates:
+        fsm.set_state(TELEGRAM_ID, state)
+        await disp.feed_update(bot, update)
+    return (time.perf_counter() - started) / iterations * 1_000_000
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--iterations", type=int, default=20000)
+    args = parser.parse_args()
+
+    bot = make_bot()
+    disp = Dispatcher()
+    for router in routers:
+        disp.include_router(router)
+
+    results = {}
+    for name, state, make_update in SCENARIOS:
+        results[name] = [await measure(disp, bot, state, make_update, args.iterations)]
+
+    state_dispatch = StateDispatchMiddleware()
+    disp.message.outer_middleware(state_dispatch)
+    disp.callback_query.outer_middleware(state_dispatch)
+    for name, state, make_update in SCENARIOS:
+        results[name].append(await measure(disp, bot, state, make_update, args.iterations))
+
+    print(f"{'scenario':<24} {'routers':>12} {'state index':>12}")
+    for name, (routers_time, index_time) in results.items():
+        print(f"{name:<24} {routers_time:10.1f}us {index_time:10.1f}us")
+    print(f"index hits={state_dispatch.hits} misses={state_dispatch.misses}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
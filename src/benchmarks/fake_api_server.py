@@ -0,0 +1,247 @@
+"""Локальный поддельный сервер Telegram Bot API.
+
+Реализует методы, которыми пользуется бот: getMe, getUpdates, sendMessage,
+editMessageText, answerCallbackQuery (а также deleteWebhook/setWebhook). Обновления
+от пользователей кладутся в очередь через `push_update`. Ответы бота сохраняются
+в журнал чата, и симулируемые пользователи могут дождаться нужного ответа.
+
+Бот подключается к серверу через переменную окружения TELEGRAM_API_URL.
+
+Запуск отдельно из директории `src`:
+    python -m benchmarks.fake_api_server --port 8081
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import time
+from collections import Counter, defaultdict
+from typing import Callable, Optional
+
+from aiohttp import web
+
+BOT_USER = {"id": 123456, "is_bot": True, "first_name": "Bot", "username": "fake_bot"}
+
+
+class FakeTelegramServer:
+    """Состояние поддельного Bot API: очередь обновлений, журналы чатов и счетчики вызовов."""
+
+    def __init__(self):
+        self.calls = Counter()  # Название метода -> количество вызовов
+        self.updates = []  # Обновления, еще не подтвержденные ботом через offset
+        self.chat_logs = defaultdict(list)  # chat id -> [(метод, параметры), ...]
+        self.last_inline_markup = {}  # chat id -> последняя inline-клавиатура
+        self.last_inline_message_id = {}  # chat id -> id сообщения с последней inline-клавиатурой
+        self._callback_chats = {}  # id callback-запроса -> chat id
+        self._update_ids = itertools.count(1)
+        self._message_ids = itertools.count(1)
+        self._new_updates = asyncio.Event()
+        self._chat_changed = defaultdict(asyncio.Event)
+
+    # ------------------- region Со стороны пользователей -------------------
+    def push_update(self, update: dict) -> int:
+        """Добавляет обновление в очередь getUpdates и возвращает его update_id."""
+        update_id = next(self._update_ids)
+        self.updates.append({"update_id": update_id, **update})
+        self._new_updates.set()
+        return update_id
+
+    def push_message(self, telegram_id: int, text: str) -> int:
+        """Добавляет сообщение пользователя."""
+        user = {"id": telegram_id, "is_bot": False, "first_name": "User", "username": f"user{telegram_id}"}
+        return self.push_update(
+            {
+                "message": {
+                    "message_id": next(self._message_ids),
+                    "date": int(time.time()),
+                    "chat": {"id": telegram_id, "type": "private"},
+                    "from": user,
+                    "text": text,
+                }
+            }
+        )
+
+    def push_callback(self, telegram_id: int, data: str, message_id: int = None) -> str:
+        """Добавляет нажатие на inline-кнопку и возвращает id callback-запроса.
+
+        По умолчанию кнопка нажимается в последнем сообщении чата с inline-клавиатурой.
+        """
+        message_id = message_id or self.last_inline_message_id.get(telegram_id, 1)
+        callback_id = str(next(self._message_ids))
+        self._callback_chats[callback_id] = telegram_id
+        user = {"id": telegram_id, "is_bot": False, "first_name": "User", "username": f"user{telegram_id}"}
+        self.push_update(
+            {
+                "callback_query": {
+                    "id": callback_id,
+                    "from": user,
+                    "chat_instance": str(telegram_id),
+                    "data": data,
+                    "message": {
+                        "message_id": message_id,
+                        "date": int(time.time()),
+                        "chat": {"id": telegram_id, "type": "private"},
+                        "from": BOT_USER,
+                        "text": "",
+                    },
+                }
+            }
+        )
+        return callback_id
+
+    async def wait_for(
+        self,
+        chat_id: int,
+        predicate: Callable[[str, dict], bool],
+        since: int = 0,
+        timeout: float = 30,
+    ) -> int:
+        """Ждет вызов Bot API в чате, удовлетворяющий условию.
+
+        :param chat_id: ID чата (telegram id пользователя);
+        :param predicate: Условие на (метод, параметры);
+        :param since: С какой позиции журнала чата искать;
+        :param timeout: Сколько секунд ждать;
+        :return: Позиция журнала после найденного вызова.
+        """
+        log = self.chat_logs[chat_id]
+        deadline = time.monotonic() + timeout
+        position = since
+        while True:
+            while position < len(log):
+                method, params = log[position]
+                position += 1
+                if predicate(method, params):
+                    return position
+
+            event = self._chat_changed[chat_id]
+            event.clear()
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise TimeoutError(f"Бот не ответил в чате {chat_id}")
+            try:
+                await asyncio.wait_for(event.wait(), remaining)
+            except asyncio.TimeoutError:
+                raise TimeoutError(f"Бот не ответил в чате {chat_id}")
+
+    # ------------------- endregion Со стороны пользователей -------------------
+
+    # ------------------- region Со стороны бота -------------------
+    def _log(self, chat_id: Optional[int], method: str, params: dict) -> None:
+        if chat_id is None:
+            return
+        self.chat_logs[chat_id].append((method, params))
+        self._chat_changed[chat_id].set()
+
+    def _message(self, params: dict, message_id: int = None) -> dict:
+        message = {
+            "message_id": message_id or next(self._message_ids),
+            "date": int(time.time()),
+            "chat": {"id": int(params["chat_id"]), "type": "private"},
+            "from": BOT_USER,
+            "text": params.get("text", ""),
+        }
+        markup = params.get("reply_markup")
+        if markup and "inline_keyboard" in markup:
+            message["reply_markup"] = markup
+            self.last_inline_markup[message["chat"]["id"]] = markup
+            self.last_inline_message_id[message["chat"]["id"]] = message["message_id"]
+        return message
+
+    async def get_updates(self, params: dict):
+        offset = int(params.get("offset") or 0)
+        limit = int(params.get("limit") or 100)
+        timeout = float(params.get("timeout") or 0)
+
+        if offset:
+            self.updates = [update for update in self.updates if update["update_id"] >= offset]
+        if not self.updates and timeout:
+            self._new_updates.clear()
+            try:
+                await asyncio.wait_for(self._new_updates.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+        return self.updates[:limit]
+
+    async def send_message(self, params: dict):
+        message = self._message(params)
+        self._log(message["chat"]["id"], "sendMessage", params)
+        return message
+
+    async def edit_message_text(self, params: dict):
+        message = self._message(params, message_id=int(params.get("message_id") or 0) or None)
+        if "reply_markup" not in message:
+            # Правка без клавиатуры убирает кнопки с карточки
+            self.last_inline_markup.pop(message["chat"]["id"], None)
+        self._log(message["chat"]["id"], "editMessageText", params)
+        return message
+
+    async def answer_callback_query(self, params: dict):
+        chat_id = self._callback_chats.pop(str(params.get("callback_query_id")), None)
+        self._log(chat_id, "answerCallbackQuery", params)
+        return True
+
+    async def get_me(self, params: dict):
+        return BOT_USER
+
+    async def handle(self, request: web.Request) -> web.Response:
+        method = request.match_info["method"]
+        params = {}
+        if request.can_read_body:
+            if request.content_type == "application/json":
+                params = await request.json()
+            else:
+                for key, value in (await request.post()).items():
+                    try:
+                        params[key] = json.loads(value)
+                    except (TypeError, ValueError):
+                        params[key] = value
+
+        self.calls[method] += 1
+        handler = {
+            "getupdates": self.get_updates,
+            "sendmessage": self.send_message,
+            "editmessagetext": self.edit_message_text,
+            "answercallbackquery": self.answer_callback_query,
+            "getme": self.get_me,
+        }.get(method.lower())
+        result = await handler(params) if handler else True
+        return web.json_response({"ok": True, "result": result})
+
+    # ------------------- endregion Со стороны бота -------------------
+
+    def create_app(self) -> web.Application:
+        """Создает aiohttp-приложение с маршрутом /bot{token}/{method}."""
+        app = web.Application()
+        app.router.add_post("/bot{token}/{method}", self.handle)
+        app.router.add_get("/bot{token}/{method}", self.handle)
+        return app
+
+
+async def start_server(server: FakeTelegramServer, host: str = "127.0.0.1", port: int = 0):
+    """Запускает поддельный сервер и возвращает (runner, базовый URL)."""
+    runner = web.AppRunner(server.create_app(), access_log=None)
+    await runner.setup()
+    site = web.TCPSite(runner, host=host, port=port)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]
+    return runner, f"http://{host}:{port}"
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8081)
+    args = parser.parse_args()
+
+    server = FakeTelegramServer()
+    runner, url = await start_server(server, args.host, args.port)
+    print(f"Поддельный Bot API: TELEGRAM_API_URL={url}")
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await runner.cleanup()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
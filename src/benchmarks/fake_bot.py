@@ -0,0 +1,80 @@
+"""Бот с поддельной сессией для бенчмарков: запросы к Bot API не уходят в сеть."""
+import datetime
+import itertools
+from collections import Counter
+
+from aiogram import Bot
+from aiogram.client.session.base import BaseSession
+from aiogram.methods import EditMessageText, GetMe, SendMessage
+from aiogram.types import CallbackQuery, Chat, Message, Update, User
+
+_ids = itertools.count(1)
+
+
+class FakeSession(BaseSession):
+    """Сессия, которая отвечает на методы Bot API без обращения к Telegram."""
+
+    def __init__(self):
+        super().__init__()
+        self.calls = Counter()  # Название метода Bot API -> количество вызовов
+
+    async def make_request(self, bot, method, timeout=None):
+        self.calls[type(method).__name__] += 1
+        if isinstance(method, GetMe):
+            return User(id=bot.id, is_bot=True, first_name="Bot", username="fake_bot")
+        if isinstance(method, (SendMessage, EditMessageText)):
+            return Message(
+                message_id=getattr(method, "message_id", None) or next(_ids),
+                date=datetime.datetime.now(),
+                chat=Chat(id=method.chat_id or 0, type="private"),
+                text=method.text,
+            )
+        return True
+
+    async def stream_content(self, *args, **kwargs):
+        yield b""
+
+    async def close(self):
+        pass
+
+
+def make_bot() -> Bot:
+    """Создает бота с поддельной сессией."""
+    return Bot(token="123456:FAKE", session=FakeSession())
+
+
+def _user(telegram_id: int) -> User:
+    return User(id=telegram_id, is_bot=False, first_name="User", username=f"user{telegram_id}")
+
+
+def make_message_update(telegram_id: int, text: str) -> Update:
+    """Создает обновление с текстовым сообщением пользователя."""
+    return Update(
+        update_id=next(_ids),
+        message=Message(
+            message_id=next(_ids),
+            date=datetime.datetime.now(),
+            chat=Chat(id=telegram_id, type="private"),
+            from_user=_user(telegram_id),
+            text=text,
+        ),
+    )
+
+
+def make_callback_update(telegram_id: int, data: str, message_id: int = 1) -> Update:
+    """Создает обновление с нажатием на inline-кнопку."""
+    return Update(
+        update_id=next(_ids),
+        callback_query=CallbackQuery(
+            id=str(next(_ids)),
+            from_user=_user(telegram_id),
+            chat_instance="benchmark",
+            data=data,
+            message=Message(
+                message_id=message_id,
+                date=datetime.datetime.now(),
+                chat=Chat(id=telegram_id, type="private"),
+                text="",
+            ),
+        ),
+    )
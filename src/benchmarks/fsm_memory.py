@@ -0,0 +1,67 @@
+"""Бенчмарк памяти, занимаемой сессиями машины состояний.
+
+Создает N "простаивающих" сессий - пользователей, которые создали задачу и вернулись
+в меню (состояние IN_MENU, временные данные сценария удалены) - и замеряет память
+процесса через tracemalloc для каждого хранилища. Байты на сессию считаются по сессиям,
+которые хранилище держит в памяти.
+
+Запуск из директории `src`:
+    python -m benchmarks.fsm_memory --sessions 1000000
+"""
+import argparse
+import os
+import tempfile
+import time
+import tracemalloc
+
+from fsm_storages import create_storage
+from states import base_states, task_states
+from utils import FiniteStateMachine
+
+
+def fill(fsm: FiniteStateMachine, sessions: int) -> None:
+    """Заполняет машину состояний простаивающими сессиями."""
+    # Временные данные сценария создания задачи, как их объявляет `handlers.task`
+    fsm.register_flow(keys=("task_title", "task_description"), finish_states=(base_states.IN_MENU,))
+    for telegram_id in range(sessions):
+        fsm.set_state(telegram_id, state=task_states.WAIT_FOR_TASK_TITLE)
+        fsm.set_data(telegram_id, key="task_title", value=f"Задача {telegram_id}")
+        fsm.set_state(telegram_id, state=task_states.WAIT_FOR_TASK_DESCRIPTION)
+        fsm.set_data(telegram_id, key="task_description", value="Описание задачи")
+        fsm.set_state(telegram_id, state=base_states.IN_MENU)
+
+
+def measure(kind: str, sessions: int, max_sessions: int) -> None:
+    db_name = os.path.join(tempfile.mkdtemp(prefix="fsm_bench_"), "fsm_db.db")
+    fsm = FiniteStateMachine()
+
+    tracemalloc.start()
+    fsm.set_storage(create_storage(kind=kind, max_sessions=max_sessions, db_name=db_name))
+    started = time.perf_counter()
+    fill(fsm, sessions)
+    elapsed = time.perf_counter() - started
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    fsm.storage.close()
+    db_size = os.path.getsize(db_name) if os.path.exists(db_name) else 0
+    print(
+        f"{kind:<8} sessions={sessions} in_memory={len(fsm.storage):<8} "
+        f"current={current / 2**20:8.1f}MiB peak={peak / 2**20:8.1f}MiB "
+        f"bytes/session={current / max(len(fsm.storage), 1):7.1f} db_file={db_size / 2**20:6.1f}MiB "
+        f"fill={elapsed:.1f}s"
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sessions", type=int, default=1_000_000)
+    parser.add_argument("--max-sessions", type=int, default=100_000)
+    args = parser.parse_args()
+
+    for kind in ("memory", "lru", "sqlite"):
+        measure(kind, args.sessions, args.max_sessions)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+"""Бенчмарк задержки хэндлеров при конкурентных пользователях.
+
+Сравнивает старый режим, в котором запросы к SQLite выполнялись прямо в цикле событий,
+с асинхронным слоем хранения. Помимо "тяжелых" хэндлеров с запросами к БД замеряется
+задержка "легких" хэндлеров без БД (например, /start): именно они страдают, когда
+цикл событий заблокирован чужим fsync.
+
+Запуск из директории `src`:
+    python -m benchmarks.handler_latency --users 50 --iterations 20
+"""
+import argparse
+import asyncio
+import time
+
+from benchmarks.common import format_latencies, use_temporary_database
+
+use_temporary_database()
+
+from database import connection  # noqa: E402
+from dao import TaskDAO  # noqa: E402
+
+
+async def blocking_handler(telegram_id: int) -> None:
+    """Хэндлер в старом стиле: цикл событий ждет каждый запрос синхронно."""
+    connection._executor.submit(
+        connection._execute,
+        "INSERT INTO tasks (title, description, status, telegram_user_id) VALUES (?, ?, ?, ?);",
+        commit=True,
+        args=("title", "description", False, telegram_id),
+    ).result()
+    connection._executor.submit(
+        connection._execute,
+        TaskDAO.GET_ALL_TASKS_QUERY,
+        many=True,
+        args=(telegram_id,),
+    ).result()
+
+
+async def async_handler(telegram_id: int) -> None:
+    """Хэндлер на асинхронном слое хранения."""
+    await TaskDAO.add_new_task(
+        data={"task_title": "title", "task_description": "description"},
+        telegram_id=telegram_id,
+    )
+    await TaskDAO.get_all_tasks(telegram_id=telegram_id)
+
+
+async def run_mode(handler, users: int, iterations: int) -> tuple:
+    """Запускает пользователей конкурентно и собирает задержки хэндлеров."""
+    db_latencies, light_latencies = [], []
+    stop = asyncio.Event()
+
+    async def user(telegram_id: int) -> None:
+        for _ in range(iterations):
+            started = time.perf_counter()
+            await handler(telegram_id)
+            db_latencies.append(time.perf_counter() - started)
+            await asyncio.sleep(0)
+
+    async def light_user() -> None:
+        # Хэндлер без БД: задержка равна времени ожидания цикла событий.
+        while not stop.is_set():
+            started = time.perf_counter()
+            await asyncio.sleep(0.001)
+            light_latencies.append(time.perf_counter() - started - 0.001)
+
+    light = asyncio.create_task(light_user())
+    started = time.perf_counter()
+    await asyncio.gather(*(user(telegram_id) for telegram_id in range(users)))
+    elapsed = time.perf_counter() - started
+    stop.set()
+    await light
+    return elapsed, db_latencies, light_latencies
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--users", type=int, default=50)
+    parser.add_argument("--iterations", type=int, default=20)
+    args = parser.parse_args()
+
+    for name, handler in (("blocking", blocking_handler), ("async", async_handler)):
+        elapsed, db_latencies, light_latencies = await run_mode(
+            handler, args.users, args.iterations
+        )
+        print(f"--- {name}: {args.users} users x {args.iterations} iterations, {elapsed:.2f}s")
+        print(format_latencies("db handler", db_latencies))
+        print(format_latencies("light handler (no db)", light_latencies))
+    print(f"group commit: {connection.write_stats.as_dict()}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
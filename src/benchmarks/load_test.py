@@ -0,0 +1,242 @@
+"""Нагрузочный тест бота против локального поддельного Bot API.
+
+Запускает `main.py` отдельным процессом с TELEGRAM_API_URL, указывающим на
+`benchmarks.fake_api_server`, и симулирует N пользователей, которые одновременно
+проходят регистрацию, добавляют задачи, открывают задачу из списка и листают
+карточки. Каждый шаг пользователя - это обновление и ожидание ответа бота на него.
+
+В отчете: пропускная способность, перцентили задержки по шагам (хэндлерам),
+количество вызовов Bot API по методам и среднее количество вызовов на обновление
+для каждого шага.
+
+Запуск из директории `src`:
+    python -m benchmarks.load_test --users 200 --tasks 3 --navigation 5
+    python -m benchmarks.load_test --users 200 --workers 4  # многопроцессный режим
+"""
+import argparse
+import asyncio
+import os
+import signal
+import sys
+import tempfile
+import time
+from collections import defaultdict
+
+from benchmarks.common import format_latencies, percentile
+from benchmarks.fake_api_server import FakeTelegramServer, start_server
+from keyboards.task.callbacks import ListActions, ListCallback, TaskActions, TaskCallback
+from responses import registration as registration_responses
+from responses import task as task_responses
+
+BOT_TOKEN = "123456:LOAD-TEST"
+SRC_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+# ------------------- region Условия ответа бота -------------------
+def sent_text(text: str):
+    """Бот отправил сообщение с заданным текстом."""
+    return lambda method, params: method == "sendMessage" and params.get("text") == text
+
+
+def sent_inline_keyboard(method: str, params: dict) -> bool:
+    """Бот отправил сообщение с inline-клавиатурой."""
+    markup = params.get("reply_markup") or {}
+    return method == "sendMessage" and "inline_keyboard" in markup
+
+
+def answered(callback_id: str):
+    """Бот ответил на callback-запрос."""
+    return lambda method, params: (
+        method == "answerCallbackQuery" and str(params.get("callback_query_id")) == callback_id
+    )
+
+
+# ------------------- endregion Условия ответа бота -------------------
+
+
+class SimulatedUser:
+    """Пользователь, который проходит сценарий и замеряет задержку каждого шага."""
+
+    def __init__(self, server: FakeTelegramServer, telegram_id: int, latencies: dict):
+        self.server = server
+        self.telegram_id = telegram_id
+        self.latencies = latencies  # Название шага -> [задержка, ...]
+        self.steps = []  # [(название шага, позиция журнала чата в начале шага), ...]
+        self._position = 0  # Позиция журнала чата, с которой ждать следующий ответ
+
+    def _start(self, step: str) -> float:
+        self.steps.append((step, len(self.server.chat_logs[self.telegram_id])))
+        return time.perf_counter()
+
+    async def _wait(self, step: str, started: float, predicate) -> None:
+        self._position = await self.server.wait_for(
+            self.telegram_id, predicate, since=self._position
+        )
+        self.latencies[step].append(time.perf_counter() - started)
+
+    async def send(self, step: str, text: str, predicate) -> None:
+        """Отправляет сообщение и ждет ответ, удовлетворяющий условию."""
+        started = self._start(step)
+        self.server.push_message(self.telegram_id, text)
+        await self._wait(step, started, predicate)
+
+    async def press(self, step: str, data: str) -> None:
+        """Нажимает inline-кнопку и ждет answerCallbackQuery."""
+        started = self._start(step)
+        callback_id = self.server.push_callback(self.telegram_id, data)
+        await self._wait(step, started, answered(callback_id))
+
+    def api_calls_per_step(self) -> list:
+        """Количество вызовов Bot API, которые бот сделал в ответ на каждый шаг."""
+        ends = [position for _, position in self.steps[1:]]
+        ends.append(len(self.server.chat_logs[self.telegram_id]))
+        return [(step, end - start) for (step, start), end in zip(self.steps, ends)]
+
+    def card_buttons(self) -> dict:
+        """Возвращает callback_data кнопок текущей карточки задачи по действию."""
+        markup = self.server.last_inline_markup.get(self.telegram_id) or {}
+        buttons = {}
+        for row in markup.get("inline_keyboard", []):
+            for button in row:
+                data = button.get("callback_data") or ""
+                if data.startswith(f"{TaskCallback.__prefix__}:"):
+                    buttons[TaskCallback.unpack(data).action] = data
+        return buttons
+
+    def list_buttons(self) -> dict:
+        """Возвращает callback_data первой кнопки каждого действия текущей страницы списка."""
+        markup = self.server.last_inline_markup.get(self.telegram_id) or {}
+        buttons = {}
+        for row in markup.get("inline_keyboard", []):
+            for button in row:
+                data = button.get("callback_data") or ""
+                if data.startswith(f"{ListCallback.__prefix__}:"):
+                    buttons.setdefault(ListCallback.unpack(data).action, data)
+        return buttons
+
+    async def run(self, tasks: int, navigation: int) -> None:
+        await self.send("start", "/start", sent_text(registration_responses.REQUEST_FOR_USER_NAME))
+        await self.send("user_name", f"User {self.telegram_id}", sent_inline_keyboard)
+        await self.press("confirm_user_name", "confirm")
+        await self.press("login_from_telegram", "use_login_from_telegram")
+        await self.press("confirm_login", "confirm")
+
+        for number in range(tasks):
+            await self.send(
+                "add_task", "Добавить задачу➕", sent_text(task_responses.REQUEST_FOR_TASK_TITLE)
+            )
+            await self.send("task_title", f"Задача {number}", sent_inline_keyboard)
+            await self.press("confirm_task_title", "confirm")
+            await self.send("task_description", f"Описание задачи {number}", sent_inline_keyboard)
+            await self.press("confirm_task_description", "confirm")
+
+        await self.send("task_list", "Список задач🗓", sent_inline_keyboard)
+        if data := self.list_buttons().get(ListActions.OPEN):
+            await self.press("open_task", data)
+        for _ in range(navigation):
+            buttons = self.card_buttons()
+            data = buttons.get(TaskActions.NEXT) or buttons.get(TaskActions.BACK)
+            if data is None:
+                break
+            await self.press("task_navigation", data)
+
+        # Выполняем текущую задачу и удаляем следующую прямо из карточки
+        if data := self.card_buttons().get(TaskActions.COMPLETE):
+            await self.press("complete_task", data)
+        if data := self.card_buttons().get(TaskActions.DELETE):
+            await self.press("delete_task", data)
+            await self.press("confirm_delete_task", self.card_buttons()[TaskActions.CONFIRM_DELETE])
+
+
+async def run_bot_process(api_url: str, db_dir: str, workers: int = 0) -> asyncio.subprocess.Process:
+    """Запускает бота отдельным процессом с временными базами данных.
+
+    Лимиты очереди отправки по умолчанию выключены: поддельный сервер их не применяет,
+    и тест измеряет самого бота. Их можно включить через SEND_GLOBAL_RATE/SEND_CHAT_RATE.
+
+    :param workers: Количество процессов-воркеров (`workers.py`); 0 - один процесс `main.py`.
+    """
+    env = dict(os.environ)
+    env.setdefault("SEND_GLOBAL_RATE", "0")
+    env.setdefault("SEND_CHAT_RATE", "0")
+    env.update(
+        BOT_TOKEN=BOT_TOKEN,
+        TELEGRAM_API_URL=api_url,
+        DB_NAME=os.path.join(db_dir, "todo_db.db"),
+        FSM_DB_NAME=os.path.join(db_dir, "fsm_db.db"),
+        BOT_WORKERS=str(max(workers, 1)),
+    )
+    return await asyncio.create_subprocess_exec(
+        sys.executable, "workers.py" if workers else "main.py", cwd=SRC_DIR, env=env, stderr=asyncio.subprocess.DEVNULL
+    )
+
+
+async def wait_until_polling(server: FakeTelegramServer, process, timeout: float = 30) -> None:
+    """Ждет, пока бот начнет запрашивать getUpdates."""
+    deadline = time.monotonic() + timeout
+    while not server.calls["getUpdates"]:
+        if process.returncode is not None:
+            raise RuntimeError(f"Бот завершился с кодом {process.returncode}")
+        if time.monotonic() > deadline:
+            raise TimeoutError("Бот не начал получать обновления")
+        await asyncio.sleep(0.05)
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument("--tasks", type=int, default=3, help="Сколько задач добавляет каждый пользователь")
+    parser.add_argument("--navigation", type=int, default=5, help="Сколько раз пользователь листает список")
+    parser.add_argument("--workers", type=int, default=0, help="Процессов-воркеров (0 - один процесс)")
+    args = parser.parse_args()
+
+    server = FakeTelegramServer()
+    runner, api_url = await start_server(server)
+    process = await run_bot_process(api_url, tempfile.mkdtemp(prefix="todo_load_"), args.workers)
+    latencies = defaultdict(list)
+    try:
+        await wait_until_polling(server, process)
+        calls_before = server.calls.copy()
+
+        users = [SimulatedUser(server, 1_000_000 + number, latencies) for number in range(args.users)]
+        started = time.perf_counter()
+        await asyncio.gather(*(user.run(args.tasks, args.navigation) for user in users))
+        elapsed = time.perf_counter() - started
+        # Даем боту отправить сообщения, которые еще в очереди после ответа на последний шаг
+        await asyncio.sleep(0.5)
+        calls = server.calls - calls_before
+    finally:
+        if process.returncode is None:
+            process.send_signal(signal.SIGINT)
+            await process.wait()
+        await runner.cleanup()
+
+    updates = sum(len(values) for values in latencies.values())
+    all_latencies = [value for values in latencies.values() for value in values]
+    print(f"Пользователей: {args.users}, обновлений: {updates}, время: {elapsed:.2f}s")
+    print(f"Пропускная способность: {updates / elapsed:.0f} обновлений/с")
+    print(
+        f"Задержка ответа: p50={percentile(all_latencies, 50) * 1000:.2f}ms "
+        f"p99={percentile(all_latencies, 99) * 1000:.2f}ms"
+    )
+    print("\nЗадержка по хэндлерам:")
+    for step, values in latencies.items():
+        print(format_latencies(step, values))
+
+    api_calls = sum(count for method, count in calls.items() if method != "getUpdates")
+    print("\nВызовы Bot API:")
+    for method, count in calls.most_common():
+        print(f"{method:<28} {count}")
+    print(f"{'на одно обновление':<28} {api_calls / updates:.2f}")
+
+    calls_per_step = defaultdict(list)
+    for user in users:
+        for step, count in user.api_calls_per_step():
+            calls_per_step[step].append(count)
+    print("\nВызовы Bot API на обновление по хэндлерам:")
+    for step, counts in calls_per_step.items():
+        print(f"{step:<28} {sum(counts) / len(counts):.2f}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,84 @@
+"""Микробенчмарк сборки клавиатур: стоимость одного вызова без кэша и с кэшем.
+
+"Без кэша" - исходная функция сборки (`__wrapped__` у `lru_cache`), "с кэшем" - вызов
+функции клавиатуры, как в хэндлерах. Для карточки задачи дополнительно моделируется
+перелистывание: пользователи листают свои карточки вперед и назад, и кэш ограничен
+`MARKUP_CACHE_SIZE`, поэтому часть вызовов - промахи.
+
+Запуск из директории `src`:
+    python -m benchmarks.markups --calls 2000 --users 500
+"""
+import argparse
+import random
+import time
+
+from keyboards.base.inline import get_confirmation_keyboard_markup
+from keyboards.base.reply import get_menu_markup
+from keyboards.registration.inline import get_user_login_markup
+from keyboards.task.inline import (
+    get_delete_confirmation_markup,
+    get_description_pages_markup,
+    get_search_results_markup,
+    get_task_manager_markup,
+)
+
+KEYBOARDS = [
+    ("menu", get_menu_markup, ()),
+    ("confirmation", get_confirmation_keyboard_markup, ()),
+    ("user_login", get_user_login_markup, ()),
+    ("task_manager", get_task_manager_markup, (42, 3, 10, True)),
+    ("delete_confirmation", get_delete_confirmation_markup, (42, 3, 10)),
+    ("search_results", get_search_results_markup, (1, True)),
+    ("description_pages", get_description_pages_markup, (42, 2, 5, 3, 10)),
+]
+
+
+def per_call(function, args: tuple, calls: int) -> float:
+    """Среднее время одного вызова в микросекундах."""
+    started = time.perf_counter()
+    for _ in range(calls):
+        function(*args)
+    return (time.perf_counter() - started) / calls * 1e6
+
+
+def navigation(users: int, tasks: int, steps: int) -> float:
+    """Перелистывание карточек задач: возвращает среднее время вызова в микросекундах."""
+    get_task_manager_markup.cache_clear()
+    rng = random.Random(0)
+    positions = [1] * users
+    started = time.perf_counter()
+    for _ in range(steps):
+        user = rng.randrange(users)
+        positions[user] = min(max(positions[user] + rng.choice((-1, 1)), 1), tasks)
+        # ID задач у разных пользователей разные, как в базе данных
+        get_task_manager_markup(user * tasks + positions[user], positions[user], tasks, False)
+    return (time.perf_counter() - started) / steps * 1e6
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--calls", type=int, default=2000, help="Вызовов на каждую клавиатуру")
+    parser.add_argument("--users", type=int, default=500, help="Пользователей, листающих карточки")
+    parser.add_argument("--tasks", type=int, default=10, help="Задач у каждого пользователя")
+    args = parser.parse_args()
+
+    for name, function, call_args in KEYBOARDS:
+        uncached = per_call(function.__wrapped__, call_args, args.calls)
+        cached = per_call(function, call_args, args.calls)
+        print(
+            f"{name:<20} без кэша={uncached:9.1f}us с кэшем={cached:6.2f}us "
+            f"ускорение={uncached / cached:8.0f}x"
+        )
+
+    steps = args.users * args.tasks * 2
+    uncached = per_call(get_task_manager_markup.__wrapped__, (42, 3, 10, False), args.calls)
+    cached = navigation(args.users, args.tasks, steps)
+    info = get_task_manager_markup.cache_info()
+    print(
+        f"перелистывание карточек: пользователей={args.users} вызовов={steps} "
+        f"попаданий={info.hits / steps:.0%} без кэша={uncached:.1f}us с кэшем={cached:.1f}us"
+    )
+
+
+if __name__ == "__main__":
+    main()
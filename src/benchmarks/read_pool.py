@@ -0,0 +1,80 @@
+"""Бенчмарк задержки чтения во время записи: пул читателей против одного соединения.
+
+Пока в потоке записи идут большие транзакции (как перенос пачки задач в архив или
+пачка группового коммита под нагрузкой), пользователи открывают список задач
+`TaskDAO.GET_ALL_TASKS_QUERY`. С `readers=0` чтения выполняются через соединение записи
+и ждут окончания транзакции; с пулом читатели режима WAL читают последнее закоммиченное
+состояние в своих потоках.
+
+Запуск из директории `src`:
+    python -m benchmarks.read_pool --readers 0 4 --seconds 5
+"""
+import argparse
+import asyncio
+import os
+import sqlite3
+import time
+
+from benchmarks.common import format_latencies, use_temporary_database
+
+use_temporary_database()
+
+from dao import TaskDAO  # noqa: E402
+from database import Connection  # noqa: E402
+
+INSERT_TASK_QUERY = "INSERT INTO tasks (title, description, status, telegram_user_id) VALUES (?, ?, ?, ?);"
+# Соединения живут до конца работы цикла событий вместе с задачами группового коммита
+connections = []
+
+
+def insert_tasks(db: sqlite3.Connection, count: int, first_user: int, users: int) -> None:
+    """Добавляет задачи `users` пользователям, начиная с `first_user`, одной транзакцией."""
+    rows = (("title", "description " * 20, False, first_user + number % users) for number in range(count))
+    db.executemany(INSERT_TASK_QUERY, rows)
+    db.commit()
+
+
+async def bench(readers: int, users: int, batch: int, seconds: float) -> tuple:
+    """Возвращает задержки чтений и количество транзакций записи за время замера."""
+    db_name = os.path.join(os.path.dirname(os.environ["DB_NAME"]), f"read_pool_{readers}.db")
+    connection = Connection(db_name=db_name, readers=readers)
+    connections.append(connection)
+    # У читающих пользователей по 20 задач; пишутся задачи других пользователей,
+    # поэтому время самого чтения не растет за время замера
+    await connection.execute_in_thread(insert_tasks, users * 20, 1, users)
+    deadline = time.perf_counter() + seconds
+    latencies, transactions = [], 0
+
+    async def writer() -> None:
+        nonlocal transactions
+        while time.perf_counter() < deadline:
+            await connection.execute_in_thread(insert_tasks, batch, users + 1, users)
+            transactions += 1
+
+    async def reader(telegram_id: int) -> None:
+        while time.perf_counter() < deadline:
+            started = time.perf_counter()
+            await connection.execute_query(query=TaskDAO.GET_ALL_TASKS_QUERY, many=True, args=(telegram_id,))
+            latencies.append(time.perf_counter() - started)
+            # Пользователь читает список, прежде чем открыть его снова
+            await asyncio.sleep(0.01)
+
+    await asyncio.gather(writer(), *(reader(telegram_id) for telegram_id in range(1, users + 1)))
+    return latencies, transactions
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--readers", type=int, nargs="+", default=[0, 4])
+    parser.add_argument("--users", type=int, default=20)
+    parser.add_argument("--batch", type=int, default=2000, help="Задач в одной транзакции записи")
+    parser.add_argument("--seconds", type=float, default=5)
+    args = parser.parse_args()
+
+    for readers in args.readers:
+        latencies, transactions = await bench(readers, args.users, args.batch, args.seconds)
+        print(format_latencies(f"readers={readers}", latencies), f"транзакций записи={transactions}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,108 @@
+"""Бенчмарк полнотекстового поиска задач: FTS5 против LIKE.
+
+Заполняет временную базу данных задачами со случайными словами (частоты слов
+распределены по закону Ципфа, как в живом тексте) и сравнивает время запроса
+`TaskDAO.search_tasks` с поиском через LIKE по задачам того же пользователя.
+LIKE не умеет ранжировать, поэтому для сравнения он читает все совпадения - столько же
+строк, сколько пришлось бы отсортировать по релевантности.
+
+Запуск из директории `src`:
+    python -m benchmarks.search --tasks 1000000 --users 100
+"""
+import argparse
+import asyncio
+import itertools
+import os
+import random
+import sqlite3
+import string
+import time
+
+from benchmarks.common import format_latencies, use_temporary_database
+
+DB_NAME = use_temporary_database()
+
+from dao import TaskDAO  # noqa: E402
+from database import connection  # noqa: E402
+
+LIKE_QUERY = (
+    "SELECT id, title, description, telegram_user_id FROM tasks "
+    "WHERE telegram_user_id=? AND status=0 AND is_deleted=0 "
+    "AND (title LIKE ? OR description LIKE ?);"
+)
+
+
+def make_vocabulary(size: int) -> list:
+    """Случайные слова из 6 букв."""
+    words = set()
+    while len(words) < size:
+        words.add("".join(random.choices(string.ascii_lowercase, k=6)))
+    return list(words)
+
+
+def fill_tasks(count: int, users: int, vocabulary: list) -> None:
+    """Добавляет задачи одной транзакцией (триггеры заполняют и полнотекстовый индекс)."""
+    cum_weights = list(itertools.accumulate(1 / rank for rank in range(1, len(vocabulary) + 1)))
+
+    def rows():
+        for number in range(count):
+            words = random.choices(vocabulary, cum_weights=cum_weights, k=12)
+            yield " ".join(words[:4]), " ".join(words[4:]), False, 1 + number % users
+
+    db = sqlite3.connect(DB_NAME)
+    db.executemany(
+        "INSERT INTO tasks (title, description, status, telegram_user_id) VALUES (?, ?, ?, ?);",
+        rows(),
+    )
+    db.commit()
+    db.close()
+
+
+async def bench(queries: list) -> tuple:
+    fts, like = [], []
+    for telegram_id, word in queries:
+        started = time.perf_counter()
+        await TaskDAO.search_tasks(telegram_id=telegram_id, text=word, limit=6)
+        fts.append(time.perf_counter() - started)
+
+        started = time.perf_counter()
+        await connection.execute_query(
+            query=LIKE_QUERY, many=True, args=(telegram_id, f"%{word}%", f"%{word}%")
+        )
+        like.append(time.perf_counter() - started)
+    return fts, like
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--tasks", type=int, default=1_000_000)
+    parser.add_argument("--users", type=int, default=100)
+    parser.add_argument("--vocabulary", type=int, default=20_000)
+    parser.add_argument("--queries", type=int, default=200)
+    args = parser.parse_args()
+
+    random.seed(1)
+    vocabulary = make_vocabulary(args.vocabulary)
+    started = time.perf_counter()
+    fill_tasks(args.tasks, args.users, vocabulary)
+    print(
+        f"Задач: {args.tasks}, пользователей: {args.users}, "
+        f"заполнение: {time.perf_counter() - started:.1f}s, "
+        f"база данных: {os.path.getsize(DB_NAME) / 2 ** 20:.0f} MiB"
+    )
+
+    def users():
+        return (random.randint(1, args.users) for _ in range(args.queries))
+
+    # Слово из словаря наугад - обычный поиск конкретной задачи; частые слова - худший случай
+    typical = list(zip(users(), random.choices(vocabulary, k=args.queries)))
+    frequent = list(zip(users(), random.choices(vocabulary[:100], k=args.queries)))
+    for name, queries in (("случайное слово", typical), ("частое слово (топ-100)", frequent)):
+        fts, like = await bench(queries)
+        print(f"\n{name}:")
+        print(format_latencies("FTS5", fts))
+        print(format_latencies("LIKE", like))
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
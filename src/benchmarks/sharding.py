@@ -0,0 +1,75 @@
+"""Бенчмарк пропускной способности записи в зависимости от количества шардов базы данных.
+
+Пользователи одновременно добавляют задачи через `TaskDAO.add_new_task`: каждый
+пользователь пишет свои задачи по очереди, как обрабатываются его обновления в боте.
+Для каждого количества шардов запускается отдельный процесс со своей временной базой
+(соединения создаются при импорте `database` по `DB_SHARDS`).
+
+Запуск из директории `src`:
+    python -m benchmarks.sharding --shards 1 2 4 8 --users 200 --tasks 50
+
+Шарды ускоряют запись, когда время уходит на коммиты (fsync), а не на Python: их потоки
+ждут диск одновременно. Без группового коммита это видно сразу:
+    DB_BATCH_SIZE=1 DB_FLUSH_INTERVAL_MS=0 python -m benchmarks.sharding --tasks 10
+"""
+import argparse
+import asyncio
+import os
+import subprocess
+import sys
+import time
+
+from benchmarks.common import use_temporary_database
+
+
+async def run(users: int, tasks_per_user: int) -> None:
+    """Замер в текущем процессе: печатает количество записей в секунду."""
+    from dao import TaskDAO
+    from database import shards
+
+    async def user_writes(telegram_id: int) -> None:
+        for number in range(tasks_per_user):
+            await TaskDAO.add_new_task(
+                {"task_title": f"Задача {number}", "task_description": "описание"}, telegram_id
+            )
+
+    started = time.perf_counter()
+    await asyncio.gather(*(user_writes(telegram_id) for telegram_id in range(1, users + 1)))
+    await shards.flush()
+    elapsed = time.perf_counter() - started
+    batches = sum(stats["batches"] for stats in shards.write_stats())
+    print(f"{users * tasks_per_user / elapsed:.0f} {batches}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--shards", type=int, nargs="+", default=[1, 2, 4, 8])
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument("--tasks", type=int, default=50, help="Задач на пользователя")
+    parser.add_argument("--run", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.run:
+        asyncio.run(run(args.users, args.tasks))
+        return
+
+    print(f"Пользователей: {args.users}, задач на пользователя: {args.tasks}, CPU: {os.cpu_count()}")
+    baseline = None
+    for count in args.shards:
+        use_temporary_database()
+        env = dict(os.environ, DB_SHARDS=str(count))
+        output = subprocess.run(
+            [sys.executable, "-m", "benchmarks.sharding", "--run",
+             "--users", str(args.users), "--tasks", str(args.tasks)],
+            env=env, check=True, capture_output=True, text=True,
+        ).stdout.split()
+        throughput, batches = float(output[-2]), int(output[-1])
+        baseline = baseline or throughput
+        print(
+            f"шардов={count:<3} записей/с={throughput:8.0f} "
+            f"коммитов={batches:<6} ускорение={throughput / baseline:5.2f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,148 @@
+"""Бенчмарк пропускной способности: long polling против вебхука.
+
+Поддельный клиент Telegram отдает одни и те же обновления обоими способами:
+- polling: сессия бота отвечает на getUpdates пачками из очереди обновлений;
+- webhook: клиент aiohttp отправляет обновления POST-запросами на локальный сервер.
+Ответные вызовы Bot API (sendMessage и т.п.) обрабатывает поддельная сессия.
+
+Запуск из директории `src`:
+    python -m benchmarks.webhook_vs_polling --updates 5000 --concurrency 100
+"""
+import argparse
+import asyncio
+import time
+
+from benchmarks.common import use_temporary_database
+
+use_temporary_database()
+
+import aiohttp  # noqa: E402
+from aiogram import Bot, Dispatcher  # noqa: E402
+from aiogram.methods import GetUpdates  # noqa: E402
+from aiohttp import web  # noqa: E402
+
+from benchmarks.fake_bot import FakeSession, make_message_update  # noqa: E402
+from dispatching import StateDispatchMiddleware  # noqa: E402
+from handlers import routers  # noqa: E402
+from states import task_states  # noqa: E402
+from utils import fsm  # noqa: E402
+from webhook import create_webhook_app  # noqa: E402
+
+WEBHOOK_PATH = "/webhook"
+
+
+class PollingSession(FakeSession):
+    """Поддельная сессия, которая отдает обновления из очереди на getUpdates."""
+
+    def __init__(self, updates: list):
+        super().__init__()
+        self.updates = updates
+
+    async def make_request(self, bot, method, timeout=None):
+        if isinstance(method, GetUpdates):
+            self.calls["GetUpdates"] += 1
+            offset = method.offset or 0
+            batch = [update for update in self.updates if update.update_id >= offset]
+            if not batch:
+                await asyncio.sleep(0.01)
+            return batch[: method.limit or 100]
+        return await super().make_request(bot, method, timeout)
+
+
+def prepare_updates(count: int) -> list:
+    """Готовит обновления от разных пользователей, ожидающих описание задачи."""
+    updates = []
+    for telegram_id in range(1, count + 1):
+        fsm.set_state(telegram_id, task_states.WAIT_FOR_TASK_DESCRIPTION)
+        updates.append(make_message_update(telegram_id, "description"))
+    return updates
+
+
+def count_processed(disp: Dispatcher) -> list:
+    """Подключает счетчик обработанных обновлений."""
+    processed = [0]
+
+    async def counter(handler, event, data):
+        try:
+            return await handler(event, data)
+        finally:
+            processed[0] += 1
+
+    disp.update.outer_middleware(counter)
+    return processed
+
+
+async def wait_processed(processed: list, count: int) -> None:
+    while processed[0] < count:
+        await asyncio.sleep(0.001)
+
+
+async def bench_polling(disp: Dispatcher, processed: list, count: int) -> float:
+    updates = prepare_updates(count)
+    bot = Bot(token="123456:FAKE", session=PollingSession(updates))
+    processed[0] = 0
+
+    started = time.perf_counter()
+    polling = asyncio.create_task(disp.start_polling(bot, handle_signals=False, polling_timeout=0))
+    await wait_processed(processed, count)
+    elapsed = time.perf_counter() - started
+
+    await disp.stop_polling()
+    await polling
+    return elapsed
+
+
+async def bench_webhook(disp: Dispatcher, processed: list, count: int, concurrency: int) -> float:
+    updates = prepare_updates(count)
+    bot = Bot(token="123456:FAKE", session=FakeSession())
+    app = create_webhook_app(disp, bot, WEBHOOK_PATH, max_concurrency=concurrency)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, host="127.0.0.1", port=0)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]
+    url = f"http://127.0.0.1:{port}{WEBHOOK_PATH}"
+    processed[0] = 0
+
+    bodies = [update.model_dump_json(exclude_none=True) for update in updates]
+    semaphore = asyncio.Semaphore(concurrency)
+    headers = {"Content-Type": "application/json"}
+
+    async with aiohttp.ClientSession() as client:
+
+        async def post(body: str) -> None:
+            async with semaphore:
+                async with client.post(url, data=body, headers=headers) as response:
+                    await response.read()
+
+        started = time.perf_counter()
+        await asyncio.gather(*(post(body) for body in bodies))
+        await wait_processed(processed, count)
+        elapsed = time.perf_counter() - started
+
+    await runner.cleanup()
+    return elapsed
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--updates", type=int, default=5000)
+    parser.add_argument("--concurrency", type=int, default=100)
+    args = parser.parse_args()
+
+    disp = Dispatcher()
+    for router in routers:
+        disp.include_router(router)
+    state_dispatch = StateDispatchMiddleware()
+    disp.message.outer_middleware(state_dispatch)
+    disp.callback_query.outer_middleware(state_dispatch)
+    processed = count_processed(disp)
+
+    polling = await bench_polling(disp, processed, args.updates)
+    webhook = await bench_webhook(disp, processed, args.updates, args.concurrency)
+    print(f"polling: {args.updates / polling:8.0f} updates/s ({polling:.2f}s)")
+    print(f"webhook: {args.updates / webhook:8.0f} updates/s ({webhook:.2f}s), concurrency={args.concurrency}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
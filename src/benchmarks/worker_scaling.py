@@ -0,0 +1,52 @@
+"""Бенчмарк масштабирования многопроцессного режима по ядрам.
+
+Для каждого количества воркеров запускает нагрузочный тест (`benchmarks.load_test`)
+отдельным процессом и сравнивает пропускную способность с однопроцессным ботом (0 воркеров).
+Воркеры ускоряют обработку, только пока есть свободные ядра: поддельный Bot API и
+симулируемые пользователи тоже занимают одно ядро.
+
+Запуск из директории `src`:
+    python -m benchmarks.worker_scaling --workers 0 1 2 4 --users 200
+"""
+import argparse
+import os
+import re
+import subprocess
+import sys
+
+THROUGHPUT_PATTERN = re.compile(r"Пропускная способность: (\d+)")
+LATENCY_PATTERN = re.compile(r"Задержка ответа: p50=([\d.]+)ms p99=([\d.]+)ms")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--workers", type=int, nargs="+", default=[0, 1, 2, 4])
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument("--tasks", type=int, default=3)
+    parser.add_argument("--navigation", type=int, default=5)
+    args = parser.parse_args()
+
+    print(f"Пользователей: {args.users}, CPU: {os.cpu_count()}")
+    baseline = None
+    for workers in args.workers:
+        output = subprocess.run(
+            [
+                sys.executable, "-m", "benchmarks.load_test",
+                "--users", str(args.users),
+                "--tasks", str(args.tasks),
+                "--navigation", str(args.navigation),
+                "--workers", str(workers),
+            ],
+            check=True, capture_output=True, text=True,
+        ).stdout
+        throughput = int(THROUGHPUT_PATTERN.search(output).group(1))
+        p50, p99 = LATENCY_PATTERN.search(output).groups()
+        baseline = baseline or throughput
+        print(
+            f"воркеров={workers:<3} обновлений/с={throughput:<6} p50={p50}ms p99={p99}ms "
+            f"ускорение={throughput / baseline:5.2f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -1,8 +1,31 @@
 from aiogram import Bot, Dispatcher
 from aiogram.client.default import DefaultBotProperties
+from aiogram.client.session.aiohttp import AiohttpSession
+from aiogram.client.telegram import TelegramAPIServer
 
 from config import settings
+from sender import OutgoingQueue
+from tracing import TracingRequestMiddleware
 
-bot = Bot(token=settings.BOT_TOKEN, default=DefaultBotProperties(parse_mode="HTML"))
+session = (
+    AiohttpSession(api=TelegramAPIServer.from_base(settings.TELEGRAM_API_URL))
+    if settings.TELEGRAM_API_URL
+    else None
+)
+bot = Bot(token=settings.BOT_TOKEN, session=session, default=DefaultBotProperties(parse_mode="HTML"))
+
+# Время вызовов Bot API, которое ждут хэндлеры (мидлварь регистрируется первой, то есть внешней)
+bot.session.middleware(TracingRequestMiddleware())
+
+# Исходящие вызовы Bot API проходят через очередь с учетом лимитов Telegram
+send_queue = OutgoingQueue(
+    global_rate=settings.SEND_GLOBAL_RATE,
+    chat_rate=settings.SEND_CHAT_RATE,
+    chat_burst=settings.SEND_CHAT_BURST,
+    workers=settings.SEND_WORKERS,
+    max_retries=settings.SEND_MAX_RETRIES,
+    wait=settings.SEND_QUEUE_WAIT,
+)
+bot.session.middleware(send_queue)
 
 disp = Dispatcher()
@@ -0,0 +1,74 @@
+import time
+from collections import OrderedDict
+from typing import Any, Hashable
+
+# Возвращается из LRUCache.get при промахе, чтобы отличать его от закэшированного None
+MISSING = object()
+
+
+class LRUCache:
+    """Ограниченный по размеру кэш с вытеснением давно не использованных записей.
+
+    Записи могут иметь время жизни. Кэш считает попадания и промахи.
+    """
+
+    def __init__(self, max_size: int, ttl: float = 0):
+        """
+        :param max_size: Максимальное количество записей;
+        :param ttl: Время жизни записи по умолчанию в секундах (0 - без ограничения).
+        """
+        self.max_size = max_size
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = OrderedDict()  # ключ -> (значение, момент истечения или 0)
+
+    def get(self, key: Hashable) -> Any:
+        """Возвращает значение по ключу или MISSING, если записи нет или она устарела."""
+        entry = self._entries.get(key)
+        if entry is None or (entry[1] and entry[1] < time.monotonic()):
+            if entry is not None:
+                del self._entries[key]
+            self.misses += 1
+            return MISSING
+
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry[0]
+
+    def set(self, key: Hashable, value: Any, ttl: float = None) -> None:
+        """Сохраняет значение.
+
+        :param key: Ключ записи;
+        :param value: Значение (может быть None);
+        :param ttl: Время жизни записи в секундах, по умолчанию - время жизни кэша.
+        """
+        ttl = self.ttl if ttl is None else ttl
+        self._entries[key] = (value, time.monotonic() + ttl if ttl else 0)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def invalidate(self, key: Hashable) -> None:
+        """Удаляет запись из кэша."""
+        self._entries.pop(key, None)
+
+    def clear(self) -> None:
+        """Очищает кэш."""
+        self._entries.clear()
+
+    def stats(self) -> dict:
+        """Возвращает счетчики кэша."""
+        requests = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": self.hits / requests if requests else 0.0,
+        }
+
+    def __len__(self) -> int:
+        return len(self._entries)
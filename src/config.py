@@ -14,6 +14,82 @@ class Config:
 
     def __init__(self):
         self.BOT_TOKEN = os.environ.get("BOT_TOKEN")
+        # Адрес Bot API (например, локальный сервер для нагрузочного теста). По умолчанию - api.telegram.org
+        self.TELEGRAM_API_URL = os.environ.get("TELEGRAM_API_URL")
+        self.DB_NAME = os.environ.get("DB_NAME", "/src/todo_db.db")
+        # Количество шардов базы данных: данные пользователя хранятся в файле по его Telegram ID.
+        # Менять только вместе с переносом данных (python -m resharding)
+        self.DB_SHARDS = int(os.environ.get("DB_SHARDS", 1))
+        # Группировка записей: сколько ждать новые записи перед коммитом
+        # и сколько записей максимум коммитить одной транзакцией.
+        self.DB_FLUSH_INTERVAL_MS = float(os.environ.get("DB_FLUSH_INTERVAL_MS", 5))
+        self.DB_BATCH_SIZE = int(os.environ.get("DB_BATCH_SIZE", 64))
+        # Пул соединений: одно соединение пишет, DB_READERS соединений только читают (режим WAL).
+        # 0 - чтение идет через соединение записи
+        self.DB_READERS = int(os.environ.get("DB_READERS", 4))
+        # PRAGMA соединений: synchronous (NORMAL в режиме WAL не теряет данные при падении бота,
+        # только при отключении питания), размер кэша страниц в КиБ и размер отображения файла в память
+        self.DB_SYNCHRONOUS = os.environ.get("DB_SYNCHRONOUS", "NORMAL")
+        self.DB_CACHE_SIZE_KB = int(os.environ.get("DB_CACHE_SIZE_KB", 16384))
+        self.DB_MMAP_SIZE = int(os.environ.get("DB_MMAP_SIZE", 256 * 2 ** 20))
+        # Очередь исходящих сообщений: лимиты Telegram (0 - без ограничения) и количество воркеров.
+        # SEND_QUEUE_WAIT=1 - хэндлер ждет фактической отправки сообщения
+        self.SEND_GLOBAL_RATE = float(os.environ.get("SEND_GLOBAL_RATE", 30))
+        self.SEND_CHAT_RATE = float(os.environ.get("SEND_CHAT_RATE", 1))
+        self.SEND_CHAT_BURST = float(os.environ.get("SEND_CHAT_BURST", 3))
+        self.SEND_WORKERS = int(os.environ.get("SEND_WORKERS", 16))
+        self.SEND_MAX_RETRIES = int(os.environ.get("SEND_MAX_RETRIES", 3))
+        self.SEND_QUEUE_WAIT = os.environ.get("SEND_QUEUE_WAIT", "0") == "1"
+        # Обработка обновлений: сколько хэндлеров работают одновременно (0 - без ограничения)
+        # и сколько обновлений одного пользователя могут ждать своей очереди
+        self.UPDATE_MAX_WORKERS = int(os.environ.get("UPDATE_MAX_WORKERS", 100))
+        self.UPDATE_MAX_PENDING_PER_USER = int(os.environ.get("UPDATE_MAX_PENDING_PER_USER", 32))
+        # Подавление повторов: сколько последних обновлений, callback-запросов и ключей
+        # идемпотентности записей помнить и сколько секунд
+        self.DEDUP_CACHE_SIZE = int(os.environ.get("DEDUP_CACHE_SIZE", 100_000))
+        self.DEDUP_TTL = float(os.environ.get("DEDUP_TTL", 600))
+        # Метрики Prometheus на http://METRICS_HOST:METRICS_PORT/metrics (0 - сервер метрик выключен)
+        # и доля обновлений, трейс которых пишется в лог
+        self.METRICS_HOST = os.environ.get("METRICS_HOST", "127.0.0.1")
+        self.METRICS_PORT = int(os.environ.get("METRICS_PORT", 0))
+        self.TRACE_SAMPLE_RATE = float(os.environ.get("TRACE_SAMPLE_RATE", 0))
+        # Обслуживание базы: раз в ARCHIVE_INTERVAL секунд (0 - выключено) задачи, выполненные или
+        # удаленные больше ARCHIVE_AFTER секунд назад, переносятся в ARCHIVE_DB_NAME пачками
+        # по ARCHIVE_BATCH_SIZE, а место в файле освобождается шагами по VACUUM_STEP_PAGES страниц
+        self.ARCHIVE_DB_NAME = os.environ.get("ARCHIVE_DB_NAME", "/src/todo_archive.db")
+        self.ARCHIVE_INTERVAL = float(os.environ.get("ARCHIVE_INTERVAL", 3600))
+        self.ARCHIVE_AFTER = float(os.environ.get("ARCHIVE_AFTER", 7 * 24 * 60 * 60))
+        self.ARCHIVE_BATCH_SIZE = int(os.environ.get("ARCHIVE_BATCH_SIZE", 500))
+        self.VACUUM_STEP_PAGES = int(os.environ.get("VACUUM_STEP_PAGES", 256))
+        # Способ получения обновлений: polling или webhook
+        # (worker - процесс-воркер, которому обновления передает `python workers.py`)
+        self.BOT_MODE = os.environ.get("BOT_MODE", "polling")
+        # Многопроцессный режим (python workers.py): количество процессов-воркеров.
+        # Обновления пользователя всегда обрабатывает воркер telegram_id % BOT_WORKERS
+        self.BOT_WORKERS = int(os.environ.get("BOT_WORKERS", 1))
+        # Номер воркера (выставляет главный процесс)
+        self.BOT_WORKER_INDEX = int(os.environ.get("BOT_WORKER_INDEX", 0))
+        # Сколько обновлений может ждать отправки одному воркеру, пока главный процесс не перестанет их принимать
+        self.BOT_WORKER_QUEUE_SIZE = int(os.environ.get("BOT_WORKER_QUEUE_SIZE", 1000))
+        self.WEBHOOK_BASE_URL = os.environ.get("WEBHOOK_BASE_URL")
+        self.WEBHOOK_PATH = os.environ.get("WEBHOOK_PATH", "/webhook")
+        self.WEBHOOK_HOST = os.environ.get("WEBHOOK_HOST", "0.0.0.0")
+        self.WEBHOOK_PORT = int(os.environ.get("WEBHOOK_PORT", 8080))
+        self.WEBHOOK_SECRET = os.environ.get("WEBHOOK_SECRET")
+        self.WEBHOOK_MAX_CONCURRENCY = int(os.environ.get("WEBHOOK_MAX_CONCURRENCY", 100))
+        # Кэш профилей пользователей
+        self.USER_CACHE_SIZE = int(os.environ.get("USER_CACHE_SIZE", 10_000))
+        self.USER_CACHE_NEGATIVE_TTL = float(os.environ.get("USER_CACHE_NEGATIVE_TTL", 60))
+        # Кэш отрисованных страниц списка задач (по пользователю и версии его списка)
+        self.LIST_CACHE_SIZE = int(os.environ.get("LIST_CACHE_SIZE", 10_000))
+        # Кэш собранных клавиатур с параметрами, на каждую функцию клавиатуры
+        # (карточка задачи занимает около 12 КБ)
+        self.MARKUP_CACHE_SIZE = int(os.environ.get("MARKUP_CACHE_SIZE", 1000))
+        # Хранилище машины состояний: memory, lru или sqlite
+        self.FSM_STORAGE = os.environ.get("FSM_STORAGE", "memory")
+        self.FSM_MAX_SESSIONS = int(os.environ.get("FSM_MAX_SESSIONS", 100_000))
+        self.FSM_SESSION_TTL = float(os.environ.get("FSM_SESSION_TTL", 0))
+        self.FSM_DB_NAME = os.environ.get("FSM_DB_NAME", "/src/fsm_db.db")
 
 
 @lru_cache
@@ -1,6 +1,58 @@
+import asyncio
+import itertools
+import json
+import logging
+import re
+import sqlite3
 from typing import Optional
 
-from database import connection
+from caches import MISSING, LRUCache
+from config import settings
+from database import shards
+
+# Кэш профилей пользователей по telegram id. Отсутствие пользователя тоже кэшируется
+# (на USER_CACHE_NEGATIVE_TTL секунд), чтобы /start незарегистрированного не ходил в БД.
+users_cache = LRUCache(max_size=settings.USER_CACHE_SIZE)
+# Ключи идемпотентности выполненных записей: future с количеством строк, измененных записью.
+# Повтор записи с тем же ключом (двойное нажатие на кнопку) пропускается без обращения к БД и
+# получает результат первой записи, попадания кэша - сэкономленные записи.
+idempotency_keys = LRUCache(max_size=settings.DEDUP_CACHE_SIZE, ttl=settings.DEDUP_TTL)
+
+# Версии списков задач пользователей. Номер версии берется из общего счетчика и не
+# повторяется, поэтому отрисовки, закэшированные по (пользователь, версия), становятся
+# недоступны при любом изменении задач пользователя, в том числе после вытеснения версии.
+task_list_versions = LRUCache(max_size=settings.LIST_CACHE_SIZE)
+_task_list_version_counter = itertools.count(1)
+
+
+def get_task_list_version(telegram_id: int) -> int:
+    """Возвращает текущую версию списка задач пользователя."""
+    version = task_list_versions.get(telegram_id)
+    if version is MISSING:
+        version = next(_task_list_version_counter)
+        task_list_versions.set(telegram_id, version)
+    return version
+
+
+def invalidate_task_list(telegram_id: int) -> None:
+    """Меняет версию списка задач пользователя после записи его задач."""
+    task_list_versions.set(telegram_id, next(_task_list_version_counter))
+
+
+def claim_idempotency_key(key: Optional[str], result: asyncio.Future) -> Optional[asyncio.Future]:
+    """Занимает ключ идемпотентности перед записью.
+
+    :param key: Ключ записи или None, если запись не нужно защищать от повтора;
+    :param result: Future, в которую запись передаст количество измененных строк.
+    :return: None, если запись нужно выполнить; для повтора - future первой записи с этим ключом.
+    """
+    if key is None:
+        return None
+    first = idempotency_keys.get(key)
+    if first is not MISSING:
+        return first
+    idempotency_keys.set(key, result)
+    return None
 
 
 class UsersDAO:
@@ -10,6 +62,8 @@ class UsersDAO:
     получения данных о пользователях по различным критериям.
     """
 
+    GET_USER_QUERY = "SELECT * FROM users WHERE {column} = ?"
+
     @classmethod
     def convert_user_result_to_dict(cls, data: tuple) -> dict:
         """Конвертирует данные о пользователе из кортежа в словарь.
@@ -26,12 +80,12 @@ class UsersDAO:
         return result
 
     @classmethod
-    def get_one_or_none(
+    async def get_one_or_none(
         cls, pk: int = None, telegram_id: int = None, login: str = None
     ) -> Optional[dict]:
         """Получает пользователя по идентификатору или возвращает None.
 
-        :param pk: ID пользователя.
+        :param pk: ID пользователя (при нескольких шардах уникален только внутри шарда).
         :param telegram_id: Telegram ID пользователя.
         :param login: Логин пользователя.
         :return: Словарь с данными пользователя или None, если пользователь не найден.
@@ -45,16 +99,32 @@ class UsersDAO:
         if not column:
             return None
 
-        query = f"SELECT * FROM users WHERE {column} = ?"
-        user_data = connection.execute_query(query=query, args=(value,))
+        if column == "telegram_id":
+            user = users_cache.get(telegram_id)
+            if user is not MISSING:
+                return dict(user) if user else None
+
+        query = cls.GET_USER_QUERY.format(column=column)
+        if column == "telegram_id":
+            user_data = await shards.for_user(telegram_id).execute_query(query=query, args=(value,))
+        else:
+            # Шард пользователя известен только по Telegram ID: ищем во всех шардах
+            results = await asyncio.gather(
+                *(shard.execute_query(query=query, args=(value,)) for shard in shards)
+            )
+            user_data = next((result for result in results if result), None)
+        user = cls.convert_user_result_to_dict(data=user_data) if user_data else None
 
-        if user_data:
-            return cls.convert_user_result_to_dict(data=user_data)
+        if user:
+            users_cache.set(user["telegram_id"], user)
+            return dict(user)
+        if column == "telegram_id":
+            users_cache.set(telegram_id, None, ttl=settings.USER_CACHE_NEGATIVE_TTL)
 
         return None
 
     @classmethod
-    def add_new_user(cls, data: dict) -> Optional[dict]:
+    async def add_new_user(cls, data: dict) -> Optional[dict]:
         """Добавляет нового пользователя в базу данных.
 
         :param data: Словарь с данными нового пользователя, должен содержать 'user_name',
@@ -64,13 +134,20 @@ class UsersDAO:
         name = data.get("user_name")
         login = data.get("login")
         telegram_id = data.get("telegram_id")
-        query = f"INSERT INTO users (name, login, telegram_id) VALUES (?, ?, ?);"
-        connection.execute_query(
-            query=query, commit=True, args=(name, login, telegram_id)
+        query = (
+            "INSERT INTO users (name, login, telegram_id) VALUES (?, ?, ?) "
+            "RETURNING id, name, login, telegram_id;"
         )
+        user_data = await shards.for_user(telegram_id).execute_insert(
+            query=query, args=(name, login, telegram_id)
+        )
+        users_cache.invalidate(telegram_id)
+        if user_data is None:
+            return None
 
-        user_id = connection.cursor.lastrowid
-        return cls.get_one_or_none(pk=user_id)
+        user = cls.convert_user_result_to_dict(data=user_data)
+        users_cache.set(telegram_id, user)
+        return dict(user)
 
 
 class TaskDAO:
@@ -80,52 +157,170 @@ class TaskDAO:
     получения всех задач для пользователя, а также изменения их статуса.
     """
 
+    # Описание задачи целиком не читается: карточке хватает начала описания и его длины,
+    # а спискам - только заголовков. Полное описание показывается по частям (get_description_part)
+    DESCRIPTION_PREVIEW_LENGTH = 300
+    TASK_COLUMNS = (
+        f"id, title, substr(description, 1, {DESCRIPTION_PREVIEW_LENGTH}), telegram_user_id, "
+        "length(description)"
+    )
+    TASK_TITLE_COLUMNS = "id, title, NULL, telegram_user_id, NULL"
+
+    GET_ALL_TASKS_QUERY = (
+        f"SELECT {TASK_COLUMNS} FROM tasks WHERE telegram_user_id=? "
+        "AND status=0 "
+        "AND is_deleted=0;"
+    )
+    # Запросы постраничной навигации по ключу (id задачи): каждый читает не больше одной строки
+    GET_TASK_QUERY = (
+        f"SELECT {TASK_COLUMNS} FROM tasks WHERE telegram_user_id=? "
+        "AND status=0 "
+        "AND is_deleted=0 "
+        "AND id=?;"
+    )
+    GET_NEXT_TASK_QUERY = (
+        f"SELECT {TASK_COLUMNS} FROM tasks WHERE telegram_user_id=? "
+        "AND status=0 "
+        "AND is_deleted=0 "
+        "AND id>? ORDER BY id LIMIT 1;"
+    )
+    GET_PREVIOUS_TASK_QUERY = (
+        f"SELECT {TASK_COLUMNS} FROM tasks WHERE telegram_user_id=? "
+        "AND status=0 "
+        "AND is_deleted=0 "
+        "AND id<? ORDER BY id DESC LIMIT 1;"
+    )
+    # Страницы списка задач и режима выбора, тоже по ключу. Описания не читаются
+    GET_TASKS_PAGE_QUERY = (
+        f"SELECT {TASK_TITLE_COLUMNS} FROM tasks WHERE telegram_user_id=? "
+        "AND status=0 "
+        "AND is_deleted=0 "
+        "AND id>? ORDER BY id LIMIT ?;"
+    )
+    GET_PREVIOUS_TASKS_PAGE_QUERY = (
+        f"SELECT {TASK_TITLE_COLUMNS} FROM tasks WHERE telegram_user_id=? "
+        "AND status=0 "
+        "AND is_deleted=0 "
+        "AND id<? ORDER BY id DESC LIMIT ?;"
+    )
+    # Массовые операции: набор ID передается одним параметром (JSON-массив), поэтому
+    # запрос один и тот же при любом количестве задач, а строки ищутся по первичному ключу
+    SELECTED_TASKS_FILTER = (
+        "WHERE id IN (SELECT value FROM json_each(?)) "
+        "AND telegram_user_id=? "
+        "AND status=0 "
+        "AND is_deleted=0;"
+    )
+    COMPLETE_TASKS_QUERY = (
+        "UPDATE tasks SET status=1, closed_at=strftime('%s', 'now') " + SELECTED_TASKS_FILTER
+    )
+    DELETE_TASKS_QUERY = (
+        "UPDATE tasks SET is_deleted=1, closed_at=strftime('%s', 'now') " + SELECTED_TASKS_FILTER
+    )
+    # Часть описания задачи для постраничного просмотра
+    GET_DESCRIPTION_PART_QUERY = (
+        "SELECT title, substr(description, ?, ?), length(description) FROM tasks "
+        "WHERE telegram_user_id=? "
+        "AND status=0 "
+        "AND is_deleted=0 "
+        "AND id=?;"
+    )
+    COUNT_TASKS_QUERY = (
+        "SELECT COUNT(*) FROM tasks WHERE telegram_user_id=? "
+        "AND status=0 "
+        "AND is_deleted=0;"
+    )
+    # Полнотекстовый поиск: в tasks_fts только активные задачи, порядок - по релевантности
+    SEARCH_TASKS_QUERY = (
+        f"SELECT tasks.id, tasks.title, substr(tasks.description, 1, {DESCRIPTION_PREVIEW_LENGTH}), "
+        "tasks.telegram_user_id, length(tasks.description) "
+        "FROM tasks_fts JOIN tasks ON tasks.id = tasks_fts.rowid "
+        "WHERE tasks_fts MATCH ? ORDER BY tasks_fts.rank LIMIT ? OFFSET ?;"
+    )
+
     @classmethod
     def convert_task_result_to_dict(cls, data: tuple) -> dict:
         """Конвертирует данные о задаче из кортежа в словарь.
 
         :param data: Кортеж с данными задачи из базы данных.
-        :return: Словарь с ключами 'id', 'title', 'description', 'telegram_id'.
+        :return: Словарь с ключами 'id', 'title', 'description' (начало описания или None),
+                 'telegram_id' и 'description_length' (полная длина описания или None).
         """
         result = {
             "id": data[0],
             "title": data[1],
             "description": data[2],
             "telegram_id": data[3],
+            "description_length": data[4],
         }
         return result
 
     @classmethod
-    def add_new_task(cls, data: dict, telegram_id) -> None:
+    async def _write(
+        cls, query: str, args: tuple, telegram_id: int, idempotency_key: Optional[str]
+    ) -> tuple:
+        """Выполняет запись в шард пользователя, если запись с тем же ключом идемпотентности
+        еще не выполнялась.
+
+        :return: Пара (выполнена ли запись, количество измененных строк). Повтор не выполняется
+                 и получает количество строк первой записи с тем же ключом; ошибка записи - (False, 0).
+        """
+        result = asyncio.get_running_loop().create_future()
+        first = claim_idempotency_key(idempotency_key, result)
+        if first is not None:
+            # Повтор ждет окончания первой записи и получает ее результат
+            return False, await asyncio.shield(first)
+
+        changed = 0
+        try:
+            changed = await shards.for_user(telegram_id).execute_query(
+                query=query, commit=True, args=args
+            )
+        except Exception as e:
+            # Запись не выполнена - повтор с тем же ключом должен пройти
+            if idempotency_key is not None:
+                idempotency_keys.invalidate(idempotency_key)
+            if not isinstance(e, sqlite3.DatabaseError):
+                raise
+            logging.warning(f"Запись пользователя {telegram_id} не выполнена: {e}")
+            return False, 0
+        finally:
+            result.set_result(changed)
+        return True, changed
+
+    @classmethod
+    async def add_new_task(
+        cls, data: dict, telegram_id, idempotency_key: Optional[str] = None
+    ) -> bool:
         """Добавляет новую задачу в базу данных.
 
         :param data: Словарь с данными новой задачи, должен содержать 'task_title'
                      и 'task_description'.
         :param telegram_id: Telegram ID пользователя, которому принадлежит задача.
+        :param idempotency_key: Ключ, по которому повтор добавления пропускается.
+        :return: True, если задача добавлена; False, если это повтор или ошибка записи.
         """
         title = data.get("task_title")
         description = data.get("task_description")
         status = False
 
         query = "INSERT INTO tasks (title, description, status, telegram_user_id) VALUES (?, ?, ?, ?);"
-        connection.execute_query(
-            query=query, commit=True, args=(title, description, status, telegram_id)
+        added, _ = await cls._write(
+            query, (title, description, status, telegram_id), telegram_id, idempotency_key
         )
+        if added:
+            invalidate_task_list(telegram_id)
+        return added
 
     @classmethod
-    def get_all_tasks(cls, telegram_id) -> Optional[list]:
-        """Получает все задачи пользователя.
+    async def get_all_tasks(cls, telegram_id) -> Optional[list]:
+        """Получает все задачи пользователя с началом описания.
 
         :param telegram_id: Telegram ID пользователя, для которого нужно получить задачи.
         :return: Список словарей с задачами или None, если задач нет.
         """
-        query = (
-            "SELECT id, title, description, telegram_user_id FROM tasks WHERE telegram_user_id=? "
-            "AND status=0 "
-            "AND is_deleted=0;"
-        )
-        tasks_data = connection.execute_query(
-            query=query, many=True, args=(telegram_id,)
+        tasks_data = await shards.for_user(telegram_id).execute_query(
+            query=cls.GET_ALL_TASKS_QUERY, many=True, args=(telegram_id,)
         )
         if tasks_data:
             return [
@@ -135,21 +330,258 @@ class TaskDAO:
         return None
 
     @classmethod
-    def mark_task_as_completed(cls, task_id: int, telegram_id: int) -> None:
+    async def _get_task_by_query(cls, query: str, telegram_id: int, task_id: int) -> Optional[dict]:
+        """Получает одну задачу запросом навигации.
+
+        :param query: Один из запросов навигации по задачам;
+        :param telegram_id: Telegram ID пользователя;
+        :param task_id: ID задачи (курсор).
+        :return: Словарь с задачей или None, если задача не найдена.
+        """
+        task_data = await shards.for_user(telegram_id).execute_query(
+            query=query, args=(telegram_id, task_id)
+        )
+        if task_data:
+            return cls.convert_task_result_to_dict(task_data)
+
+        return None
+
+    @classmethod
+    async def get_task(cls, task_id: int, telegram_id: int) -> Optional[dict]:
+        """Получает активную задачу пользователя по ID.
+
+        :param task_id: ID задачи.
+        :param telegram_id: Telegram ID пользователя, которому принадлежит задача.
+        :return: Словарь с задачей или None, если задача не найдена.
+        """
+        return await cls._get_task_by_query(cls.GET_TASK_QUERY, telegram_id, task_id)
+
+    @classmethod
+    async def get_first_task(cls, telegram_id: int) -> Optional[dict]:
+        """Получает первую активную задачу пользователя.
+
+        :param telegram_id: Telegram ID пользователя.
+        :return: Словарь с задачей или None, если задач нет.
+        """
+        return await cls.get_next_task(task_id=0, telegram_id=telegram_id)
+
+    @classmethod
+    async def get_next_task(cls, task_id: int, telegram_id: int) -> Optional[dict]:
+        """Получает активную задачу, следующую за задачей с указанным ID.
+
+        :param task_id: ID текущей задачи (курсор).
+        :param telegram_id: Telegram ID пользователя.
+        :return: Словарь с задачей или None, если текущая задача последняя.
+        """
+        return await cls._get_task_by_query(cls.GET_NEXT_TASK_QUERY, telegram_id, task_id)
+
+    @classmethod
+    async def get_previous_task(cls, task_id: int, telegram_id: int) -> Optional[dict]:
+        """Получает активную задачу, предшествующую задаче с указанным ID.
+
+        :param task_id: ID текущей задачи (курсор).
+        :param telegram_id: Telegram ID пользователя.
+        :return: Словарь с задачей или None, если текущая задача первая.
+        """
+        return await cls._get_task_by_query(cls.GET_PREVIOUS_TASK_QUERY, telegram_id, task_id)
+
+    @classmethod
+    async def get_tasks_page(cls, telegram_id: int, after_id: int, limit: int) -> list:
+        """Получает страницу активных задач, следующих за задачей с указанным ID.
+
+        :param telegram_id: Telegram ID пользователя.
+        :param after_id: ID задачи перед страницей (0 - с начала списка).
+        :param limit: Размер страницы.
+        :return: Список словарей с задачами в порядке ID.
+        """
+        tasks_data = await shards.for_user(telegram_id).execute_query(
+            query=cls.GET_TASKS_PAGE_QUERY, many=True, args=(telegram_id, after_id, limit)
+        )
+        return [cls.convert_task_result_to_dict(task_data) for task_data in tasks_data or ()]
+
+    @classmethod
+    async def get_previous_tasks_page(cls, telegram_id: int, before_id: int, limit: int) -> list:
+        """Получает страницу активных задач, предшествующих задаче с указанным ID.
+
+        :param telegram_id: Telegram ID пользователя.
+        :param before_id: ID первой задачи текущей страницы.
+        :param limit: Размер страницы.
+        :return: Список словарей с задачами в порядке ID.
+        """
+        tasks_data = await shards.for_user(telegram_id).execute_query(
+            query=cls.GET_PREVIOUS_TASKS_PAGE_QUERY, many=True, args=(telegram_id, before_id, limit)
+        )
+        return [cls.convert_task_result_to_dict(task_data) for task_data in reversed(tasks_data or ())]
+
+    @classmethod
+    def build_search_expression(cls, telegram_id: int, text: str) -> Optional[str]:
+        """Составляет выражение FTS5 MATCH из текста пользователя.
+
+        Каждое слово ищется по префиксу в заголовке и описании, все слова должны
+        встретиться в задаче. Спецсимволы FTS5 из текста не попадают в выражение.
+
+        :param telegram_id: Telegram ID пользователя, среди задач которого идет поиск.
+        :param text: Поисковый запрос пользователя.
+        :return: Выражение MATCH или None, если в запросе нет слов.
+        """
+        words = re.findall(r"\w+", text.lower())
+        if not words:
+            return None
+
+        terms = " ".join(f'"{word}"*' for word in words)
+        return f"telegram_user_id:{int(telegram_id)} AND {{title description}}:({terms})"
+
+    @classmethod
+    async def search_tasks(
+        cls, telegram_id: int, text: str, limit: int, offset: int = 0
+    ) -> list:
+        """Ищет активные задачи пользователя по словам из заголовка и описания.
+
+        :param telegram_id: Telegram ID пользователя.
+        :param text: Поисковый запрос.
+        :param limit: Максимальное количество задач в результате.
+        :param offset: Сколько лучших совпадений пропустить (для страниц).
+        :return: Список словарей с задачами, от наиболее к наименее подходящей.
+        """
+        expression = cls.build_search_expression(telegram_id, text)
+        if expression is None:
+            return []
+
+        tasks_data = await shards.for_user(telegram_id).execute_query(
+            query=cls.SEARCH_TASKS_QUERY, many=True, args=(expression, limit, offset)
+        )
+        return [cls.convert_task_result_to_dict(task_data) for task_data in tasks_data or ()]
+
+    @classmethod
+    async def get_description_part(
+        cls, task_id: int, telegram_id: int, start: int, length: int
+    ) -> Optional[dict]:
+        """Получает часть описания активной задачи, не читая описание целиком.
+
+        :param task_id: ID задачи.
+        :param telegram_id: Telegram ID пользователя, которому принадлежит задача.
+        :param start: Позиция первого символа части (с 1).
+        :param length: Длина части в символах.
+        :return: Словарь с ключами 'title', 'text' и 'description_length' или None,
+                 если задача не найдена.
+        """
+        result = await shards.for_user(telegram_id).execute_query(
+            query=cls.GET_DESCRIPTION_PART_QUERY, args=(start, length, telegram_id, task_id)
+        )
+        if not result:
+            return None
+
+        return {"title": result[0], "text": result[1] or "", "description_length": result[2] or 0}
+
+    @classmethod
+    async def count_tasks(cls, telegram_id: int) -> int:
+        """Считает активные задачи пользователя.
+
+        :param telegram_id: Telegram ID пользователя.
+        :return: Количество активных задач.
+        """
+        result = await shards.for_user(telegram_id).execute_query(
+            query=cls.COUNT_TASKS_QUERY, args=(telegram_id,)
+        )
+        return result[0] if result else 0
+
+    @classmethod
+    async def mark_task_as_completed(
+        cls, task_id: int, telegram_id: int, idempotency_key: Optional[str] = None
+    ) -> bool:
         """Отмечает задачу как выполненную.
 
         :param task_id: ID задачи, которую нужно отметить как выполненную.
         :param telegram_id: Telegram ID пользователя, которому принадлежит задача.
+        :param idempotency_key: Ключ, по которому повтор пропускается.
+        :return: True, если запись выполнена; False, если это повтор или ошибка записи.
         """
-        query = "UPDATE tasks SET status=1 WHERE id=? AND telegram_user_id=?;"
-        connection.execute_query(query=query, commit=True, args=(task_id, telegram_id))
+        query = (
+            "UPDATE tasks SET status=1, closed_at=strftime('%s', 'now') "
+            "WHERE id=? AND telegram_user_id=?;"
+        )
+        written, _ = await cls._write(query, (task_id, telegram_id), telegram_id, idempotency_key)
+        if written:
+            invalidate_task_list(telegram_id)
+        return written
 
     @classmethod
-    def delete_task(cls, task_id: int, telegram_id: int) -> None:
+    async def delete_task(
+        cls, task_id: int, telegram_id: int, idempotency_key: Optional[str] = None
+    ) -> bool:
         """Удаляет задачу.
 
         :param task_id: ID задачи, которую нужно удалить.
         :param telegram_id: Telegram ID пользователя, которому принадлежит задача.
+        :param idempotency_key: Ключ, по которому повтор пропускается.
+        :return: True, если запись выполнена; False, если это повтор или ошибка записи.
+        """
+        query = (
+            "UPDATE tasks SET is_deleted=1, closed_at=strftime('%s', 'now') "
+            "WHERE id=? AND telegram_user_id=?;"
+        )
+        written, _ = await cls._write(query, (task_id, telegram_id), telegram_id, idempotency_key)
+        if written:
+            invalidate_task_list(telegram_id)
+        return written
+
+    @classmethod
+    async def _write_many(
+        cls, query: str, task_ids: list, telegram_id: int, idempotency_key: Optional[str]
+    ) -> int:
+        """Применяет запрос массовой операции к выбранным активным задачам пользователя.
+
+        Все задачи обновляются одним запросом в одной транзакции, количество обновленных
+        задач - количество строк, измененных этим запросом.
+
+        :return: Количество обновленных задач. Для повтора - результат первой записи с тем же
+                 ключом; 0 при ошибке записи или если задачи уже неактивны.
+        """
+        args = (json.dumps(list(task_ids)), telegram_id)
+        written, count = await cls._write(query, args, telegram_id, idempotency_key)
+        if written and count:
+            invalidate_task_list(telegram_id)
+        return count
+
+    @classmethod
+    async def mark_tasks_as_completed(
+        cls, task_ids: list, telegram_id: int, idempotency_key: Optional[str] = None
+    ) -> int:
+        """Отмечает несколько задач как выполненные.
+
+        :param task_ids: ID задач, которые нужно отметить как выполненные.
+        :param telegram_id: Telegram ID пользователя, которому принадлежат задачи.
+        :param idempotency_key: Ключ, по которому повтор пропускается.
+        :return: Количество выполненных задач (для повтора - результат первого нажатия).
         """
-        query = "UPDATE tasks SET is_deleted=1 WHERE id=? AND telegram_user_id=?;"
-        connection.execute_query(query=query, commit=True, args=(task_id, telegram_id))
+        return await cls._write_many(cls.COMPLETE_TASKS_QUERY, task_ids, telegram_id, idempotency_key)
+
+    @classmethod
+    async def delete_tasks(
+        cls, task_ids: list, telegram_id: int, idempotency_key: Optional[str] = None
+    ) -> int:
+        """Удаляет несколько задач.
+
+        :param task_ids: ID задач, которые нужно удалить.
+        :param telegram_id: Telegram ID пользователя, которому принадлежат задачи.
+        :param idempotency_key: Ключ, по которому повтор пропускается.
+        :return: Количество удаленных задач (для повтора - результат первого нажатия).
+        """
+        return await cls._write_many(cls.DELETE_TASKS_QUERY, task_ids, telegram_id, idempotency_key)
+
+
+# Запросы, которые выполняются почти на каждое действие пользователя.
+# При запуске бота для них проверяется план выполнения (см. Connection.check_query_plans).
+HOT_QUERIES = (
+    (UsersDAO.GET_USER_QUERY.format(column="id"), (0,)),
+    (UsersDAO.GET_USER_QUERY.format(column="telegram_id"), (0,)),
+    (UsersDAO.GET_USER_QUERY.format(column="login"), ("",)),
+    (TaskDAO.GET_ALL_TASKS_QUERY, (0,)),
+    (TaskDAO.GET_TASK_QUERY, (0, 0)),
+    (TaskDAO.GET_NEXT_TASK_QUERY, (0, 0)),
+    (TaskDAO.GET_PREVIOUS_TASK_QUERY, (0, 0)),
+    (TaskDAO.COUNT_TASKS_QUERY, (0,)),
+    (TaskDAO.GET_TASKS_PAGE_QUERY, (0, 0, 1)),
+    (TaskDAO.GET_PREVIOUS_TASKS_PAGE_QUERY, (0, 0, 1)),
+    (TaskDAO.GET_DESCRIPTION_PART_QUERY, (1, 1, 0, 0)),
+)
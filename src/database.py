@@ -1,27 +1,134 @@
+import asyncio
 import logging
 import sqlite3
-from typing import Union
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from typing import Optional, Union
+from urllib.request import pathname2url
 
-from utils import singleton
+from config import settings
+from tracing import record_db
+from utils import get_shard_db_names, singleton
+
+
+class WriteStats:
+    """Счетчики группового коммита: размеры пачек и задержка их сброса."""
+
+    def __init__(self):
+        self.batches = 0  # Количество выполненных коммитов
+        self.writes = 0  # Количество записей во всех пачках
+        self.max_batch_size = 0
+        self.total_flush_time = 0.0  # Суммарное время сброса пачек в секундах
+        self.last_flush_time = 0.0
+
+    def register(self, batch_size: int, flush_time: float) -> None:
+        """Учитывает сброшенную пачку записей.
+
+        :param batch_size: Количество записей в пачке;
+        :param flush_time: Время выполнения пачки вместе с коммитом в секундах.
+        """
+        self.batches += 1
+        self.writes += batch_size
+        self.max_batch_size = max(self.max_batch_size, batch_size)
+        self.total_flush_time += flush_time
+        self.last_flush_time = flush_time
+
+    def as_dict(self) -> dict:
+        """Возвращает снимок счетчиков."""
+        return {
+            "batches": self.batches,
+            "writes": self.writes,
+            "avg_batch_size": self.writes / self.batches if self.batches else 0.0,
+            "max_batch_size": self.max_batch_size,
+            "avg_flush_ms": self.total_flush_time / self.batches * 1000 if self.batches else 0.0,
+            "last_flush_ms": self.last_flush_time * 1000,
+        }
 
 
-@singleton
 class Connection:
     """Класс для управления подключением к базе данных SQLite и выполнения запросов.
 
     Инициализирует подключение к базе данных, создает необходимые таблицы (если их нет),
     а также предоставляет методы для выполнения запросов с возможностью возврата одного или
     множества результатов, а также коммитов изменений.
+
+    Все обращения к SQLite выполняются в отдельных потоках базы данных, поэтому
+    запросы не блокируют цикл событий aiogram, пока идет чтение или fsync.
+    База работает в режиме WAL: записи идут через одно соединение в потоке записи,
+    а чтения - через пул соединений только для чтения, каждое в своем потоке.
+    Читатели видят последнее закоммиченное состояние и не ждут записи и друг друга.
+
+    Записи не коммитятся по одной: они копятся в очереди до `flush_interval_ms`
+    миллисекунд или до `batch_size` штук и выполняются одной транзакцией.
+    Вызывающий получает результат только после коммита своей пачки.
+
+    На каждый файл базы (шард, см. `ShardedConnection`) создается свой экземпляр.
     """
 
-    def __init__(self, db_name: str):
-        """Инициализация соединения с базой данных и создание курсора.
+    def __init__(
+        self,
+        db_name: str,
+        flush_interval_ms: float = settings.DB_FLUSH_INTERVAL_MS,
+        batch_size: int = settings.DB_BATCH_SIZE,
+        readers: int = settings.DB_READERS,
+    ):
+        """Инициализация потоков базы данных и соединений с ней.
+
+        :param db_name: Название файла базы данных SQLite;
+        :param flush_interval_ms: Сколько миллисекунд ждать новые записи перед коммитом;
+        :param batch_size: Максимальное количество записей в одной транзакции;
+        :param readers: Количество соединений только для чтения (0 - читать через соединение записи).
+        """
+        self.db_name = db_name
+        self.flush_interval = max(flush_interval_ms, 0) / 1000
+        self.batch_size = max(batch_size, 1)
+        self.write_stats = WriteStats()
+        self._write_queue: Optional[asyncio.Queue] = None
+        self._writer_task: Optional[asyncio.Task] = None
+        # Один поток - одно соединение: sqlite3 не допускает использование
+        # соединения из разных потоков, а запросы выполняются строго по очереди.
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="sqlite")
+        self.connection = self._executor.submit(self._connect, db_name).result()
+        self._executor.submit(self._init_database).result()
+        # Соединения читателей открываются при запуске их потоков, по одному на поток
+        self._reader_local = threading.local()
+        self._readers = []
+        self._readers_lock = threading.Lock()
+        self._reader_executor = None
+        if readers > 0:
+            self._reader_executor = ThreadPoolExecutor(
+                max_workers=readers, thread_name_prefix="sqlite-reader", initializer=self._open_reader
+            )
+
+    @staticmethod
+    def _connect(db_name: str, read_only: bool = False) -> sqlite3.Connection:
+        """Открывает соединение с базой данных и настраивает его PRAGMA.
 
-        :param db_name: Название файла базы данных SQLite.
+        :param db_name: Название файла базы данных SQLite;
+        :param read_only: Открыть соединение только для чтения.
         """
-        self.connection = sqlite3.connect(db_name)
-        self.cursor = self.connection.cursor()
-        self._init_database()
+        if read_only:
+            # Соединение читателя используется только своим потоком, а закрывается при остановке пула
+            connection = sqlite3.connect(
+                f"file:{pathname2url(db_name)}?mode=ro", uri=True, check_same_thread=False
+            )
+        else:
+            connection = sqlite3.connect(db_name)
+            connection.execute(f"PRAGMA synchronous={settings.DB_SYNCHRONOUS};")
+        connection.execute(f"PRAGMA cache_size=-{int(settings.DB_CACHE_SIZE_KB)};")
+        connection.execute(f"PRAGMA mmap_size={int(settings.DB_MMAP_SIZE)};")
+        # Обслуживание базы (VACUUM) ненадолго блокирует и читателей
+        connection.execute("PRAGMA busy_timeout=5000;")
+        return connection
+
+    def _open_reader(self) -> None:
+        """Открывает соединение только для чтения в потоке читателя."""
+        connection = self._connect(self.db_name, read_only=True)
+        self._reader_local.connection = connection
+        with self._readers_lock:
+            self._readers.append(connection)
 
     def _init_database(self):
         """Инициализация таблиц базы данных.
@@ -29,6 +136,17 @@ class Connection:
         Создает таблицы `users` и `tasks`, если они еще не существуют, а также
         индексы для оптимизации запросов к базе данных.
         """
+        cursor = self.connection.cursor()
+        # В новой базе включаем постепенное освобождение места (см. maintenance):
+        # режим auto_vacuum можно сменить без полного VACUUM только до создания таблиц
+        if not cursor.execute("SELECT COUNT(*) FROM sqlite_master;").fetchone()[0]:
+            cursor.execute("PRAGMA auto_vacuum=INCREMENTAL;")
+        # Режим WAL сохраняется в файле базы: читатели не блокируются записью
+        cursor.execute("PRAGMA journal_mode=WAL;")
+        # Схема создается одной транзакцией под блокировкой записи: в многопроцессном режиме
+        # воркеры одновременно открывают один файл, и проверки "уже создано" должен
+        # выполнять только один из них
+        cursor.execute("BEGIN IMMEDIATE;")
         query_for_init_users_table = (
             "CREATE TABLE IF NOT EXISTS users("
             "id INTEGER PRIMARY KEY AUTOINCREMENT,"
@@ -40,8 +158,8 @@ class Connection:
         query_for_add_creating_index = (
             "CREATE INDEX IF NOT EXISTS idx_telegram_id ON users(telegram_id);"
         )
-        self.cursor.execute(query_for_init_users_table)
-        self.cursor.execute(query_for_add_creating_index)
+        cursor.execute(query_for_init_users_table)
+        cursor.execute(query_for_add_creating_index)
 
         query_for_init_task_table = (
             "CREATE TABLE IF NOT EXISTS tasks("
@@ -51,44 +169,420 @@ class Connection:
             "status BOOLEAN,"  # False, если задача не выполнена
             "is_deleted BOOLEAN DEFAULT FALSE,"
             "telegram_user_id INTEGER,"
+            "closed_at INTEGER,"  # Unix-время выполнения или удаления задачи
             "FOREIGN KEY (telegram_user_id) REFERENCES users(telegram_id)"
             ");"
         )
-        self.cursor.execute(query_for_init_task_table)
+        cursor.execute(query_for_init_task_table)
+
+        query_for_add_login_index = (
+            "CREATE INDEX IF NOT EXISTS idx_users_login ON users(login);"
+        )
+        # Частичный индекс только по активным задачам: список задач пользователя
+        # читается из него без обхода выполненных и удаленных строк.
+        query_for_add_active_tasks_index = (
+            "CREATE INDEX IF NOT EXISTS idx_tasks_active "
+            "ON tasks(telegram_user_id, id) "
+            "WHERE status=0 AND is_deleted=0;"
+        )
+        cursor.execute(query_for_add_login_index)
+        cursor.execute(query_for_add_active_tasks_index)
+        self._add_closed_at_column(cursor)
+        # Частичный индекс по выполненным и удаленным задачам для их переноса в архив
+        query_for_add_closed_tasks_index = (
+            "CREATE INDEX IF NOT EXISTS idx_tasks_closed "
+            "ON tasks(closed_at) "
+            "WHERE status=1 OR is_deleted=1;"
+        )
+        cursor.execute(query_for_add_closed_tasks_index)
+        self._init_search_index(cursor)
         self.connection.commit()
+        cursor.close()
 
-    def execute_query(
-        self, query: str, many: bool = False, commit: bool = False, args: tuple = None
+    @staticmethod
+    def _add_closed_at_column(cursor: sqlite3.Cursor) -> None:
+        """Добавляет столбец `closed_at` в таблицу задач, созданную до его появления.
+
+        Время закрытия уже выполненных и удаленных задач неизвестно, им ставится 0,
+        и они попадают в архив при первом обслуживании.
+        """
+        columns = [row[1] for row in cursor.execute("PRAGMA table_info(tasks);")]
+        if "closed_at" in columns:
+            return
+
+        cursor.execute("ALTER TABLE tasks ADD COLUMN closed_at INTEGER;")
+        cursor.execute("UPDATE tasks SET closed_at=0 WHERE status=1 OR is_deleted=1;")
+
+    @staticmethod
+    def _init_search_index(cursor: sqlite3.Cursor) -> None:
+        """Создает полнотекстовый индекс FTS5 по заголовкам и описаниям активных задач.
+
+        Индекс хранит только токены (содержимое берется из `tasks`) и поддерживается
+        триггерами: задача попадает в индекс при добавлении и убирается из него при
+        выполнении или удалении. Telegram ID владельца тоже индексируется, чтобы поиск
+        сразу ограничивался задачами пользователя.
+        """
+        exists = cursor.execute(
+            "SELECT 1 FROM sqlite_master WHERE type='table' AND name='tasks_fts';"
+        ).fetchone()
+        if exists:
+            return
+
+        cursor.execute(
+            "CREATE VIRTUAL TABLE IF NOT EXISTS tasks_fts USING fts5("
+            "title, description, telegram_user_id,"
+            "content='tasks', content_rowid='id',"
+            "tokenize='unicode61 remove_diacritics 2'"
+            ");"
+        )
+        # Ранжирование: совпадение в заголовке весит больше, чем в описании
+        cursor.execute(
+            "INSERT INTO tasks_fts(tasks_fts, rank) VALUES('rank', 'bm25(10.0, 1.0, 0.0)');"
+        )
+
+        insert_new = (
+            "INSERT INTO tasks_fts(rowid, title, description, telegram_user_id) "
+            "VALUES (new.id, new.title, new.description, new.telegram_user_id);"
+        )
+        delete_old = (
+            "INSERT INTO tasks_fts(tasks_fts, rowid, title, description, telegram_user_id) "
+            "VALUES ('delete', old.id, old.title, old.description, old.telegram_user_id);"
+        )
+        cursor.execute(
+            "CREATE TRIGGER IF NOT EXISTS tasks_fts_insert AFTER INSERT ON tasks "
+            f"WHEN new.status=0 AND new.is_deleted=0 BEGIN {insert_new} END;"
+        )
+        cursor.execute(
+            "CREATE TRIGGER IF NOT EXISTS tasks_fts_update_old AFTER UPDATE ON tasks "
+            f"WHEN old.status=0 AND old.is_deleted=0 BEGIN {delete_old} END;"
+        )
+        cursor.execute(
+            "CREATE TRIGGER IF NOT EXISTS tasks_fts_update_new AFTER UPDATE ON tasks "
+            f"WHEN new.status=0 AND new.is_deleted=0 BEGIN {insert_new} END;"
+        )
+        cursor.execute(
+            "CREATE TRIGGER IF NOT EXISTS tasks_fts_delete AFTER DELETE ON tasks "
+            f"WHEN old.status=0 AND old.is_deleted=0 BEGIN {delete_old} END;"
+        )
+        # Индексируем задачи, добавленные до появления поиска
+        cursor.execute(
+            "INSERT INTO tasks_fts(rowid, title, description, telegram_user_id) "
+            "SELECT id, title, description, telegram_user_id FROM tasks "
+            "WHERE status=0 AND is_deleted=0;"
+        )
+
+    def _explain(self, queries) -> list:
+        """Синхронно получает планы выполнения запросов.
+
+        :param queries: Последовательность пар (запрос, параметры);
+        :return: Список пар (запрос, строки плана с полными обходами таблиц).
+        """
+        full_scans = []
+        cursor = self.connection.cursor()
+        try:
+            for query, args in queries:
+                plan = cursor.execute(f"EXPLAIN QUERY PLAN {query}", args or ()).fetchall()
+                # Четвертый столбец плана - описание шага, например "SCAN tasks".
+                # Обход виртуальной таблицы (json_each со списком ID) - это обход параметра, а не таблицы
+                scans = [
+                    row[3] for row in plan
+                    if row[3].startswith("SCAN") and "VIRTUAL TABLE" not in row[3]
+                ]
+                if scans:
+                    full_scans.append((query, scans))
+        finally:
+            cursor.close()
+        return full_scans
+
+    async def check_query_plans(self, queries) -> list:
+        """Проверяет, что запросы не делают полный обход таблиц.
+
+        Для каждого запроса выполняется `EXPLAIN QUERY PLAN`, и на каждый полный
+        обход таблицы пишется предупреждение в лог.
+
+        :param queries: Последовательность пар (запрос, параметры);
+        :return: Список пар (запрос, строки плана с полными обходами таблиц).
+        """
+        full_scans = await self._run(self._explain, queries)
+        for query, scans in full_scans:
+            logging.warning(f"Полный обход таблицы в запросе {query!r}: {'; '.join(scans)}")
+        return full_scans
+
+    def _execute(
+        self,
+        query: str,
+        many: bool = False,
+        commit: bool = False,
+        args: tuple = None,
+        connection: sqlite3.Connection = None,
     ) -> Union[tuple, list, None]:
+        """Синхронно выполняет запрос в потоке базы данных.
+
+        Для каждого вызова создается свой курсор.
+
+        :param connection: Соединение потока, в котором выполняется запрос (по умолчанию - соединение записи).
+        """
+        connection = connection or self.connection
+        cursor = connection.cursor()
+        try:
+            result = cursor.execute(query, args or ())
+            if commit:
+                returned = result.fetchone() if result.description else None
+                connection.commit()
+                return returned
+
+            if many:
+                return result.fetchall()
+            return result.fetchone()
+
+        except sqlite3.DatabaseError as e:
+            logging.debug(f"Ошибка выполнения запроса: {e}")
+            return None
+        finally:
+            cursor.close()
+
+    def _execute_batch(self, batch: list) -> list:
+        """Синхронно выполняет пачку записей одной транзакцией.
+
+        Каждая запись выполняется в своей точке сохранения, поэтому ошибка одной
+        записи не откатывает остальные.
+
+        :param batch: Список пар (запрос, параметры);
+        :return: Список результатов записей: строка, возвращенная `RETURNING` (для записей
+                 без `RETURNING` - количество измененных строк), или исключение, если запись
+                 не выполнена. Если откатилась
+                 вся транзакция, исключение возвращается для каждой записи.
+        """
+        results = []
+        cursor = self.connection.cursor()
+        try:
+            # Блокировка записи берется сразу: в многопроцессном режиме в файл могут писать
+            # несколько воркеров, и ожидание блокировки покрывает busy_timeout
+            cursor.execute("BEGIN IMMEDIATE;")
+            for query, args in batch:
+                cursor.execute("SAVEPOINT write;")
+                try:
+                    cursor.execute(query, args or ())
+                    # Строки RETURNING нужно дочитать до следующего запроса курсора
+                    if cursor.description:
+                        returned = cursor.fetchall()
+                        results.append(returned[0] if returned else None)
+                    else:
+                        results.append(cursor.rowcount)
+                    cursor.execute("RELEASE write;")
+                except sqlite3.DatabaseError as e:
+                    logging.debug(f"Ошибка выполнения запроса: {e}")
+                    cursor.execute("ROLLBACK TO write;")
+                    cursor.execute("RELEASE write;")
+                    results.append(e)
+            self.connection.commit()
+        except sqlite3.DatabaseError as e:
+            logging.warning(f"Ошибка коммита пачки записей: {e}")
+            self.connection.rollback()
+            results = [e] * len(batch)
+        finally:
+            cursor.close()
+        return results
+
+    async def _writer(self) -> None:
+        """Фоновая задача группового коммита."""
+        loop = asyncio.get_running_loop()
+        queue = self._write_queue
+        while True:
+            batch = [await queue.get()]
+            deadline = loop.time() + self.flush_interval
+            while len(batch) < self.batch_size:
+                if not queue.empty():
+                    batch.append(queue.get_nowait())
+                    continue
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+
+            started = time.perf_counter()
+            try:
+                results = await self._run(
+                    self._execute_batch, [(query, args) for query, args, _ in batch]
+                )
+            except Exception as e:
+                for _, _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+            else:
+                for (_, _, future), result in zip(batch, results):
+                    if future.done():
+                        continue
+                    if isinstance(result, Exception):
+                        future.set_exception(result)
+                    else:
+                        future.set_result(result)
+            self.write_stats.register(len(batch), time.perf_counter() - started)
+            for _ in batch:
+                queue.task_done()
+
+    def _ensure_writer(self) -> asyncio.Queue:
+        """Запускает задачу группового коммита в текущем цикле событий."""
+        if self._writer_task is None or self._writer_task.done() or (
+            self._writer_task.get_loop() is not asyncio.get_running_loop()
+        ):
+            self._write_queue = asyncio.Queue()
+            self._writer_task = asyncio.create_task(self._writer())
+        return self._write_queue
+
+    async def execute_write(self, query: str, args: tuple = None) -> Union[tuple, int, None]:
+        """Ставит запись в очередь группового коммита и ждет ее коммита.
+
+        :param query: SQL-запрос для выполнения;
+        :param args: Параметры для подстановки в SQL-запрос.
+        :return: Строка, возвращенная `RETURNING`, либо количество измененных строк (запрос без `RETURNING`).
+        :raises sqlite3.DatabaseError: Если запись не выполнена или транзакция откатилась.
+        """
+        queue = self._ensure_writer()
+        future = asyncio.get_running_loop().create_future()
+        queue.put_nowait((query, args, future))
+        return await future
+
+    async def flush(self) -> None:
+        """Дожидается коммита всех записей, поставленных в очередь."""
+        if self._write_queue is not None and not self._writer_task.done():
+            await self._write_queue.join()
+
+    async def _run(self, func, *args, **kwargs):
+        """Выполняет функцию в потоке записи, не блокируя цикл событий."""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, partial(func, *args, **kwargs))
+
+    def _read(self, query: str, many: bool, args: tuple) -> Union[tuple, list, None]:
+        """Синхронно выполняет чтение через соединение текущего потока читателя."""
+        return self._execute(query, many=many, args=args, connection=self._reader_local.connection)
+
+    async def _run_read(self, query: str, many: bool, args: tuple) -> Union[tuple, list, None]:
+        """Выполняет чтение в свободном потоке читателя, а без читателей - в потоке записи."""
+        if self._reader_executor is None:
+            return await self._run(self._execute, query=query, many=many, args=args)
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._reader_executor, self._read, query, many, args)
+
+    async def execute_in_thread(self, func, *args):
+        """Выполняет `func(connection, *args)` в потоке базы данных.
+
+        Нужен для обслуживания базы, которое выполняет несколько запросов и управляет
+        транзакцией само. Пока функция работает, остальные запросы ждут, поэтому она
+        должна делать ограниченный объем работы за вызов.
+
+        :return: Результат функции.
+        """
+        return await self._run(func, self.connection, *args)
+
+    async def execute_query(
+        self, query: str, many: bool = False, commit: bool = False, args: tuple = None
+    ) -> Union[tuple, list, int, None]:
         """Выполняет запрос к базе данных с возможностью возврата одного или нескольких результатов.
 
         :param query: SQL-запрос для выполнения;
         :param many: Если True, возвращает множество результатов (список), иначе — один результат (кортеж);
-        :param commit: Если True, выполняется коммит для сохранения изменений в базе данных;
+        :param commit: Если True, запрос выполняется через групповой коммит;
         :param args: Параметры для подстановки в SQL-запрос.
-        :return: Возвращает результат запроса (один кортеж или список кортежей) либо None, если выполняется коммит.
+        :return: Возвращает результат запроса (один кортеж или список кортежей) либо количество измененных строк, если выполняется коммит.
+        :raises sqlite3.DatabaseError: Если запись с `commit=True` не выполнена.
         """
+        started = time.perf_counter()
         try:
-            result = self.cursor.execute(query, args)
             if commit:
-                self.connection.commit()
-                return None
+                return await self.execute_write(query=query, args=args)
+            return await self._run_read(query=query, many=many, args=args)
+        finally:
+            record_db(query, time.perf_counter() - started)
 
-            if many:
-                return result.fetchall()
-            return result.fetchone()
+    async def execute_insert(self, query: str, args: tuple = None) -> Union[tuple, None]:
+        """Выполняет INSERT ... RETURNING с коммитом и возвращает добавленную строку.
 
+        :param query: SQL-запрос для выполнения (столбцы результата перечисляются в `RETURNING`);
+        :param args: Параметры для подстановки в SQL-запрос.
+        :return: Строка из `RETURNING` либо None в случае ошибки.
+        """
+        started = time.perf_counter()
+        try:
+            return await self.execute_write(query=query, args=args)
         except sqlite3.DatabaseError as e:
             logging.debug(f"Ошибка выполнения запроса: {e}")
             return None
+        finally:
+            record_db(query, time.perf_counter() - started)
+
+    def close(self) -> None:
+        """Закрывает соединения и останавливает потоки базы данных."""
+        if self._executor is None:
+            return
+        if self._reader_executor is not None:
+            self._reader_executor.shutdown(wait=True)
+            self._reader_executor = None
+            for reader in self._readers:
+                reader.close()
+            self._readers.clear()
+        try:
+            self._executor.submit(self.connection.close).result()
+        except RuntimeError:
+            # Пул потоков уже остановлен при завершении интерпретатора
+            pass
+        self._executor.shutdown(wait=True)
+        self._executor = None
 
     def __del__(self):
-        """Закрывает соединение и курсор при удалении экземпляра класса или завершении программы."""
-        if hasattr(self, 'cursor') and self.cursor:
-            self.cursor.close()
-        if hasattr(self, 'connection') and self.connection:
-            self.connection.close()
+        """Закрывает соединение при удалении экземпляра класса или завершении программы."""
+        if getattr(self, "_executor", None) is not None:
+            self.close()
+
+
+@singleton
+class ShardedConnection:
+    """Хранилище, разделенное на несколько файлов SQLite по Telegram ID пользователя.
+
+    Пользователь и все его задачи хранятся в шарде `telegram_id % count`. У каждого
+    шарда свое соединение, свой поток базы данных и свой групповой коммит, поэтому
+    записи пользователей разных шардов не ждут блокировку одного файла.
+    Количество шардов меняется только офлайн (см. `resharding`).
+    """
+
+    def __init__(self, db_name: str, count: int = 1):
+        """
+        :param db_name: Имя файла базы данных (при нескольких шардах - основа имен файлов);
+        :param count: Количество шардов.
+        """
+        self.connections = [Connection(db_name=name) for name in get_shard_db_names(db_name, count)]
+
+    def shard_index(self, telegram_id: int) -> int:
+        """Номер шарда пользователя."""
+        return int(telegram_id) % len(self.connections)
+
+    def for_user(self, telegram_id: int) -> Connection:
+        """Соединение с шардом, в котором хранятся данные пользователя."""
+        return self.connections[self.shard_index(telegram_id)]
+
+    async def flush(self) -> None:
+        """Дожидается коммита записей во всех шардах."""
+        await asyncio.gather(*(connection.flush() for connection in self.connections))
+
+    async def check_query_plans(self, queries) -> list:
+        """Проверяет планы запросов. Схема у шардов одна, поэтому достаточно первого."""
+        return await self.connections[0].check_query_plans(queries)
+
+    def write_stats(self) -> list:
+        """Счетчики группового коммита каждого шарда."""
+        return [connection.write_stats.as_dict() for connection in self.connections]
+
+    def __iter__(self):
+        return iter(self.connections)
+
+    def __len__(self) -> int:
+        return len(self.connections)
 
 
-# Создание экземпляра соединения с базой данных
-connection = Connection(db_name="/src/todo_db.db")
+# Создание соединений с базой данных (по одному на шард)
+shards = ShardedConnection(db_name=settings.DB_NAME, count=settings.DB_SHARDS)
+# Соединение первого шарда. При DB_SHARDS=1 это единственная база бота (бенчмарки, обслуживание)
+connection = shards.connections[0]
@@ -0,0 +1,285 @@
+import asyncio
+import contextlib
+import logging
+import time
+from collections import deque
+from typing import Any, Awaitable, Callable, Dict, Iterable, Optional
+
+from aiogram import BaseMiddleware, F, Router
+from aiogram.types import CallbackQuery, Message, TelegramObject, Update, User
+
+from caches import MISSING, LRUCache
+from tracing import trace_handler
+from utils import fsm
+
+# Ключ индекса для хэндлеров, которые срабатывают на любой текст или callback_data
+ANY_KEY = None
+# Состояние индекса для хэндлеров, которые срабатывают в любом состоянии
+ANY_STATE = None
+
+
+class StateIndex:
+    """Индекс хэндлеров по (тип обновления, состояние FSM, текст или callback_data).
+
+    Позволяет найти хэндлер обновления одним обращением к словарю вместо
+    последовательной проверки фильтров всех роутеров.
+    """
+
+    def __init__(self):
+        self._handlers = {}  # (тип обновления, состояние, ключ) -> хэндлер
+
+    def register(
+        self, event_type: str, state: Optional[str], key: Optional[str], handler: Callable
+    ) -> None:
+        """Добавляет хэндлер в индекс. Первый зарегистрированный хэндлер имеет приоритет,
+        как и при обходе роутеров.
+
+        :param event_type: "message" или "callback_query";
+        :param state: Состояние FSM или ANY_STATE;
+        :param key: Текст сообщения, callback_data или ANY_KEY;
+        :param handler: Хэндлер обновления.
+        """
+        self._handlers.setdefault((event_type, state, key), handler)
+
+    def resolve(self, event_type: str, state: Optional[str], key: str) -> Optional[Callable]:
+        """Находит хэндлер обновления.
+
+        Порядок поиска повторяет порядок роутеров: сначала команды, которые работают
+        в любом состоянии, затем точное совпадение в текущем состоянии, затем
+        хэндлер на любой текст в текущем состоянии.
+
+        :return: Хэндлер или None, если обновление нужно отдать роутерам.
+        """
+        handlers = self._handlers
+        return (
+            handlers.get((event_type, ANY_STATE, key))
+            or handlers.get((event_type, state, key))
+            or handlers.get((event_type, state, ANY_KEY))
+        )
+
+    def __len__(self) -> int:
+        return len(self._handlers)
+
+
+state_index = StateIndex()
+
+
+class IndexedRouter(Router):
+    """Роутер, который дополнительно регистрирует хэндлеры в `state_index`.
+
+    Хэндлеры, зарегистрированные через `state_message` и `state_callback_query`,
+    получают и обычные фильтры aiogram, поэтому роутер работает и без
+    `StateDispatchMiddleware`.
+    """
+
+    def state_message(self, state: Optional[str] = ANY_STATE, text: Optional[str] = ANY_KEY):
+        """Регистрирует хэндлер текстового сообщения.
+
+        :param state: Состояние FSM, в котором срабатывает хэндлер (ANY_STATE - в любом);
+        :param text: Текст сообщения (ANY_KEY - любой текст).
+        """
+        filters = [F.text if text is ANY_KEY else F.text == text]
+        if state is not ANY_STATE:
+            filters.append(lambda message: fsm.get_state(message.from_user.id) == state)
+
+        def decorator(handler: Callable) -> Callable:
+            state_index.register("message", state, text, handler)
+            return self.message(*filters)(handler)
+
+        return decorator
+
+    def state_callback_query(
+        self, state: Optional[str] = ANY_STATE, data: Optional[Iterable[str]] = ANY_KEY
+    ):
+        """Регистрирует хэндлер нажатия на inline-кнопку.
+
+        :param state: Состояние FSM, в котором срабатывает хэндлер (ANY_STATE - в любом);
+        :param data: Значения callback_data (ANY_KEY - любые).
+        """
+        data = ANY_KEY if data is ANY_KEY else tuple(data)
+        filters = [F.data if data is ANY_KEY else F.data.in_(data)]
+        if state is not ANY_STATE:
+            filters.append(lambda callback: fsm.get_state(callback.from_user.id) == state)
+
+        def decorator(handler: Callable) -> Callable:
+            for key in (ANY_KEY,) if data is ANY_KEY else data:
+                state_index.register("callback_query", state, key, handler)
+            return self.callback_query(*filters)(handler)
+
+        return decorator
+
+
+class StateDispatchMiddleware(BaseMiddleware):
+    """Внешняя мидлварь диспетчера, которая вызывает хэндлер из `state_index` напрямую.
+
+    Если в индексе подходящего хэндлера нет, обновление обрабатывается
+    обычной цепочкой роутеров.
+    """
+
+    def __init__(self, index: StateIndex = state_index):
+        self.index = index
+        self.hits = 0  # Обновления, обработанные через индекс
+        self.misses = 0  # Обновления, отданные роутерам
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any],
+    ) -> Any:
+        if isinstance(event, Message):
+            event_type, key = "message", event.text
+        elif isinstance(event, CallbackQuery):
+            event_type, key = "callback_query", event.data
+        else:
+            event_type, key = None, None
+
+        if key and event.from_user:
+            indexed_handler = self.index.resolve(
+                event_type, fsm.get_state(event.from_user.id), key
+            )
+            if indexed_handler is not None:
+                self.hits += 1
+                return await trace_handler(indexed_handler, event)
+
+        self.misses += 1
+        return await handler(event, data)
+
+
+class PerUserOrderMiddleware(BaseMiddleware):
+    """Внешняя мидлварь обновлений: обновления одного пользователя обрабатываются по очереди,
+    обновления разных пользователей - одновременно.
+
+    На каждого пользователя, у которого есть обновления в обработке, заводится замок;
+    когда очередь пользователя пустеет, замок удаляется, поэтому память занимают только
+    активные пользователи. Количество одновременно работающих хэндлеров ограничено
+    `max_workers`, а очередь одного пользователя - `max_pending_per_user` обновлениями
+    (лишние обновления отбрасываются).
+    """
+
+    def __init__(self, max_workers: int = 100, max_pending_per_user: int = 32):
+        """
+        :param max_workers: Максимум одновременно обрабатываемых обновлений (0 - без ограничения);
+        :param max_pending_per_user: Максимум обновлений одного пользователя в обработке и в очереди.
+        """
+        self.max_pending_per_user = max_pending_per_user
+        self._workers = asyncio.Semaphore(max_workers) if max_workers else None
+        self._locks = {}  # telegram id -> [замок, количество обновлений в обработке и в очереди]
+        # Метрики
+        self.processed = 0
+        self.dropped = 0  # Обновления сверх max_pending_per_user
+        self.active = 0  # Обновления, которые обрабатываются сейчас
+        self.max_active = 0
+        self._waits = deque(maxlen=10_000)  # Время ожидания очереди пользователя и свободного воркера
+
+    async def _run(
+        self, handler: Callable, event: TelegramObject, data: Dict[str, Any], enqueued_at: float
+    ) -> Any:
+        """Ждет свободный воркер и обрабатывает обновление."""
+        async with self._workers or contextlib.nullcontext():
+            self._waits.append(time.monotonic() - enqueued_at)
+            self.active += 1
+            self.max_active = max(self.max_active, self.active)
+            try:
+                return await handler(event, data)
+            finally:
+                self.active -= 1
+                self.processed += 1
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any],
+    ) -> Any:
+        user: Optional[User] = data.get("event_from_user")
+        enqueued_at = time.monotonic()
+
+        if user is None:
+            return await self._run(handler, event, data, enqueued_at)
+
+        entry = self._locks.get(user.id)
+        if entry is None:
+            entry = self._locks[user.id] = [asyncio.Lock(), 0]
+        elif entry[1] >= self.max_pending_per_user:
+            self.dropped += 1
+            logging.warning(f"Очередь обновлений пользователя {user.id} переполнена, обновление пропущено")
+            return None
+
+        entry[1] += 1
+        try:
+            # Замок пользователя берется раньше воркера, чтобы ожидающие своей очереди
+            # обновления не занимали воркеры
+            async with entry[0]:
+                return await self._run(handler, event, data, enqueued_at)
+        finally:
+            entry[1] -= 1
+            if not entry[1]:
+                del self._locks[user.id]
+
+    def stats(self) -> dict:
+        """Метрики: обработанные и пропущенные обновления, нагрузка и ожидание очереди в мс."""
+        waits = sorted(self._waits)
+
+        def percentile(pct: float) -> float:
+            if not waits:
+                return 0.0
+            return round(waits[min(len(waits) - 1, int(pct / 100 * len(waits)))] * 1000, 2)
+
+        return {
+            "processed": self.processed,
+            "dropped": self.dropped,
+            "active": self.active,
+            "max_active": self.max_active,
+            "users_in_progress": len(self._locks),
+            "wait_p50_ms": percentile(50),
+            "wait_p99_ms": percentile(99),
+        }
+
+
+class DuplicateUpdateMiddleware(BaseMiddleware):
+    """Внешняя мидлварь обновлений, которая отбрасывает повторы.
+
+    Повтором считается обновление с уже обработанным update_id (повторная доставка
+    вебхука) или callback-запрос с уже обработанным id. Обработанные ключи хранятся
+    в ограниченном кэше `ttl` секунд.
+    """
+
+    def __init__(self, max_size: int = 100_000, ttl: float = 600):
+        """
+        :param max_size: Сколько последних ключей помнить;
+        :param ttl: Сколько секунд помнить ключ.
+        """
+        self._seen = LRUCache(max_size=max_size, ttl=ttl)
+        self.duplicate_updates = 0
+        self.duplicate_callbacks = 0
+
+    def _is_duplicate(self, key: tuple) -> bool:
+        if self._seen.get(key) is not MISSING:
+            return True
+        self._seen.set(key, True)
+        return False
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: Update,
+        data: Dict[str, Any],
+    ) -> Any:
+        if self._is_duplicate(("update", event.update_id)):
+            self.duplicate_updates += 1
+            return None
+
+        callback = event.callback_query
+        if callback is not None and self._is_duplicate(("callback", callback.id)):
+            self.duplicate_callbacks += 1
+            return None
+
+        return await handler(event, data)
+
+    def stats(self) -> dict:
+        """Количество отброшенных повторов."""
+        return {
+            "duplicate_updates": self.duplicate_updates,
+            "duplicate_callbacks": self.duplicate_callbacks,
+        }
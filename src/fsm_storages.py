@@ -0,0 +1,406 @@
+import json
+import logging
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
+
+
+class StateCodes:
+    """Словарь кодов состояний: каждое название состояния получает небольшое целое число.
+
+    В сессиях хранится код, а не строка: целые числа до 256 - общие объекты интерпретатора,
+    поэтому сессия не держит ссылку на отдельную строку. Коды назначаются при регистрации
+    классов состояний (`states`) в порядке объявления; неизвестное название получает
+    следующий свободный код при первой записи.
+    """
+
+    def __init__(self):
+        self._codes = {None: 0}  # Название состояния -> код
+        self._names = [None]  # Код -> название состояния
+
+    def register(self, *state_groups: object) -> None:
+        """Назначает коды всем состояниям классов состояний.
+
+        :param state_groups: Экземпляры классов состояний (строковые атрибуты в верхнем регистре).
+        """
+        for group in state_groups:
+            for attribute, value in vars(type(group)).items():
+                if attribute.isupper() and isinstance(value, str):
+                    self.code(value)
+
+    def code(self, state: Optional[str]) -> int:
+        """Возвращает код состояния, при необходимости назначая новый."""
+        code = self._codes.get(state)
+        if code is None:
+            code = self._codes[state] = len(self._names)
+            self._names.append(state)
+        return code
+
+    def name(self, code: int) -> Optional[str]:
+        """Возвращает название состояния по коду."""
+        return self._names[code]
+
+    def __len__(self) -> int:
+        return len(self._names) - 1
+
+
+state_codes = StateCodes()
+
+
+class Session:
+    """Сессия пользователя: код состояния и данные.
+
+    `__slots__` убирает у каждой сессии собственный словарь атрибутов, а пустые данные
+    хранятся как None, чтобы не держать пустой словарь на каждого пользователя в меню.
+    """
+
+    __slots__ = ("code", "data")
+
+    def __init__(self, state: Optional[str], data: Optional[dict]):
+        self.code = state_codes.code(state)
+        self.data = data or None
+
+    @property
+    def state(self) -> Optional[str]:
+        return state_codes.name(self.code)
+
+
+class TimedSession(Session):
+    """Сессия с временем последнего обращения для хранилищ с вытеснением."""
+
+    __slots__ = ("touched",)
+
+    def __init__(self, state: Optional[str], data: Optional[dict], touched: float):
+        super().__init__(state, data)
+        self.touched = touched
+
+
+class BaseStorage(ABC):
+    """Интерфейс хранилища машины состояний.
+
+    Сессия пользователя - это пара (состояние, данные). Хранилище отвечает только за
+    хранение сессий, логика работы с ними находится в `utils.FiniteStateMachine`.
+    """
+
+    @abstractmethod
+    def get_state(self, telegram_id: int) -> Optional[str]:
+        """Возвращает состояние пользователя или None."""
+
+    @abstractmethod
+    def get_data(self, telegram_id: int) -> Optional[dict]:
+        """Возвращает словарь данных пользователя или None, если сессии нет."""
+
+    @abstractmethod
+    def set_session(self, telegram_id: int, state: Optional[str], data: dict) -> None:
+        """Сохраняет состояние и данные пользователя."""
+
+    @abstractmethod
+    def delete_session(self, telegram_id: int) -> None:
+        """Удаляет сессию пользователя."""
+
+    def close(self) -> None:
+        """Освобождает ресурсы хранилища при остановке бота."""
+
+    def __len__(self) -> int:
+        """Количество сессий, которые хранилище держит в памяти."""
+        return 0
+
+
+class MemoryStorage(BaseStorage):
+    """Хранилище в памяти процесса без ограничений по размеру."""
+
+    def __init__(self):
+        self._sessions = {}  # telegram id пользователя -> Session
+
+    def get_state(self, telegram_id: int) -> Optional[str]:
+        session = self._sessions.get(telegram_id)
+        return session.state if session else None
+
+    def get_data(self, telegram_id: int) -> Optional[dict]:
+        session = self._sessions.get(telegram_id)
+        if session is None:
+            return None
+        return {} if session.data is None else session.data
+
+    def set_session(self, telegram_id: int, state: Optional[str], data: dict) -> None:
+        self._sessions[telegram_id] = Session(state, data)
+
+    def delete_session(self, telegram_id: int) -> None:
+        self._sessions.pop(telegram_id, None)
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+
+class LRUStorage(BaseStorage):
+    """Хранилище в памяти с ограничением по количеству сессий и времени жизни.
+
+    Сессии упорядочены по времени последнего обращения: при переполнении вытесняется
+    самая давняя, а сессии без обращений дольше `ttl` секунд удаляются.
+    """
+
+    def __init__(self, max_sessions: int = 100_000, ttl: float = 24 * 60 * 60):
+        """
+        :param max_sessions: Максимальное количество сессий в памяти;
+        :param ttl: Время жизни сессии без обращений в секундах (0 - без ограничения).
+        """
+        self.max_sessions = max_sessions
+        self.ttl = ttl
+        self.evicted = 0  # Количество вытесненных и просроченных сессий
+        self._sessions = OrderedDict()  # telegram id -> TimedSession
+
+    def _touch(self, telegram_id: int) -> Optional[TimedSession]:
+        """Возвращает сессию и отмечает обращение к ней."""
+        session = self._sessions.get(telegram_id)
+        if session is None:
+            return None
+
+        now = time.monotonic()
+        if self.ttl and now - session.touched > self.ttl:
+            del self._sessions[telegram_id]
+            self.evicted += 1
+            return None
+
+        session.touched = now
+        self._sessions.move_to_end(telegram_id)
+        return session
+
+    def _evict(self) -> None:
+        """Удаляет просроченные сессии и сессии сверх лимита."""
+        if not self.ttl and len(self._sessions) <= self.max_sessions:
+            return
+
+        now = time.monotonic()
+        while self._sessions:
+            oldest_id, oldest = next(iter(self._sessions.items()))
+            expired = self.ttl and now - oldest.touched > self.ttl
+            if not expired and len(self._sessions) <= self.max_sessions:
+                break
+            del self._sessions[oldest_id]
+            self.evicted += 1
+
+    def get_state(self, telegram_id: int) -> Optional[str]:
+        session = self._touch(telegram_id)
+        return session.state if session else None
+
+    def get_data(self, telegram_id: int) -> Optional[dict]:
+        session = self._touch(telegram_id)
+        if session is None:
+            return None
+        return {} if session.data is None else session.data
+
+    def set_session(self, telegram_id: int, state: Optional[str], data: dict) -> None:
+        self._sessions[telegram_id] = TimedSession(state, data, time.monotonic())
+        self._sessions.move_to_end(telegram_id)
+        self._evict()
+
+    def delete_session(self, telegram_id: int) -> None:
+        self._sessions.pop(telegram_id, None)
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+
+FLUSH_RETRY_DELAY = 1.0  # Пауза перед повтором записи сессий после ошибки, в секундах
+
+
+class SQLiteStorage(BaseStorage):
+    """Хранилище в SQLite с кэшем сессий в памяти.
+
+    Чтение идет из ограниченного кэша (`LRUStorage`), в базу данных обращение
+    происходит только при промахе. Запись сквозная: сессия сразу обновляется в кэше,
+    а в базу пишется в отдельном потоке не чаще раза в `flush_interval` секунд.
+    Несколько изменений одной сессии подряд сливаются в одну запись, поэтому цикл
+    событий не ждет диск. Промах кэша читает сессию через отдельное соединение
+    (режим WAL) и не ждет записи, которая идет в этот момент.
+    """
+
+    def __init__(
+        self,
+        db_name: str,
+        cache_size: int = 10_000,
+        ttl: float = 0,
+        flush_interval: float = 0.05,
+    ):
+        """
+        :param db_name: Название файла базы данных SQLite для сессий;
+        :param cache_size: Максимальное количество сессий в кэше;
+        :param ttl: Время жизни сессии без обращений в секундах (0 - без ограничения);
+        :param flush_interval: Как часто сбрасывать изменения в базу данных, в секундах.
+        """
+        self.ttl = ttl
+        self.flush_interval = flush_interval
+        self._cache = LRUStorage(max_sessions=cache_size, ttl=0)
+        self._pending = {}  # telegram id -> (состояние, данные в JSON) или None для удаления
+        self._flushing = {}  # Изменения, которые сейчас записываются в базу данных
+        self._pending_lock = threading.Lock()
+        self._dirty = threading.Event()
+        self._closed = False
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="fsm-sqlite")
+        self._connection = self._executor.submit(self._connect, db_name).result()
+        self._read_connection = sqlite3.connect(db_name, check_same_thread=False)
+        self._read_connection.execute("PRAGMA query_only=ON;")
+        self._flusher = threading.Thread(
+            target=self._flush_periodically, name="fsm-sqlite-flusher", daemon=True
+        )
+        self._flusher.start()
+
+    @staticmethod
+    def _connect(db_name: str) -> sqlite3.Connection:
+        connection = sqlite3.connect(db_name)
+        connection.execute("PRAGMA journal_mode=WAL;")
+        connection.execute("PRAGMA synchronous=NORMAL;")
+        connection.execute(
+            "CREATE TABLE IF NOT EXISTS fsm_sessions("
+            "telegram_id INTEGER PRIMARY KEY,"
+            "state VARCHAR(40),"
+            "data TEXT,"
+            "updated_at REAL"
+            ");"
+        )
+        connection.commit()
+        return connection
+
+    def _load(self, telegram_id: int) -> Optional[list]:
+        """Читает сессию из базы данных при промахе кэша."""
+        with self._pending_lock:
+            # Изменение, которое еще не закоммичено, соединение чтения не увидит
+            for changes in (self._pending, self._flushing):
+                if telegram_id in changes:
+                    pending = changes[telegram_id]
+                    return None if pending is None else [pending[0], json.loads(pending[1])]
+
+        # Чтение по первичному ключу в режиме WAL не ждет идущую запись
+        row = self._read_connection.execute(
+            "SELECT state, data, updated_at FROM fsm_sessions WHERE telegram_id=?;",
+            (telegram_id,),
+        ).fetchone()
+        if row is None:
+            return None
+        if self.ttl and time.time() - row[2] > self.ttl:
+            self.delete_session(telegram_id)
+            return None
+        return [row[0], json.loads(row[1])]
+
+    def _session(self, telegram_id: int) -> Optional[list]:
+        state, data = self._cache.get_state(telegram_id), self._cache.get_data(telegram_id)
+        if data is not None:
+            return [state, data]
+
+        # Отсутствие сессии тоже кэшируется пустой сессией, чтобы фильтры хэндлеров
+        # не ходили в базу данных на каждое обновление нового пользователя.
+        session = self._load(telegram_id) or [None, {}]
+        self._cache.set_session(telegram_id, session[0], session[1])
+        return session
+
+    def _flush(self) -> None:
+        """Записывает накопленные изменения сессий в базу данных."""
+        with self._pending_lock:
+            pending, self._pending = self._pending, {}
+            self._flushing = pending
+
+        try:
+            self._write_changes(pending)
+        except sqlite3.Error:
+            self._connection.rollback()
+            # Изменения вернутся в очередь, если сессию с тех пор не изменили еще раз
+            with self._pending_lock:
+                for telegram_id, session in pending.items():
+                    self._pending.setdefault(telegram_id, session)
+            raise
+        finally:
+            with self._pending_lock:
+                self._flushing = {}
+
+    def _write_changes(self, pending: dict) -> None:
+        """Записывает изменения сессий одной транзакцией."""
+        now = time.time()
+        upserts = [
+            (telegram_id, session[0], session[1], now)
+            for telegram_id, session in pending.items()
+            if session is not None
+        ]
+        deletes = [(telegram_id,) for telegram_id, session in pending.items() if session is None]
+        self._connection.executemany(
+            "INSERT OR REPLACE INTO fsm_sessions (telegram_id, state, data, updated_at) "
+            "VALUES (?, ?, ?, ?);",
+            upserts,
+        )
+        self._connection.executemany("DELETE FROM fsm_sessions WHERE telegram_id=?;", deletes)
+        self._connection.commit()
+
+    def _flush_periodically(self) -> None:
+        """Фоновый поток: сбрасывает изменения, когда они появляются."""
+        while not self._closed:
+            self._dirty.wait()
+            time.sleep(self.flush_interval)
+            self._dirty.clear()
+            try:
+                self._executor.submit(self._flush).result()
+            except Exception:
+                logging.exception("Ошибка записи сессий машины состояний, повтор через паузу")
+                self._dirty.set()
+                time.sleep(FLUSH_RETRY_DELAY)
+
+    def _write(self, telegram_id: int, session: Optional[tuple]) -> None:
+        with self._pending_lock:
+            self._pending[telegram_id] = session
+        self._dirty.set()
+
+    def get_state(self, telegram_id: int) -> Optional[str]:
+        session = self._session(telegram_id)
+        return session[0] if session else None
+
+    def get_data(self, telegram_id: int) -> Optional[dict]:
+        session = self._session(telegram_id)
+        return session[1] if session else None
+
+    def set_session(self, telegram_id: int, state: Optional[str], data: dict) -> None:
+        self._cache.set_session(telegram_id, state, data)
+        self._write(telegram_id, (state, json.dumps(data, ensure_ascii=False)))
+
+    def delete_session(self, telegram_id: int) -> None:
+        self._cache.delete_session(telegram_id)
+        self._write(telegram_id, None)
+
+    def close(self) -> None:
+        """Дописывает изменения и закрывает соединение."""
+        self._closed = True
+        self._dirty.set()
+        self._flusher.join()
+        try:
+            self._executor.submit(self._flush).result()
+        except Exception:
+            logging.exception("Не удалось записать сессии машины состояний при остановке")
+        self._executor.submit(self._connection.close).result()
+        self._read_connection.close()
+        self._executor.shutdown(wait=True)
+
+    def __len__(self) -> int:
+        return len(self._cache)
+
+
+def create_storage(
+    kind: str = "memory",
+    max_sessions: int = 100_000,
+    ttl: float = 0,
+    db_name: Optional[str] = None,
+) -> BaseStorage:
+    """Создает хранилище машины состояний по названию.
+
+    :param kind: "memory", "lru" или "sqlite";
+    :param max_sessions: Лимит сессий в памяти (для "lru" и кэша "sqlite");
+    :param ttl: Время жизни сессии без обращений в секундах (0 - без ограничения);
+    :param db_name: Файл базы данных для "sqlite".
+    """
+    if kind == "memory":
+        return MemoryStorage()
+    if kind == "lru":
+        return LRUStorage(max_sessions=max_sessions, ttl=ttl)
+    if kind == "sqlite":
+        return SQLiteStorage(db_name=db_name, cache_size=max_sessions, ttl=ttl)
+    raise ValueError(f"Неизвестное хранилище машины состояний: {kind}")
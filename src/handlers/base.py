@@ -1,28 +1,26 @@
-from aiogram import F
 from responses import base as base_responses
-from aiogram.dispatcher.router import Router
 from aiogram.types import Message
 from keyboards.base.reply import get_menu_markup
 from dao import UsersDAO
 from states import reg_states, base_states
+from dispatching import IndexedRouter
 from utils import fsm
 from responses import registration as registration_responses
 
-base_router = Router()
+base_router = IndexedRouter()
 
 async def check_user_registration(message: Message) -> bool:
-    """Проверка регистрации пользователя и установка данных или состояния в FSM.
+    """Проверка регистрации пользователя и установка состояния в FSM.
+
+    Профиль пользователя в FSM не копируется: его отдает кэш `UsersDAO`.
 
     :param message: Сообщение от пользователя.
     :return: True, если пользователь зарегистрирован; иначе False.
     """
     telegram_id = message.from_user.id
-    user = UsersDAO.get_one_or_none(telegram_id=telegram_id)
+    user = await UsersDAO.get_one_or_none(telegram_id=telegram_id)
 
     if user:
-        # Сохраняем данные пользователя в FSM для быстрого доступа
-        for key, value in user.items():
-            fsm.set_data(telegram_id=telegram_id, key=key, value=value)
         fsm.set_state(telegram_id=telegram_id, state=base_states.IN_MENU)
         return True
 
@@ -33,7 +31,7 @@ async def check_user_registration(message: Message) -> bool:
     return False
 
 
-@base_router.message(F.text == "/start")
+@base_router.state_message(text="/start")
 async def handle_start_command(message: Message) -> None:
     """Обработчик команды старт."""
     await message.answer(
@@ -48,7 +46,7 @@ async def handle_start_command(message: Message) -> None:
         )
 
 
-@base_router.message(F.text == "/menu")
+@base_router.state_message(text="/menu")
 async def handle_menu_command(message: Message) -> None:
     """Обработчик команды меню. Если пользователь не зарегистрирован, предложит регистрацию."""
     # Проверяем регистрацию и отправляем меню, если пользователь зарегистрирован
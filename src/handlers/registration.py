@@ -1,7 +1,6 @@
-from aiogram import F
-from aiogram.dispatcher.router import Router
 from aiogram.types import Message, CallbackQuery
 
+from dispatching import IndexedRouter
 from utils import fsm
 from dao import UsersDAO
 from states import reg_states, base_states
@@ -10,13 +9,12 @@ from responses import registration as registration_responses
 from keyboards.registration.inline import get_user_login_markup
 from keyboards.base.inline import get_confirmation_keyboard_markup
 
-registration_router = Router()
+registration_router = IndexedRouter()
+# Имя и логин нужны только до создания пользователя
+fsm.register_flow(keys=("user_name", "login"), finish_states=(base_states.IN_MENU,))
 
 # -------------- region register user name --------------
-@registration_router.message(
-    F.content_type == "text",
-    lambda message: fsm.get_state(message.from_user.id) == reg_states.WAIT_FOR_NAME,
-)
+@registration_router.state_message(reg_states.WAIT_FOR_NAME)
 async def handle_user_name(message: Message) -> None:
     """Обработчик для ввода имени пользователя."""
     if not message.text.strip():
@@ -33,9 +31,8 @@ async def handle_user_name(message: Message) -> None:
     )
 
 
-@registration_router.callback_query(
-    F.data.in_(["confirm", "cancel"]),
-    lambda callback: fsm.get_state(callback.from_user.id) == reg_states.SUBMIT_NAME,
+@registration_router.state_callback_query(
+    reg_states.SUBMIT_NAME, data=["confirm", "cancel"]
 )
 async def handle_confirm_user_name(callback: CallbackQuery) -> None:
     """Обработчик подтверждения или отмены имени пользователя."""
@@ -58,10 +55,7 @@ async def handle_confirm_user_name(callback: CallbackQuery) -> None:
 
 
 # -------------- region register login --------------
-@registration_router.message(
-    F.text,
-    lambda message: fsm.get_state(message.from_user.id) == reg_states.WAIT_FOR_LOGIN,
-)
+@registration_router.state_message(reg_states.WAIT_FOR_LOGIN)
 async def handle_user_login(message: Message) -> None:
     """Обработчик для ввода логина пользователя."""
     login = message.text.strip()
@@ -69,7 +63,7 @@ async def handle_user_login(message: Message) -> None:
         await message.answer(registration_responses.INVALID_LOGIN)
         return
 
-    user = UsersDAO.get_one_or_none(login=login)
+    user = await UsersDAO.get_one_or_none(login=login)
     if user:
         await message.answer(text=registration_responses.LOGIN_ALREADY_EXISTS)
         return
@@ -84,9 +78,8 @@ async def handle_user_login(message: Message) -> None:
     )
 
 
-@registration_router.callback_query(
-    F.data == "use_login_from_telegram",
-    lambda callback: fsm.get_state(callback.from_user.id) == reg_states.WAIT_FOR_LOGIN,
+@registration_router.state_callback_query(
+    reg_states.WAIT_FOR_LOGIN, data=["use_login_from_telegram"]
 )
 async def handle_getting_login_from_telegram(callback: CallbackQuery) -> None:
     """Обработчик для использования логина из Telegram."""
@@ -100,9 +93,8 @@ async def handle_getting_login_from_telegram(callback: CallbackQuery) -> None:
     await callback.answer()
 
 
-@registration_router.callback_query(
-    F.data.in_(["confirm", "cancel"]),
-    lambda callback: fsm.get_state(callback.from_user.id) == reg_states.SUBMIT_LOGIN,
+@registration_router.state_callback_query(
+    reg_states.SUBMIT_LOGIN, data=["confirm", "cancel"]
 )
 async def handle_confirmation_login(callback: CallbackQuery) -> None:
     """Обработчик подтверждения или отмены логина пользователя."""
@@ -110,9 +102,8 @@ async def handle_confirmation_login(callback: CallbackQuery) -> None:
 
     if callback.data == "confirm":
         fsm.set_state(telegram_id=telegram_id, state=base_states.DEFAULT)
-        user_data = fsm.get_data(telegram_id=telegram_id)
-        user_data["telegram_id"] = telegram_id
-        UsersDAO.add_new_user(data=user_data)
+        user_data = dict(fsm.get_data(telegram_id=telegram_id), telegram_id=telegram_id)
+        await UsersDAO.add_new_user(data=user_data)
         fsm.set_state(telegram_id=telegram_id, state=base_states.IN_MENU)
         await callback.message.answer(
             text=registration_responses.SUCCESSFULLY_REGISTERED,
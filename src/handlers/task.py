@@ -1,22 +1,55 @@
-from aiogram import Router, F
+import html
+
+from aiogram import F
 from aiogram.types import Message, CallbackQuery
 
-from keyboards.task.inline import get_task_manager_markup
-from dao import TaskDAO
+from caches import MISSING, LRUCache
+from config import settings
+from keyboards.task.callbacks import (
+    DescriptionCallback,
+    ListActions,
+    ListCallback,
+    SearchCallback,
+    SelectActions,
+    SelectCallback,
+    TaskActions,
+    TaskCallback,
+)
+from keyboards.task.inline import (
+    get_bulk_delete_confirmation_markup,
+    get_delete_confirmation_markup,
+    get_description_pages_markup,
+    get_list_delete_confirmation_markup,
+    get_search_results_markup,
+    get_selection_markup,
+    get_task_list_markup,
+    get_task_manager_markup,
+)
+from dao import TaskDAO, get_task_list_version
 from keyboards.base.reply import get_menu_markup
 from states import base_states, task_states
+from dispatching import IndexedRouter
 from utils import fsm
 from responses import task as task_responses
 from keyboards.base.inline import get_confirmation_keyboard_markup
 
-task_router = Router()
+task_router = IndexedRouter()
+# Заголовок и описание новой задачи нужны только до ее создания. Выбранные задачи и поисковый
+# запрос к сценарию не относятся: их читают кнопки уже отправленных сообщений
+fsm.register_flow(keys=("task_title", "task_description"), finish_states=(base_states.IN_MENU,))
+
+
+def get_idempotency_key(callback: CallbackQuery) -> str:
+    """Ключ идемпотентности записи по нажатой кнопке.
+
+    Повторное нажатие той же кнопки того же сообщения дает тот же ключ, поэтому
+    запись не выполняется дважды.
+    """
+    return f"{callback.from_user.id}:{callback.message.message_id}:{callback.data}"
 
 
 # ------------------- region Добавление новой задачи -------------------
-@task_router.message(
-    F.text == "Добавить задачу➕",
-    lambda message: fsm.get_state(message.from_user.id) == base_states.IN_MENU,
-)
+@task_router.state_message(base_states.IN_MENU, text="Добавить задачу➕")
 async def handle_wait_for_task_title(message: Message) -> None:
     """Обработчик ожидания заголовка новой задачи.
 
@@ -29,10 +62,7 @@ async def handle_wait_for_task_title(message: Message) -> None:
     await message.answer(text=task_responses.REQUEST_FOR_TASK_TITLE)
 
 
-@task_router.message(
-    F.content_type == "text",
-    lambda message: fsm.get_state(message.from_user.id) == task_states.WAIT_FOR_TASK_TITLE,
-)
+@task_router.state_message(task_states.WAIT_FOR_TASK_TITLE)
 async def handle_task_title(message: Message) -> None:
     """Обработка и переход к запросу описания задачи.
 
@@ -54,10 +84,7 @@ async def handle_task_title(message: Message) -> None:
     )
 
 
-@task_router.callback_query(
-    F.data.in_(["confirm", "cancel"]),
-    lambda callback: fsm.get_state(callback.from_user.id) == task_states.SUBMIT_TITLE,
-)
+@task_router.state_callback_query(task_states.SUBMIT_TITLE, data=["confirm", "cancel"])
 async def handle_confirm_or_cancel_task_title(callback: CallbackQuery) -> None:
     """Подтверждение или отмена заголовка задачи.
 
@@ -78,10 +105,7 @@ async def handle_confirm_or_cancel_task_title(callback: CallbackQuery) -> None:
         await callback.answer()
 
 
-@task_router.message(
-    F.content_type == "text",
-    lambda message: fsm.get_state(message.from_user.id) == task_states.WAIT_FOR_TASK_DESCRIPTION,
-)
+@task_router.state_message(task_states.WAIT_FOR_TASK_DESCRIPTION)
 async def handle_task_description(message: Message) -> None:
     """Обработка полученного описания задачи.
 
@@ -101,9 +125,8 @@ async def handle_task_description(message: Message) -> None:
     )
 
 
-@task_router.callback_query(
-    F.data.in_(["confirm", "cancel"]),
-    lambda callback: fsm.get_state(callback.from_user.id) == task_states.SUBMIT_DESCRIPTION,
+@task_router.state_callback_query(
+    task_states.SUBMIT_DESCRIPTION, data=["confirm", "cancel"]
 )
 async def handle_confirm_or_cancel_task_description(callback: CallbackQuery) -> None:
     """Подтверждение или отмена описания задачи.
@@ -118,7 +141,15 @@ async def handle_confirm_or_cancel_task_description(callback: CallbackQuery) ->
             "task_title": fsm.get_data(telegram_id, key="task_title"),
             "task_description": fsm.get_data(telegram_id, key="task_description"),
         }
-        TaskDAO.add_new_task(telegram_id=telegram_id, data=data_for_task)
+        added = await TaskDAO.add_new_task(
+            telegram_id=telegram_id,
+            data=data_for_task,
+            idempotency_key=get_idempotency_key(callback),
+        )
+        if not added:
+            await callback.answer()
+            return
+
         fsm.set_state(telegram_id=telegram_id, state=base_states.IN_MENU)
         await callback.message.answer(
             text=task_responses.TASK_SUCCESSFULLY_ADDED, reply_markup=get_menu_markup()
@@ -135,132 +166,679 @@ async def handle_confirm_or_cancel_task_description(callback: CallbackQuery) ->
 # ------------------- endregion Добавление новой задачи -------------------
 
 # ------------------- region Просмотр задач -------------------
-@task_router.message(
-    F.text == "Список задач🗓",
-    lambda message: fsm.get_state(message.from_user.id) == base_states.IN_MENU,
-)
+@task_router.state_message(base_states.IN_MENU, text="Список задач🗓")
 async def handle_get_list_of_tasks(message: Message):
     """Обработка получения всех задач пользователя.
 
-    Бот запрашивает список задач и отображает первую задачу с возможностью навигации.
+    Бот отправляет первую страницу списка задач. Карточка отдельной задачи открывается
+    кнопкой с ее номером.
     """
     telegram_id = message.from_user.id
-    tasks = TaskDAO.get_all_tasks(telegram_id=telegram_id)
     fsm.set_state(telegram_id=telegram_id, state=task_states.LOOK_AT_TASKS)
 
-    if not tasks:
-        await message.answer(text=task_responses.YOU_HAVE_NOT_ANY_TASK)
-        return
+    text, reply_markup = await get_task_list_page(telegram_id, cursor=0, number=1)
+    await message.answer(text=text, reply_markup=reply_markup)
+
 
-    # Отображаем первую задачу
-    current_task_number = 1
-    await display_task(message, tasks, current_task_number)
+def is_description_truncated(task: dict) -> bool:
+    """Проверяет, прочитано ли описание задачи не полностью."""
+    return (task["description_length"] or 0) > len(task["description"] or "")
 
 
-async def display_task(message: Message, tasks: list, current_task_number: int):
-    """Функция для отображения задачи с пагинацией.
+def get_task_text(task: dict) -> str:
+    """Формирует текст карточки задачи.
 
-    Отправляет текст с текущей задачей и клавиатурой навигации.
+    В задаче только начало описания: если оно обрезано, текст заканчивается многоточием.
+    Заголовок и описание экранируются: сообщение разбирается как HTML.
     """
-    last_task_number = len(tasks)
+    description = html.escape(str(task["description"]))
+    if is_description_truncated(task):
+        description += "…"
+    return (
+        f"Задача: <b>{html.escape(task['title'])}</b>\n\n"
+        f"Описание: {description}"
+    )
 
-    task_title = tasks[current_task_number - 1]['title']
-    task_description = tasks[current_task_number - 1]['description']
 
-    await message.answer(
-        text=f"Задача: <b>{task_title}</b>\n\n"
-             f"Описание: {task_description}",
-        reply_markup=get_task_manager_markup(current_task_number, last_task_number),
+async def edit_task_view(callback: CallbackQuery, text: str, reply_markup=None) -> bool:
+    """Редактирует карточку задачи на месте.
+
+    Если текст и клавиатура карточки не изменились, запрос к Bot API не отправляется.
+
+    :return: True, если карточка была отредактирована.
+    """
+    message = callback.message
+    if message.html_text == text and message.reply_markup == reply_markup:
+        return False
+
+    await message.edit_text(text=text, reply_markup=reply_markup)
+    return True
+
+
+async def display_task_card(
+    callback: CallbackQuery, task: dict, current_task_number: int, last_task_number: int
+) -> None:
+    """Показывает карточку задачи в том же сообщении."""
+    await edit_task_view(
+        callback,
+        text=get_task_text(task),
+        reply_markup=get_task_manager_markup(
+            task["id"],
+            current_task_number,
+            last_task_number,
+            has_full_description=is_description_truncated(task),
+        ),
     )
 
 
 @task_router.callback_query(
-    F.data.in_(["back", "next", "task_completed", "delete_task", "confirm", "cancel"]),
-    lambda callback: fsm.get_state(callback.from_user.id) == task_states.LOOK_AT_TASKS,
+    TaskCallback.filter(F.action.in_({TaskActions.NEXT, TaskActions.BACK}))
 )
-async def handle_task_navigation(callback: CallbackQuery):
-    """Обработка пагинации."""
+async def handle_task_navigation(callback: CallbackQuery, callback_data: TaskCallback):
+    """Обработка пагинации.
+
+    ID текущей задачи и ее номер приходят в callback_data, поэтому на каждое нажатие
+    читается одна соседняя задача без обращения к FSM.
+    """
     telegram_id = callback.from_user.id
-    tasks = TaskDAO.get_all_tasks(telegram_id=telegram_id)
-    last_task_number = len(tasks)
 
-    # Получаем текущий номер задачи из состояния
-    current_task_number = fsm.get_data(telegram_id, key="current_task_number") or 1
+    # Получаем соседнюю задачу по курсору
+    if callback_data.action == TaskActions.NEXT:
+        task = await TaskDAO.get_next_task(
+            task_id=callback_data.task_id, telegram_id=telegram_id
+        )
+        current_task_number = callback_data.number + 1
+    else:
+        task = await TaskDAO.get_previous_task(
+            task_id=callback_data.task_id, telegram_id=telegram_id
+        )
+        current_task_number = max(callback_data.number - 1, 1)
+
+    # Текущая задача крайняя - сообщение не меняется
+    if not task:
+        await callback.answer()
+        return
+
+    last_task_number = max(callback_data.last, current_task_number)
 
-    task_id = tasks[current_task_number - 1]["id"]
+    # Обновляем сообщение с новой задачей и клавиатурой
+    await display_task_card(callback, task, current_task_number, last_task_number)
+    await callback.answer()
 
-    if callback.data == "delete_task":
-        fsm.set_data(telegram_id, key="current_task_number", value=current_task_number)
-        fsm.set_data(telegram_id, key="last_task_number", value=last_task_number)
-        fsm.set_data(telegram_id, key="task_id_to_delete", value=task_id)
-        task_title = tasks[current_task_number - 1]['title']
 
-        await callback.message.answer(
-            text=f"Вы уверены, что хотите удалить задачу: \n\n<b>{task_title}</b> ?",
-            reply_markup=get_confirmation_keyboard_markup(),
+async def display_task_after_removal(
+    callback: CallbackQuery, callback_data: TaskCallback, notice: str
+) -> None:
+    """Показывает в той же карточке соседнюю задачу после выполнения или удаления текущей.
+
+    Следующая задача занимает номер убранной, на последней задаче показывается предыдущая.
+    Если задач не осталось, карточка заменяется сообщением об этом.
+
+    :param notice: Текст уведомления о выполненном действии.
+    """
+    telegram_id = callback.from_user.id
+    last_task_number = max(callback_data.last - 1, 0)
+
+    task = await TaskDAO.get_next_task(task_id=callback_data.task_id, telegram_id=telegram_id)
+    current_task_number = callback_data.number
+    if not task:
+        task = await TaskDAO.get_previous_task(
+            task_id=callback_data.task_id, telegram_id=telegram_id
+        )
+        current_task_number = callback_data.number - 1
+
+    if not task:
+        await edit_task_view(callback, text=task_responses.YOU_HAVE_NOT_ANY_TASK)
+    else:
+        current_task_number = max(current_task_number, 1)
+        await display_task_card(
+            callback, task, current_task_number, max(last_task_number, current_task_number)
         )
-        fsm.set_state(telegram_id=telegram_id, state=task_states.SUBMIT_DELETE_TASK)
+    await callback.answer(text=notice)
+
+
+@task_router.callback_query(TaskCallback.filter(F.action == TaskActions.COMPLETE))
+async def handle_complete_task(callback: CallbackQuery, callback_data: TaskCallback):
+    """Отмечает задачу из карточки как выполненную и показывает в карточке следующую."""
+    telegram_id = callback.from_user.id
+
+    completed = await TaskDAO.mark_task_as_completed(
+        telegram_id=telegram_id,
+        task_id=callback_data.task_id,
+        idempotency_key=get_idempotency_key(callback),
+    )
+    if not completed:
+        # Повторное нажатие: карточка уже показывает следующую задачу
         await callback.answer()
         return
 
-    if callback.data == "task_completed":
-        # Обновляем статус задачи
-        TaskDAO.mark_task_as_completed(telegram_id=telegram_id, task_id=task_id)
-        fsm.set_data(telegram_id, key="current_task_number", value=current_task_number)
-        fsm.set_data(telegram_id, key="last_task_number", value=last_task_number)
-        await callback.message.answer(text=task_responses.TASK_SUCCESSFULLY_COMPLETED, reply_markup=get_menu_markup())
-        await callback.answer()
+    await display_task_after_removal(
+        callback, callback_data, notice=task_responses.TASK_SUCCESSFULLY_COMPLETED
+    )
+
+
+@task_router.callback_query(TaskCallback.filter(F.action == TaskActions.DELETE))
+async def handle_delete_task(callback: CallbackQuery, callback_data: TaskCallback):
+    """Запрашивает подтверждение удаления задачи в той же карточке."""
+    telegram_id = callback.from_user.id
+    task = await TaskDAO.get_task(task_id=callback_data.task_id, telegram_id=telegram_id)
+    if not task:
+        await callback.answer(text=task_responses.TASK_NOT_FOUND)
         return
-    # Обновляем сообщение с новой задачей и клавиатурой
-    task_title = tasks[current_task_number - 1]['title']
-    task_description = tasks[current_task_number - 1]['description']
-
-    # Изменяем current_task_number на основе действия
-    if callback.data == "next":
-        current_task_number += 1 if current_task_number < last_task_number else 0
-    elif callback.data == "back":
-        current_task_number -= 1 if current_task_number > 1 else 0
-
-    # Сохраняем обновленный номер задачи в состоянии
-    fsm.set_data(telegram_id, key="current_task_number", value=current_task_number)
-
-    await callback.message.edit_text(
-        text=f"Задача: <b>{task_title}</b>\n\n"
-             f"Описание: {task_description}",
-        reply_markup=get_task_manager_markup(current_task_number, last_task_number),
+
+    await edit_task_view(
+        callback,
+        text=f"Вы уверены, что хотите удалить задачу: \n\n<b>{html.escape(task['title'])}</b> ?",
+        reply_markup=get_delete_confirmation_markup(
+            task["id"], callback_data.number, callback_data.last
+        ),
     )
     await callback.answer()
 
 
 # Обработка подтверждения или отмены удаления задачи
 @task_router.callback_query(
-    F.data.in_(["confirm", "cancel"]),
-    lambda callback: fsm.get_state(callback.from_user.id) == task_states.SUBMIT_DELETE_TASK,
+    TaskCallback.filter(
+        F.action.in_({TaskActions.CONFIRM_DELETE, TaskActions.CANCEL_DELETE})
+    )
 )
-async def handle_confirm_or_cancel_delete_task(callback: CallbackQuery) -> None:
+async def handle_confirm_or_cancel_delete_task(
+    callback: CallbackQuery, callback_data: TaskCallback
+) -> None:
     """Подтверждение или отмена удаления задачи.
 
-    Если задача удалена, бот уведомляет пользователя, иначе восстанавливает клавиатуру.
+    Если задача удалена, в карточке показывается соседняя задача, иначе карточка
+    возвращается к задаче, которую хотели удалить.
+    """
+    telegram_id = callback.from_user.id
+
+    if callback_data.action == TaskActions.CONFIRM_DELETE:
+        deleted = await TaskDAO.delete_task(
+            telegram_id=telegram_id,
+            task_id=callback_data.task_id,
+            idempotency_key=get_idempotency_key(callback),
+        )
+        if not deleted:
+            await callback.answer()
+            return
+
+        await display_task_after_removal(
+            callback, callback_data, notice=task_responses.TASK_SUCCESSFULLY_DELETED
+        )
+        return
+
+    task = await TaskDAO.get_task(task_id=callback_data.task_id, telegram_id=telegram_id)
+    if not task:
+        await callback.answer(text=task_responses.TASK_NOT_FOUND)
+        return
+
+    await display_task_card(callback, task, callback_data.number, callback_data.last)
+    await callback.answer()
+
+
+# Кнопки карточек, отправленных до перехода на TaskCallback
+@task_router.state_callback_query(data=["back", "next", "task_completed", "delete_task"])
+async def handle_outdated_task_keyboard(callback: CallbackQuery) -> None:
+    """Сообщает, что клавиатура карточки задачи устарела."""
+    await callback.answer(text=task_responses.TASK_KEYBOARD_IS_OUTDATED, show_alert=True)
+# ------------------- endregion Просмотр задач -------------------
+
+# ------------------- region Полное описание задачи -------------------
+DESCRIPTION_PAGE_LENGTH = 3000  # Символов описания на странице (сообщение - не больше 4096)
+
+
+@task_router.callback_query(DescriptionCallback.filter())
+async def handle_description_page(callback: CallbackQuery, callback_data: DescriptionCallback) -> None:
+    """Показывает описание задачи по страницам в том же сообщении.
+
+    Из базы читается только часть описания для текущей страницы. Страница 0 - возврат к карточке.
     """
     telegram_id = callback.from_user.id
+    if callback_data.page == 0:
+        task = await TaskDAO.get_task(task_id=callback_data.task_id, telegram_id=telegram_id)
+        if not task:
+            await callback.answer(text=task_responses.TASK_NOT_FOUND)
+            return
+        await display_task_card(callback, task, callback_data.number, callback_data.last)
+        await callback.answer()
+        return
 
-    # Извлекаем сохраненные значения для восстановления клавиатуры
-    current_task_number = fsm.get_data(telegram_id, key="current_task_number")
-    last_task_number = fsm.get_data(telegram_id, key="last_task_number")
+    part = await TaskDAO.get_description_part(
+        task_id=callback_data.task_id,
+        telegram_id=telegram_id,
+        start=(callback_data.page - 1) * DESCRIPTION_PAGE_LENGTH + 1,
+        length=DESCRIPTION_PAGE_LENGTH,
+    )
+    if not part or not part["text"]:
+        await callback.answer(text=task_responses.TASK_NOT_FOUND)
+        return
 
-    if callback.data == "confirm":
-        task_id = fsm.get_data(telegram_id, key="task_id_to_delete")
-        TaskDAO.delete_task(telegram_id=telegram_id, task_id=task_id)
-        fsm.set_state(telegram_id=telegram_id, state=base_states.IN_MENU)
-        await callback.message.answer(
-            text=task_responses.TASK_SUCCESSFULLY_DELETED, reply_markup=get_menu_markup()
+    pages = -(-part["description_length"] // DESCRIPTION_PAGE_LENGTH)
+    # Страница описания режется по символам исходного текста, поэтому экранируется уже после
+    # нарезки: иначе граница страницы могла бы пройти посреди сущности вроде &amp;
+    await edit_task_view(
+        callback,
+        text=(
+            f"Задача: <b>{html.escape(part['title'])}</b>\n\n"
+            f"Описание ({callback_data.page}/{pages}): {html.escape(part['text'])}"
+        ),
+        reply_markup=get_description_pages_markup(
+            callback_data.task_id, callback_data.page, pages, callback_data.number, callback_data.last
+        ),
+    )
+    await callback.answer()
+
+
+# ------------------- endregion Полное описание задачи -------------------
+
+# ------------------- region Список задач по страницам -------------------
+LIST_PAGE_SIZE = 10  # Количество задач на странице списка
+# Отрисованные страницы списка: (telegram id, версия списка, курсор, номер) -> (текст, клавиатура).
+# Версия меняется при любом изменении задач пользователя, поэтому устаревшие страницы не находятся
+list_pages_cache = LRUCache(max_size=settings.LIST_CACHE_SIZE)
+
+
+async def get_task_list_page(telegram_id: int, cursor: int, number: int) -> tuple:
+    """Возвращает текст и клавиатуру страницы списка задач, отрисовывая ее только при промахе кэша.
+
+    Если страница с курсором опустела (ее задачи выполнены или удалены), показывается предыдущая.
+
+    :param cursor: Курсор страницы: на ней задачи с ID больше курсора;
+    :param number: Номер первой задачи страницы в списке.
+    :return: Текст страницы и клавиатура (None, если задач нет).
+    """
+    key = (telegram_id, get_task_list_version(telegram_id), cursor, number)
+    page = list_pages_cache.get(key)
+    if page is not MISSING:
+        # Клавиатура в кэше общая, вызывающему отдается ее копия
+        text, reply_markup = page
+        return text, reply_markup and reply_markup.model_copy(deep=True)
+
+    tasks = await TaskDAO.get_tasks_page(telegram_id, after_id=cursor, limit=LIST_PAGE_SIZE + 1)
+    if not tasks and cursor:
+        tasks = await TaskDAO.get_previous_tasks_page(
+            telegram_id, before_id=cursor + 1, limit=LIST_PAGE_SIZE
         )
+        if tasks:
+            cursor, number = tasks[0]["id"] - 1, max(number - len(tasks), 1)
+
+    if not tasks:
+        page = task_responses.YOU_HAVE_NOT_ANY_TASK, None
     else:
-        fsm.set_state(telegram_id=telegram_id, state=task_states.LOOK_AT_TASKS)
-        await callback.message.answer(
-            "Удаление отменено.",
-            reply_markup=get_task_manager_markup(current_task_number, last_task_number)
+        has_next_page = len(tasks) > LIST_PAGE_SIZE
+        tasks = tasks[:LIST_PAGE_SIZE]
+        lines = [task_responses.TASK_LIST_HEADER]
+        lines.extend(
+            f"{task_number}. <b>{html.escape(task['title'])}</b>"
+            for task_number, task in enumerate(tasks, start=number)
         )
+        page = "\n".join(lines), get_task_list_markup(tasks, cursor, number, has_next_page)
 
+    list_pages_cache.set(key, page)
+    return page
+
+
+async def display_task_list_page(callback: CallbackQuery, cursor: int, number: int) -> None:
+    """Показывает страницу списка задач в том же сообщении."""
+    text, reply_markup = await get_task_list_page(callback.from_user.id, cursor, number)
+    await edit_task_view(callback, text=text, reply_markup=reply_markup)
+
+
+@task_router.callback_query(TaskCallback.filter(F.action == TaskActions.LIST))
+async def handle_show_task_list(callback: CallbackQuery, callback_data: TaskCallback) -> None:
+    """Возвращает карточку задачи к списку: страница начинается с этой задачи."""
+    await display_task_list_page(
+        callback, cursor=callback_data.task_id - 1, number=callback_data.number
+    )
     await callback.answer()
-# ------------------- endregion Просмотр задач -------------------
+
+
+@task_router.callback_query(
+    ListCallback.filter(F.action.in_({ListActions.NEXT, ListActions.BACK}))
+)
+async def handle_task_list_navigation(callback: CallbackQuery, callback_data: ListCallback) -> None:
+    """Перелистывает список задач. В task_id кнопки - крайняя задача текущей страницы."""
+    if callback_data.action == ListActions.NEXT:
+        cursor = callback_data.task_id
+        number = callback_data.number + LIST_PAGE_SIZE
+    else:
+        # Начало предыдущей страницы известно только после чтения ее задач
+        tasks = await TaskDAO.get_previous_tasks_page(
+            callback.from_user.id, before_id=callback_data.task_id, limit=LIST_PAGE_SIZE
+        )
+        if not tasks:
+            await callback.answer()
+            return
+        cursor = tasks[0]["id"] - 1
+        number = max(callback_data.number - len(tasks), 1)
+
+    await display_task_list_page(callback, cursor=cursor, number=number)
+    await callback.answer()
+
+
+@task_router.callback_query(ListCallback.filter(F.action == ListActions.OPEN))
+async def handle_open_task_from_list(callback: CallbackQuery, callback_data: ListCallback) -> None:
+    """Открывает карточку задачи из списка в том же сообщении."""
+    telegram_id = callback.from_user.id
+    task = await TaskDAO.get_task(task_id=callback_data.task_id, telegram_id=telegram_id)
+    if not task:
+        await callback.answer(text=task_responses.TASK_NOT_FOUND)
+        return
+
+    last_task_number = await TaskDAO.count_tasks(telegram_id=telegram_id)
+    await display_task_card(
+        callback, task, callback_data.number, max(last_task_number, callback_data.number)
+    )
+    await callback.answer()
+
+
+@task_router.callback_query(ListCallback.filter(F.action == ListActions.COMPLETE))
+async def handle_complete_task_from_list(callback: CallbackQuery, callback_data: ListCallback) -> None:
+    """Отмечает задачу из списка как выполненную и обновляет страницу."""
+    completed = await TaskDAO.mark_task_as_completed(
+        telegram_id=callback.from_user.id,
+        task_id=callback_data.task_id,
+        idempotency_key=get_idempotency_key(callback),
+    )
+    if not completed:
+        await callback.answer()
+        return
+
+    await display_task_list_page(callback, cursor=callback_data.cursor, number=callback_data.number)
+    await callback.answer(text=task_responses.TASK_SUCCESSFULLY_COMPLETED)
+
+
+@task_router.callback_query(ListCallback.filter(F.action == ListActions.DELETE))
+async def handle_delete_task_from_list(callback: CallbackQuery, callback_data: ListCallback) -> None:
+    """Запрашивает подтверждение удаления задачи из списка в том же сообщении."""
+    task = await TaskDAO.get_task(task_id=callback_data.task_id, telegram_id=callback.from_user.id)
+    if not task:
+        await callback.answer(text=task_responses.TASK_NOT_FOUND)
+        return
+
+    await edit_task_view(
+        callback,
+        text=f"Вы уверены, что хотите удалить задачу: \n\n<b>{html.escape(task['title'])}</b> ?",
+        reply_markup=get_list_delete_confirmation_markup(
+            task["id"], callback_data.cursor, callback_data.number
+        ),
+    )
+    await callback.answer()
+
+
+@task_router.callback_query(
+    ListCallback.filter(F.action.in_({ListActions.CONFIRM_DELETE, ListActions.CANCEL_DELETE}))
+)
+async def handle_confirm_or_cancel_delete_from_list(
+    callback: CallbackQuery, callback_data: ListCallback
+) -> None:
+    """Удаляет задачу или отменяет удаление и возвращает страницу списка."""
+    notice = None
+    if callback_data.action == ListActions.CONFIRM_DELETE:
+        deleted = await TaskDAO.delete_task(
+            telegram_id=callback.from_user.id,
+            task_id=callback_data.task_id,
+            idempotency_key=get_idempotency_key(callback),
+        )
+        if not deleted:
+            await callback.answer()
+            return
+        notice = task_responses.TASK_SUCCESSFULLY_DELETED
+
+    await display_task_list_page(callback, cursor=callback_data.cursor, number=callback_data.number)
+    await callback.answer(text=notice)
+
+
+# ------------------- endregion Список задач по страницам -------------------
+
+# ------------------- region Выбор нескольких задач -------------------
+SELECT_PAGE_SIZE = 8  # Количество задач на странице режима выбора
+
+
+def get_selected_tasks(telegram_id: int) -> list:
+    """Возвращает ID выбранных задач из FSM."""
+    return fsm.get_data(telegram_id, key="selected_tasks", default=[])
+
+
+async def display_selection_page(
+    callback: CallbackQuery, cursor: int, tasks: list = None, notice: str = None
+) -> None:
+    """Показывает в том же сообщении страницу выбора задач.
+
+    Если страница с курсором опустела (задачи выполнены или удалены), показывается первая.
+
+    :param cursor: Курсор страницы: на ней задачи с ID больше курсора;
+    :param tasks: Уже прочитанные задачи страницы;
+    :param notice: Строка о выполненном действии над заголовком страницы.
+    """
+    telegram_id = callback.from_user.id
+    if tasks is None:
+        tasks = await TaskDAO.get_tasks_page(telegram_id, after_id=cursor, limit=SELECT_PAGE_SIZE)
+        if not tasks and cursor:
+            cursor = 0
+            tasks = await TaskDAO.get_tasks_page(telegram_id, after_id=cursor, limit=SELECT_PAGE_SIZE)
+
+    if not tasks:
+        text = task_responses.YOU_HAVE_NOT_ANY_TASK
+        await edit_task_view(callback, text=f"{notice}\n\n{text}" if notice else text)
+        return
+
+    selected = get_selected_tasks(telegram_id)
+    text = task_responses.SELECT_TASKS.format(count=len(selected))
+    await edit_task_view(
+        callback,
+        text=f"{notice}\n\n{text}" if notice else text,
+        reply_markup=get_selection_markup(tasks, set(selected), cursor),
+    )
+
+
+@task_router.callback_query(TaskCallback.filter(F.action == TaskActions.SELECT))
+async def handle_start_selection(callback: CallbackQuery, callback_data: TaskCallback) -> None:
+    """Переводит карточку задачи в режим выбора нескольких задач, начиная с текущей."""
+    fsm.set_data(telegram_id=callback.from_user.id, key="selected_tasks", value=[])
+    await display_selection_page(callback, cursor=callback_data.task_id - 1)
+    await callback.answer()
+
+
+@task_router.callback_query(
+    SelectCallback.filter(F.action.in_({SelectActions.TOGGLE, SelectActions.TOGGLE_PAGE}))
+)
+async def handle_toggle_selection(callback: CallbackQuery, callback_data: SelectCallback) -> None:
+    """Выбирает задачу или снимает выбор. Кнопка "Вся страница" выбирает все задачи
+    страницы, а если они уже выбраны - снимает с них выбор."""
+    telegram_id = callback.from_user.id
+    selected = get_selected_tasks(telegram_id)
+    tasks = await TaskDAO.get_tasks_page(
+        telegram_id, after_id=callback_data.cursor, limit=SELECT_PAGE_SIZE
+    )
+
+    if callback_data.action == SelectActions.TOGGLE:
+        toggled = [callback_data.task_id]
+    else:
+        toggled = [task["id"] for task in tasks]
+    if all(task_id in selected for task_id in toggled):
+        selected = [task_id for task_id in selected if task_id not in toggled]
+    else:
+        selected = selected + [task_id for task_id in toggled if task_id not in selected]
+
+    fsm.set_data(telegram_id=telegram_id, key="selected_tasks", value=selected)
+    await display_selection_page(callback, cursor=callback_data.cursor, tasks=tasks or None)
+    await callback.answer()
+
+
+@task_router.callback_query(
+    SelectCallback.filter(F.action.in_({SelectActions.NEXT, SelectActions.BACK}))
+)
+async def handle_selection_navigation(callback: CallbackQuery, callback_data: SelectCallback) -> None:
+    """Перелистывает страницы выбора. В task_id кнопки - крайняя задача текущей страницы."""
+    telegram_id = callback.from_user.id
+    if callback_data.action == SelectActions.NEXT:
+        tasks = await TaskDAO.get_tasks_page(
+            telegram_id, after_id=callback_data.task_id, limit=SELECT_PAGE_SIZE
+        )
+        cursor = callback_data.task_id
+    else:
+        tasks = await TaskDAO.get_previous_tasks_page(
+            telegram_id, before_id=callback_data.task_id, limit=SELECT_PAGE_SIZE
+        )
+        cursor = tasks[0]["id"] - 1 if tasks else 0
+
+    # Текущая страница крайняя - сообщение не меняется
+    if not tasks:
+        await callback.answer()
+        return
+
+    await display_selection_page(callback, cursor=cursor, tasks=tasks)
+    await callback.answer()
+
+
+def get_bulk_idempotency_key(callback: CallbackQuery, task_ids: list) -> str:
+    """Ключ идемпотентности массовой операции: кнопка и набор выбранных задач."""
+    return f"{get_idempotency_key(callback)}:{hash(tuple(task_ids))}"
+
+
+@task_router.callback_query(
+    SelectCallback.filter(F.action.in_({SelectActions.COMPLETE, SelectActions.DELETE}))
+)
+async def handle_selection_action(callback: CallbackQuery, callback_data: SelectCallback) -> None:
+    """Выполняет выбранные задачи одной записью или запрашивает подтверждение их удаления."""
+    telegram_id = callback.from_user.id
+    selected = get_selected_tasks(telegram_id)
+    if not selected:
+        await callback.answer(text=task_responses.NOTHING_SELECTED)
+        return
+
+    if callback_data.action == SelectActions.DELETE:
+        await edit_task_view(
+            callback,
+            text=task_responses.CONFIRM_BULK_DELETE.format(count=len(selected)),
+            reply_markup=get_bulk_delete_confirmation_markup(callback_data.cursor),
+        )
+        await callback.answer()
+        return
+
+    count = await TaskDAO.mark_tasks_as_completed(
+        task_ids=selected,
+        telegram_id=telegram_id,
+        idempotency_key=get_bulk_idempotency_key(callback, selected),
+    )
+    fsm.set_data(telegram_id=telegram_id, key="selected_tasks", value=[])
+    notice = task_responses.TASKS_SUCCESSFULLY_COMPLETED.format(count=count)
+    await display_selection_page(callback, cursor=callback_data.cursor, notice=notice)
+    await callback.answer(text=notice)
+
+
+@task_router.callback_query(
+    SelectCallback.filter(
+        F.action.in_({SelectActions.CONFIRM_DELETE, SelectActions.CANCEL_DELETE})
+    )
+)
+async def handle_confirm_or_cancel_bulk_delete(
+    callback: CallbackQuery, callback_data: SelectCallback
+) -> None:
+    """Удаляет выбранные задачи одной записью или возвращает страницу выбора."""
+    telegram_id = callback.from_user.id
+    if callback_data.action == SelectActions.CANCEL_DELETE:
+        await display_selection_page(callback, cursor=callback_data.cursor)
+        await callback.answer()
+        return
+
+    selected = get_selected_tasks(telegram_id)
+    count = await TaskDAO.delete_tasks(
+        task_ids=selected,
+        telegram_id=telegram_id,
+        idempotency_key=get_bulk_idempotency_key(callback, selected),
+    ) if selected else 0
+    fsm.set_data(telegram_id=telegram_id, key="selected_tasks", value=[])
+    notice = task_responses.TASKS_SUCCESSFULLY_DELETED.format(count=count)
+    await display_selection_page(callback, cursor=callback_data.cursor, notice=notice)
+    await callback.answer(text=notice)
+
+
+@task_router.callback_query(SelectCallback.filter(F.action == SelectActions.EXIT))
+async def handle_exit_selection(callback: CallbackQuery) -> None:
+    """Выходит из режима выбора: в сообщении снова карточка первой задачи."""
+    telegram_id = callback.from_user.id
+    fsm.set_data(telegram_id=telegram_id, key="selected_tasks", value=[])
+
+    task = await TaskDAO.get_first_task(telegram_id=telegram_id)
+    if not task:
+        await edit_task_view(callback, text=task_responses.YOU_HAVE_NOT_ANY_TASK)
+    else:
+        last_task_number = await TaskDAO.count_tasks(telegram_id=telegram_id)
+        await display_task_card(callback, task, 1, last_task_number)
+    await callback.answer()
+
+
+# ------------------- endregion Выбор нескольких задач -------------------
+
+# ------------------- region Поиск задач -------------------
+SEARCH_PAGE_SIZE = 5  # Количество задач на странице результатов поиска
+SEARCH_PREVIEW_LENGTH = 60  # Сколько символов описания показывать в результатах
+
+
+@task_router.state_message(base_states.IN_MENU, text="Поиск задач🔎")
+async def handle_wait_for_search_query(message: Message) -> None:
+    """Запрашивает у пользователя поисковый запрос."""
+    fsm.set_state(telegram_id=message.from_user.id, state=task_states.WAIT_FOR_SEARCH_QUERY)
+    await message.answer(text=task_responses.REQUEST_FOR_SEARCH_QUERY)
+
+
+async def get_search_page(telegram_id: int, query: str, page: int) -> tuple:
+    """Формирует страницу результатов поиска.
+
+    :return: Текст страницы и клавиатура перелистывания (None, если ничего не найдено).
+    """
+    tasks = await TaskDAO.search_tasks(
+        telegram_id=telegram_id,
+        text=query,
+        limit=SEARCH_PAGE_SIZE + 1,
+        offset=page * SEARCH_PAGE_SIZE,
+    )
+    if not tasks:
+        return task_responses.NOTHING_FOUND, None
+
+    # Сообщение разбирается как HTML: запрос и текст задач экранируются
+    lines = [f"Результаты поиска «{html.escape(query)}», страница {page + 1}:"]
+    for number, task in enumerate(tasks[:SEARCH_PAGE_SIZE], start=page * SEARCH_PAGE_SIZE + 1):
+        description = task["description"] or ""
+        if len(description) > SEARCH_PREVIEW_LENGTH:
+            description = description[:SEARCH_PREVIEW_LENGTH] + "…"
+        lines.append(f"{number}. <b>{html.escape(task['title'])}</b>\n{html.escape(description)}")
+
+    has_next_page = len(tasks) > SEARCH_PAGE_SIZE
+    reply_markup = (
+        get_search_results_markup(page, has_next_page) if page or has_next_page else None
+    )
+    return "\n\n".join(lines), reply_markup
+
+
+@task_router.state_message(task_states.WAIT_FOR_SEARCH_QUERY)
+async def handle_search_query(message: Message) -> None:
+    """Ищет задачи пользователя и отправляет первую страницу результатов.
+
+    Запрос сохраняется в FSM, чтобы кнопки страниц не передавали его в callback_data.
+    """
+    telegram_id = message.from_user.id
+    fsm.set_data(telegram_id=telegram_id, key="search_query", value=message.text)
+    fsm.set_state(telegram_id=telegram_id, state=base_states.IN_MENU)
+
+    text, reply_markup = await get_search_page(telegram_id, message.text, page=0)
+    await message.answer(text=text, reply_markup=reply_markup)
+
+
+@task_router.callback_query(SearchCallback.filter())
+async def handle_search_page(callback: CallbackQuery, callback_data: SearchCallback) -> None:
+    """Перелистывает результаты поиска в том же сообщении."""
+    telegram_id = callback.from_user.id
+    query = fsm.get_data(telegram_id, key="search_query")
+    if not query:
+        await callback.answer(text=task_responses.TASK_KEYBOARD_IS_OUTDATED, show_alert=True)
+        return
+
+    text, reply_markup = await get_search_page(telegram_id, query, page=callback_data.page)
+    await edit_task_view(callback, text=text, reply_markup=reply_markup)
+    await callback.answer()
+
+
+# ------------------- endregion Поиск задач -------------------
@@ -0,0 +1,25 @@
+from functools import lru_cache, wraps
+
+
+def cached_markup(maxsize: int | None = None):
+    """Кэширует клавиатуру по аргументам функции сборки.
+
+    Клавиатуры aiogram - изменяемые объекты, поэтому из кэша отдается глубокая копия: она
+    в несколько раз дешевле сборки, а изменения у одного вызывающего не попадают к другим.
+    `cache_info` и `cache_clear` - как у `lru_cache`, `__wrapped__` - исходная функция сборки.
+
+    :param maxsize: Сколько клавиатур хранить (None - без ограничения).
+    """
+
+    def decorator(function):
+        cached = lru_cache(maxsize=maxsize)(function)
+
+        @wraps(function)
+        def wrapper(*args, **kwargs):
+            return cached(*args, **kwargs).model_copy(deep=True)
+
+        wrapper.cache_info = cached.cache_info
+        wrapper.cache_clear = cached.cache_clear
+        return wrapper
+
+    return decorator
@@ -1,8 +1,14 @@
 from aiogram.utils.keyboard import InlineKeyboardBuilder, InlineKeyboardMarkup
 
+from keyboards import cached_markup
 
+
+@cached_markup()
 def get_confirmation_keyboard_markup() -> InlineKeyboardMarkup:
-    """Получение registration клавиатуры для подтверждения имени пользователя."""
+    """Получение registration клавиатуры для подтверждения имени пользователя.
+
+    Клавиатура собирается один раз, дальше отдается ее копия.
+    """
     buttons = InlineKeyboardBuilder()
     buttons.button(text="✅", callback_data="confirm")
     buttons.button(text="❌", callback_data="cancel")
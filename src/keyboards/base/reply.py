@@ -1,12 +1,16 @@
 from aiogram.utils.keyboard import ReplyKeyboardBuilder, ReplyKeyboardMarkup
 
+from keyboards import cached_markup
 
+
+@cached_markup()
 def get_menu_markup() -> ReplyKeyboardMarkup:
-    """Получение меню клавиатуры."""
+    """Получение меню клавиатуры. Собирается при первом вызове, дальше отдается копия."""
     buttons = ReplyKeyboardBuilder()
 
     buttons.button(text="Добавить задачу➕")
     buttons.button(text="Список задач🗓")
+    buttons.button(text="Поиск задач🔎")
     buttons.adjust(1, repeat=False)
 
     return buttons.as_markup(resize_keyboard=True, one_time_keyboard=True)
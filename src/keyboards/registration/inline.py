@@ -1,8 +1,11 @@
 from aiogram.utils.keyboard import InlineKeyboardBuilder, InlineKeyboardMarkup
 
+from keyboards import cached_markup
 
+
+@cached_markup()
 def get_user_login_markup() -> InlineKeyboardMarkup:
-    """Получение registration клавиатуры для взятия логина из телеграма."""
+    """Получение registration клавиатуры для взятия логина из телеграма (собирается один раз)."""
     buttons = InlineKeyboardBuilder()
 
     buttons.button(
@@ -0,0 +1,94 @@
+from aiogram.filters.callback_data import CallbackData
+
+
+class TaskActions:
+    """Действия с задачей, передаваемые в callback_data."""
+    NEXT = "next"
+    BACK = "back"
+    COMPLETE = "done"
+    DELETE = "del"
+    CONFIRM_DELETE = "del_ok"
+    CANCEL_DELETE = "del_no"
+    SELECT = "select"
+    LIST = "list"
+
+
+class TaskCallback(CallbackData, prefix="t1"):
+    """Callback_data карточки задачи: действие, ID задачи и ее позиция в списке.
+
+    Хэндлеры работают с задачей напрямую по ID, не обращаясь к FSM. Версия формата
+    зашита в префикс: при изменении полей префикс нужно сменить (t2, t3, ...),
+    чтобы кнопки старых сообщений не разбирались по новому формату.
+    """
+
+    action: str
+    task_id: int
+    number: int  # Номер задачи в списке пользователя
+    last: int  # Количество задач на момент отрисовки карточки
+
+
+class SearchCallback(CallbackData, prefix="s1"):
+    """Callback_data страницы результатов поиска. Сам запрос хранится в FSM."""
+
+    page: int
+
+
+class SelectActions:
+    """Действия режима выбора нескольких задач, передаваемые в callback_data."""
+    TOGGLE = "tgl"
+    TOGGLE_PAGE = "all"
+    NEXT = "next"
+    BACK = "back"
+    COMPLETE = "done"
+    DELETE = "del"
+    CONFIRM_DELETE = "del_ok"
+    CANCEL_DELETE = "del_no"
+    EXIT = "exit"
+
+
+class SelectCallback(CallbackData, prefix="m1"):
+    """Callback_data режима выбора нескольких задач.
+
+    Страница показывает задачи с ID больше `cursor`. Выбранные задачи хранятся в FSM.
+    """
+
+    action: str
+    task_id: int  # Задача, которую выбирают, или граница страницы для перелистывания
+    cursor: int
+
+
+class ListActions:
+    """Действия со страницей списка задач, передаваемые в callback_data."""
+    OPEN = "open"
+    COMPLETE = "done"
+    DELETE = "del"
+    CONFIRM_DELETE = "del_ok"
+    CANCEL_DELETE = "del_no"
+    NEXT = "next"
+    BACK = "back"
+
+
+class ListCallback(CallbackData, prefix="l1"):
+    """Callback_data страницы списка задач.
+
+    Страница показывает задачи с ID больше `cursor`, первая из них имеет номер `number`.
+    У кнопки открытия карточки `number` - номер самой задачи.
+    """
+
+    action: str
+    task_id: int  # Задача, к которой относится действие, или граница страницы для перелистывания
+    cursor: int
+    number: int
+
+
+class DescriptionCallback(CallbackData, prefix="d1"):
+    """Callback_data постраничного просмотра описания задачи.
+
+    Страница 0 - карточка задачи. Номер задачи в списке и количество задач нужны,
+    чтобы вернуть карточку в прежнем виде.
+    """
+
+    task_id: int
+    page: int
+    number: int
+    last: int
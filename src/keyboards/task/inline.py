@@ -1,24 +1,236 @@
 from aiogram.utils.keyboard import InlineKeyboardBuilder, InlineKeyboardMarkup
 
+from config import settings
+from keyboards import cached_markup
+from keyboards.task.callbacks import (
+    DescriptionCallback,
+    ListActions,
+    ListCallback,
+    SearchCallback,
+    SelectActions,
+    SelectCallback,
+    TaskActions,
+    TaskCallback,
+)
 
+SELECT_BUTTON_TITLE_LENGTH = 32  # Сколько символов заголовка помещается на кнопке выбора задачи
+# Клавиатуры, которые зависят только от чисел, кэшируются по аргументам: сборка карточки задачи
+# занимает около миллисекунды, а при перелистывании карточки повторяются. Клавиатуры выбора
+# и страниц списка принимают списки задач и не кэшируются (страницы списка кэширует
+# `handlers.task.list_pages_cache`)
+
+
+@cached_markup(settings.MARKUP_CACHE_SIZE)
 def get_task_manager_markup(
-    current_task_number: int, last_task_number: int
+    task_id: int, current_task_number: int, last_task_number: int, has_full_description: bool = False
 ) -> InlineKeyboardMarkup:
-    """Получение меню для управления задачей."""
+    """Получение меню для управления задачей.
+
+    :param has_full_description: Описание в карточке обрезано - добавить кнопку полного описания.
+    """
     buttons = InlineKeyboardBuilder()
 
+    def callback_data(action: str) -> TaskCallback:
+        return TaskCallback(
+            action=action,
+            task_id=task_id,
+            number=current_task_number,
+            last=last_task_number,
+        )
+
     # Верхний ряд кнопок
-    buttons.button(text="Задача выполнена ✅", callback_data="task_completed")
-    buttons.button(text="Удалить задачу 🗑", callback_data="delete_task")
+    buttons.button(text="Задача выполнена ✅", callback_data=callback_data(TaskActions.COMPLETE))
+    buttons.button(text="Удалить задачу 🗑", callback_data=callback_data(TaskActions.DELETE))
 
     # Нижний ряд кнопок
-    buttons.button(text="⬅ Назад", callback_data="back")
+    buttons.button(text="⬅ Назад", callback_data=callback_data(TaskActions.BACK))
     buttons.button(
         text=f"{current_task_number}/{last_task_number}",
         callback_data="pagination_info",
     )
-    buttons.button(text="Вперед ➡", callback_data="next")
+    buttons.button(text="Вперед ➡", callback_data=callback_data(TaskActions.NEXT))
+
+    if has_full_description:
+        buttons.button(
+            text="Описание полностью 📖",
+            callback_data=DescriptionCallback(
+                task_id=task_id, page=1, number=current_task_number, last=last_task_number
+            ),
+        )
+
+    buttons.button(text="Выбрать несколько ☑", callback_data=callback_data(TaskActions.SELECT))
+    buttons.button(text="Списком 📋", callback_data=callback_data(TaskActions.LIST))
+
+    # Располагаем кнопки в три-четыре ряда
+    buttons.adjust(2, 3, *([1] if has_full_description else []), 2)
+    return buttons.as_markup()
+
+
+@cached_markup(settings.MARKUP_CACHE_SIZE)
+def get_delete_confirmation_markup(
+    task_id: int, current_task_number: int, last_task_number: int
+) -> InlineKeyboardMarkup:
+    """Получение клавиатуры подтверждения удаления задачи."""
+    buttons = InlineKeyboardBuilder()
+    for text, action in (("✅", TaskActions.CONFIRM_DELETE), ("❌", TaskActions.CANCEL_DELETE)):
+        buttons.button(
+            text=text,
+            callback_data=TaskCallback(
+                action=action,
+                task_id=task_id,
+                number=current_task_number,
+                last=last_task_number,
+            ),
+        )
+
+    buttons.adjust(2)
+
+    return buttons.as_markup()
+
+
+@cached_markup(settings.MARKUP_CACHE_SIZE)
+def get_search_results_markup(page: int, has_next_page: bool) -> InlineKeyboardMarkup:
+    """Получение клавиатуры перелистывания страниц результатов поиска."""
+    buttons = InlineKeyboardBuilder()
+    if page > 0:
+        buttons.button(text="⬅ Назад", callback_data=SearchCallback(page=page - 1))
+    if has_next_page:
+        buttons.button(text="Вперед ➡", callback_data=SearchCallback(page=page + 1))
+
+    buttons.adjust(2)
+    return buttons.as_markup()
+
+
+def get_selection_markup(tasks: list, selected: set, cursor: int) -> InlineKeyboardMarkup:
+    """Получение клавиатуры выбора нескольких задач на странице.
+
+    :param tasks: Задачи текущей страницы;
+    :param selected: ID выбранных задач (в том числе на других страницах);
+    :param cursor: Курсор текущей страницы.
+    """
+    buttons = InlineKeyboardBuilder()
+
+    def callback_data(action: str, task_id: int = 0) -> SelectCallback:
+        return SelectCallback(action=action, task_id=task_id, cursor=cursor)
+
+    # По кнопке на задачу
+    for task in tasks:
+        title = task["title"]
+        if len(title) > SELECT_BUTTON_TITLE_LENGTH:
+            title = title[:SELECT_BUTTON_TITLE_LENGTH] + "…"
+        mark = "☑" if task["id"] in selected else "▫"
+        buttons.button(text=f"{mark} {title}", callback_data=callback_data(SelectActions.TOGGLE, task["id"]))
+
+    # Перелистывание страниц и выбор всей страницы
+    buttons.button(text="⬅", callback_data=callback_data(SelectActions.BACK, tasks[0]["id"]))
+    buttons.button(text="Вся страница", callback_data=callback_data(SelectActions.TOGGLE_PAGE))
+    buttons.button(text="➡", callback_data=callback_data(SelectActions.NEXT, tasks[-1]["id"]))
+
+    # Действия с выбранными задачами
+    buttons.button(text=f"Выполнить ✅ ({len(selected)})", callback_data=callback_data(SelectActions.COMPLETE))
+    buttons.button(text=f"Удалить 🗑 ({len(selected)})", callback_data=callback_data(SelectActions.DELETE))
+    buttons.button(text="Выйти", callback_data=callback_data(SelectActions.EXIT))
+
+    buttons.adjust(*([1] * len(tasks)), 3, 2, 1)
+    return buttons.as_markup()
+
+
+@cached_markup(settings.MARKUP_CACHE_SIZE)
+def get_bulk_delete_confirmation_markup(cursor: int) -> InlineKeyboardMarkup:
+    """Получение клавиатуры подтверждения удаления выбранных задач."""
+    buttons = InlineKeyboardBuilder()
+    for text, action in (("✅", SelectActions.CONFIRM_DELETE), ("❌", SelectActions.CANCEL_DELETE)):
+        buttons.button(text=text, callback_data=SelectCallback(action=action, task_id=0, cursor=cursor))
 
-    # Располагаем кнопки в два ряда
-    buttons.adjust(2, 3)
+    buttons.adjust(2)
     return buttons.as_markup()
+
+
+def get_task_list_markup(
+    tasks: list, cursor: int, number: int, has_next_page: bool
+) -> InlineKeyboardMarkup:
+    """Получение клавиатуры страницы списка задач: ряд действий на каждую задачу и перелистывание.
+
+    :param tasks: Задачи страницы;
+    :param cursor: Курсор страницы;
+    :param number: Номер первой задачи страницы в списке;
+    :param has_next_page: Есть ли задачи после страницы.
+    """
+    buttons = InlineKeyboardBuilder()
+
+    def callback_data(action: str, task_id: int) -> ListCallback:
+        return ListCallback(action=action, task_id=task_id, cursor=cursor, number=number)
+
+    for task_number, task in enumerate(tasks, start=number):
+        # Карточке нужен номер самой задачи, а не первой задачи страницы
+        open_task = ListCallback(
+            action=ListActions.OPEN, task_id=task["id"], cursor=cursor, number=task_number
+        )
+        buttons.button(text=f"{task_number} 📄", callback_data=open_task)
+        buttons.button(text="✅", callback_data=callback_data(ListActions.COMPLETE, task["id"]))
+        buttons.button(text="🗑", callback_data=callback_data(ListActions.DELETE, task["id"]))
+
+    navigation = 0
+    if number > 1:
+        buttons.button(text="⬅ Назад", callback_data=callback_data(ListActions.BACK, tasks[0]["id"]))
+        navigation += 1
+    if has_next_page:
+        buttons.button(text="Вперед ➡", callback_data=callback_data(ListActions.NEXT, tasks[-1]["id"]))
+        navigation += 1
+
+    buttons.adjust(*([3] * len(tasks)), *([navigation] if navigation else []))
+    return buttons.as_markup()
+
+
+@cached_markup(settings.MARKUP_CACHE_SIZE)
+def get_list_delete_confirmation_markup(task_id: int, cursor: int, number: int) -> InlineKeyboardMarkup:
+    """Получение клавиатуры подтверждения удаления задачи со страницы списка."""
+    buttons = InlineKeyboardBuilder()
+    for text, action in (("✅", ListActions.CONFIRM_DELETE), ("❌", ListActions.CANCEL_DELETE)):
+        buttons.button(
+            text=text,
+            callback_data=ListCallback(action=action, task_id=task_id, cursor=cursor, number=number),
+        )
+
+    buttons.adjust(2)
+    return buttons.as_markup()
+
+
+@cached_markup(settings.MARKUP_CACHE_SIZE)
+def get_description_pages_markup(
+    task_id: int, page: int, pages: int, current_task_number: int, last_task_number: int
+) -> InlineKeyboardMarkup:
+    """Получение клавиатуры перелистывания описания задачи."""
+    buttons = InlineKeyboardBuilder()
+
+    def callback_data(to_page: int) -> DescriptionCallback:
+        return DescriptionCallback(
+            task_id=task_id, page=to_page, number=current_task_number, last=last_task_number
+        )
+
+    navigation = 0
+    if page > 1:
+        buttons.button(text="⬅ Назад", callback_data=callback_data(page - 1))
+        navigation += 1
+    if page < pages:
+        buttons.button(text="Вперед ➡", callback_data=callback_data(page + 1))
+        navigation += 1
+    buttons.button(text="К задаче ↩", callback_data=callback_data(0))
+
+    buttons.adjust(*([navigation] if navigation else []), 1)
+    return buttons.as_markup()
+
+
+def get_markup_cache_stats() -> dict:
+    """Возвращает счетчики кэшей клавиатур по названиям функций."""
+    return {
+        function.__name__: function.cache_info()._asdict()
+        for function in (
+            get_task_manager_markup,
+            get_delete_confirmation_markup,
+            get_search_results_markup,
+            get_bulk_delete_confirmation_markup,
+            get_list_delete_confirmation_markup,
+            get_description_pages_markup,
+        )
+    }
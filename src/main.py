@@ -1,19 +1,127 @@
+import asyncio
 import logging
-from bot import bot, disp
+from bot import bot, disp, send_queue
+from config import settings
+from dao import HOT_QUERIES, idempotency_keys, users_cache
+from database import shards
+from dispatching import DuplicateUpdateMiddleware, PerUserOrderMiddleware, StateDispatchMiddleware
+from fsm_storages import create_storage
 from handlers import routers
+from handlers.task import list_pages_cache
+from keyboards.task.inline import get_markup_cache_stats
+from maintenance import TaskArchiver
+from tracing import HandlerTracingMiddleware, TracingMiddleware, start_metrics_server
+from utils import fsm, get_shard_db_names
+from webhook import run_webhook
+from workers import run_worker
+
+
+# Замер времени обработки обновлений: общее, в хэндлере, в БД и в Bot API
+tracing = TracingMiddleware(sample_rate=settings.TRACE_SAMPLE_RATE)
+# Повторно доставленные обновления и callback-запросы отбрасываются до обработки
+deduplication = DuplicateUpdateMiddleware(max_size=settings.DEDUP_CACHE_SIZE, ttl=settings.DEDUP_TTL)
+# Обновления одного пользователя обрабатываются по очереди, разных - одновременно
+update_order = PerUserOrderMiddleware(
+    max_workers=settings.UPDATE_MAX_WORKERS,
+    max_pending_per_user=settings.UPDATE_MAX_PENDING_PER_USER,
+)
+# Перенос старых выполненных и удаленных задач в архив и освобождение места в файле базы.
+# У каждого шарда свой файл архива. В многопроцессном режиме шард обслуживает один воркер
+archivers = [
+    TaskArchiver(
+        shard,
+        archive_db_name=archive_db_name,
+        interval=settings.ARCHIVE_INTERVAL,
+        archive_after=settings.ARCHIVE_AFTER,
+        batch_size=settings.ARCHIVE_BATCH_SIZE,
+        vacuum_step_pages=settings.VACUUM_STEP_PAGES,
+    )
+    for index, (shard, archive_db_name) in enumerate(
+        zip(shards, get_shard_db_names(settings.ARCHIVE_DB_NAME, len(shards)))
+    )
+    if index % settings.BOT_WORKERS == settings.BOT_WORKER_INDEX
+]
+
+
+@disp.shutdown()
+async def on_shutdown() -> None:
+    """Освобождает ресурсы после того, как обработаны все принятые обновления."""
+    # Дожидаемся отправки сообщений из очереди
+    await send_queue.close()
+    await asyncio.gather(*(archiver.stop() for archiver in archivers))
+    # Дожидаемся коммита записей, которые еще ждут в очереди
+    await shards.flush()
+    fsm.storage.close()
+    logging.info(f"Групповой коммит (по шардам): {shards.write_stats()}")
+    logging.info(f"Кэш пользователей: {users_cache.stats()}")
+    logging.info(f"Кэш страниц списка задач: {list_pages_cache.stats()}")
+    logging.info(f"Кэш клавиатур: {get_markup_cache_stats()}")
+    logging.info(f"Очередь отправки: {send_queue.stats()}")
+    logging.info(f"Обработка обновлений: {update_order.stats()}")
+    logging.info(
+        f"Повторы: {deduplication.stats()}, пропущено записей: {idempotency_keys.hits}"
+    )
+    logging.info(f"Обслуживание базы данных: {[archiver.stats() for archiver in archivers]}")
 
 
 async def main() -> None:
     logging.basicConfig(level=logging.INFO)
+    await shards.check_query_plans(HOT_QUERIES)
+    fsm.set_storage(
+        create_storage(
+            kind=settings.FSM_STORAGE,
+            max_sessions=settings.FSM_MAX_SESSIONS,
+            ttl=settings.FSM_SESSION_TTL,
+            db_name=settings.FSM_DB_NAME,
+        )
+    )
 
     # Регистрируем роуты
+    handler_tracing = HandlerTracingMiddleware()
     for router in routers:
         disp.include_router(router)
+        router.message.middleware(handler_tracing)
+        router.callback_query.middleware(handler_tracing)
 
-    await disp.start_polling(bot)
+    disp.update.outer_middleware(tracing)
+    disp.update.outer_middleware(deduplication)
+    disp.update.outer_middleware(update_order)
 
+    # Маршрутизация обновлений по индексу состояний до обхода фильтров роутеров
+    state_dispatch = StateDispatchMiddleware()
+    disp.message.outer_middleware(state_dispatch)
+    disp.callback_query.outer_middleware(state_dispatch)
 
-if __name__ == "__main__":
-    import asyncio
+    metrics_runner = None
+    if settings.METRICS_PORT:
+        metrics_runner = await start_metrics_server(settings.METRICS_HOST, settings.METRICS_PORT)
+    if settings.ARCHIVE_INTERVAL:
+        for archiver in archivers:
+            archiver.start()
+
+    try:
+        if settings.BOT_MODE == "webhook":
+            await run_webhook(
+                dispatcher=disp,
+                bot=bot,
+                base_url=settings.WEBHOOK_BASE_URL,
+                path=settings.WEBHOOK_PATH,
+                host=settings.WEBHOOK_HOST,
+                port=settings.WEBHOOK_PORT,
+                max_concurrency=settings.WEBHOOK_MAX_CONCURRENCY,
+                secret_token=settings.WEBHOOK_SECRET,
+                send_queue=send_queue,
+            )
+        elif settings.BOT_MODE == "worker":
+            # Обновления раздает главный процесс (python workers.py)
+            await run_worker(disp, bot)
+        else:
+            await bot.delete_webhook()
+            await disp.start_polling(bot)
+    finally:
+        if metrics_runner is not None:
+            await metrics_runner.cleanup()
 
+
+if __name__ == "__main__":
     asyncio.run(main())
@@ -0,0 +1,259 @@
+import asyncio
+import json
+import logging
+import sqlite3
+import time
+from typing import Optional
+
+from database import Connection
+
+ARCHIVE_TABLE_QUERY = (
+    "CREATE TABLE IF NOT EXISTS archive.tasks("
+    "id INTEGER PRIMARY KEY,"
+    "title VARCHAR(80) NOT NULL,"
+    "description TEXT,"
+    "status BOOLEAN,"
+    "is_deleted BOOLEAN,"
+    "telegram_user_id INTEGER,"
+    "closed_at INTEGER,"
+    "archived_at INTEGER"  # Unix-время переноса в архив
+    ");"
+)
+# Использует частичный индекс idx_tasks_closed
+SELECT_CLOSED_TASKS_QUERY = (
+    "SELECT id FROM tasks WHERE (status=1 OR is_deleted=1) AND closed_at<? "
+    "ORDER BY closed_at LIMIT ?;"
+)
+ARCHIVE_TASKS_QUERY = (
+    "INSERT OR REPLACE INTO archive.tasks "
+    "SELECT id, title, description, status, is_deleted, telegram_user_id, closed_at, strftime('%s', 'now') "
+    "FROM main.tasks WHERE id IN (SELECT value FROM json_each(?));"
+)
+DELETE_ARCHIVED_TASKS_QUERY = "DELETE FROM main.tasks WHERE id IN (SELECT value FROM json_each(?));"
+INCREMENTAL_AUTO_VACUUM = 2  # Значение PRAGMA auto_vacuum для режима INCREMENTAL
+
+
+# ------------------- region Операции в потоке базы данных -------------------
+def attach_archive(db: sqlite3.Connection, archive_db_name: str) -> None:
+    """Подключает файл архива к соединению бота и создает в нем таблицу задач."""
+    attached = [row[1] for row in db.execute("PRAGMA database_list;")]
+    if "archive" not in attached:
+        db.execute("ATTACH DATABASE ? AS archive;", (archive_db_name,))
+    db.execute(ARCHIVE_TABLE_QUERY)
+    db.commit()
+
+
+def archive_batch(db: sqlite3.Connection, closed_before: int, batch_size: int) -> int:
+    """Переносит одну пачку закрытых задач в архив одной транзакцией.
+
+    :param closed_before: Переносятся задачи, закрытые раньше этого Unix-времени;
+    :param batch_size: Максимальное количество задач в пачке.
+    :return: Количество перенесенных задач.
+    """
+    ids = [row[0] for row in db.execute(SELECT_CLOSED_TASKS_QUERY, (closed_before, batch_size))]
+    if not ids:
+        return 0
+
+    args = (json.dumps(ids),)
+    cursor = db.cursor()
+    try:
+        cursor.execute("BEGIN;")
+        cursor.execute(ARCHIVE_TASKS_QUERY, args)
+        cursor.execute(DELETE_ARCHIVED_TASKS_QUERY, args)
+        db.commit()
+    except sqlite3.DatabaseError:
+        db.rollback()
+        raise
+    finally:
+        cursor.close()
+    return len(ids)
+
+
+def vacuum_step(db: sqlite3.Connection, pages: int) -> int:
+    """Возвращает файловой системе до `pages` свободных страниц.
+
+    :return: Количество свободных страниц, которые остались в файле.
+    """
+    # incremental_vacuum освобождает по странице на каждую строку результата
+    db.execute(f"PRAGMA incremental_vacuum({int(pages)});").fetchall()
+    return db.execute("PRAGMA freelist_count;").fetchone()[0]
+
+
+def database_size(db: sqlite3.Connection) -> dict:
+    """Размер файла базы данных и таблицы задач."""
+    page_size = db.execute("PRAGMA page_size;").fetchone()[0]
+    return {
+        "file_bytes": db.execute("PRAGMA page_count;").fetchone()[0] * page_size,
+        "free_bytes": db.execute("PRAGMA freelist_count;").fetchone()[0] * page_size,
+        "auto_vacuum": db.execute("PRAGMA auto_vacuum;").fetchone()[0],
+        "tasks": db.execute("SELECT COUNT(*) FROM tasks;").fetchone()[0],
+        "active_tasks": db.execute(
+            "SELECT COUNT(*) FROM tasks WHERE status=0 AND is_deleted=0;"
+        ).fetchone()[0],
+    }
+
+
+def enable_incremental_vacuum(db: sqlite3.Connection) -> None:
+    """Переводит существующую базу в режим auto_vacuum=INCREMENTAL.
+
+    Требует полного VACUUM, который блокирует базу на время перестройки файла,
+    поэтому выполняется отдельно от бота.
+    """
+    db.execute("PRAGMA auto_vacuum=INCREMENTAL;")
+    db.execute("VACUUM;")
+
+
+# ------------------- endregion Операции в потоке базы данных -------------------
+
+
+class TaskArchiver:
+    """Фоновое обслуживание таблицы задач.
+
+    Раз в `interval` секунд переносит выполненные и удаленные задачи, закрытые больше
+    `archive_after` секунд назад, в таблицу `tasks` файла архива, а затем возвращает
+    освободившиеся страницы файловой системе (PRAGMA incremental_vacuum).
+
+    Перенос и освобождение места идут небольшими порциями в потоке базы данных:
+    между порциями выполняются запросы хэндлеров, поэтому бот не ждет всю чистку.
+    """
+
+    def __init__(
+        self,
+        connection: Connection,
+        archive_db_name: str,
+        interval: float = 3600,
+        archive_after: float = 7 * 24 * 60 * 60,
+        batch_size: int = 500,
+        vacuum_step_pages: int = 256,
+    ):
+        """
+        :param connection: Соединение с базой данных бота;
+        :param archive_db_name: Файл базы данных архива;
+        :param interval: Период обслуживания в секундах;
+        :param archive_after: Через сколько секунд после закрытия задача переносится в архив;
+        :param batch_size: Сколько задач переносить одной транзакцией;
+        :param vacuum_step_pages: Сколько страниц освобождать за один шаг.
+        """
+        self.connection = connection
+        self.archive_db_name = archive_db_name
+        self.interval = interval
+        self.archive_after = archive_after
+        self.batch_size = max(batch_size, 1)
+        self.vacuum_step_pages = max(vacuum_step_pages, 1)
+        self._task: Optional[asyncio.Task] = None
+        self._attached = False
+        self._warned_about_auto_vacuum = False
+        # Метрики
+        self.runs = 0
+        self.archived = 0
+        self.reclaimed_bytes = 0
+        self.last_report: dict = {}
+
+    async def run_once(self) -> dict:
+        """Выполняет одно обслуживание: перенос в архив и освобождение места.
+
+        :return: Отчет: сколько задач перенесено, сколько байт возвращено, размеры таблицы и файла.
+        """
+        started = time.perf_counter()
+        if not self._attached:
+            await self.connection.execute_in_thread(attach_archive, self.archive_db_name)
+            self._attached = True
+        before = await self.connection.execute_in_thread(database_size)
+
+        archived = 0
+        closed_before = int(time.time() - self.archive_after)
+        while True:
+            count = await self.connection.execute_in_thread(archive_batch, closed_before, self.batch_size)
+            archived += count
+            if count < self.batch_size:
+                break
+
+        if before["auto_vacuum"] == INCREMENTAL_AUTO_VACUUM:
+            while await self.connection.execute_in_thread(vacuum_step, self.vacuum_step_pages):
+                pass
+        elif not self._warned_about_auto_vacuum:
+            self._warned_about_auto_vacuum = True
+            logging.warning(
+                "База создана без auto_vacuum=INCREMENTAL, место после переноса в архив "
+                "не возвращается. Остановите бота и выполните `python -m maintenance --enable-incremental-vacuum`"
+            )
+
+        after = await self.connection.execute_in_thread(database_size)
+        report = {
+            "archived": archived,
+            "reclaimed_bytes": max(before["file_bytes"] - after["file_bytes"], 0),
+            "file_bytes": after["file_bytes"],
+            "free_bytes": after["free_bytes"],
+            "tasks": after["tasks"],
+            "active_tasks": after["active_tasks"],
+            "duration_ms": round((time.perf_counter() - started) * 1000, 2),
+        }
+        self.runs += 1
+        self.archived += archived
+        self.reclaimed_bytes += report["reclaimed_bytes"]
+        self.last_report = report
+        return report
+
+    async def _run_periodically(self) -> None:
+        while True:
+            try:
+                report = await self.run_once()
+                logging.info(f"Обслуживание базы данных: {report}")
+            except Exception:
+                logging.exception("Ошибка обслуживания базы данных")
+            await asyncio.sleep(self.interval)
+
+    def start(self) -> None:
+        """Запускает периодическое обслуживание в текущем цикле событий."""
+        if self._task is None:
+            self._task = asyncio.create_task(self._run_periodically())
+
+    async def stop(self) -> None:
+        """Останавливает периодическое обслуживание."""
+        if self._task is None:
+            return
+        self._task.cancel()
+        await asyncio.gather(self._task, return_exceptions=True)
+        self._task = None
+
+    def stats(self) -> dict:
+        """Метрики обслуживания за время работы бота."""
+        return {
+            "runs": self.runs,
+            "archived": self.archived,
+            "reclaimed_bytes": self.reclaimed_bytes,
+            "last": self.last_report,
+        }
+
+
+if __name__ == "__main__":
+    import argparse
+
+    from config import settings
+    from database import shards
+    from utils import get_shard_db_names
+
+    parser = argparse.ArgumentParser(description="Обслуживание базы данных задач")
+    parser.add_argument(
+        "--enable-incremental-vacuum",
+        action="store_true",
+        help="Перевести базу в режим auto_vacuum=INCREMENTAL (полный VACUUM, бот должен быть остановлен)",
+    )
+    args = parser.parse_args()
+
+    async def main() -> None:
+        logging.basicConfig(level=logging.INFO)
+        archive_db_names = get_shard_db_names(settings.ARCHIVE_DB_NAME, len(shards))
+        for shard, archive_db_name in zip(shards, archive_db_names):
+            if args.enable_incremental_vacuum:
+                await shard.execute_in_thread(enable_incremental_vacuum)
+            archiver = TaskArchiver(
+                shard,
+                archive_db_name=archive_db_name,
+                archive_after=settings.ARCHIVE_AFTER,
+                batch_size=settings.ARCHIVE_BATCH_SIZE,
+                vacuum_step_pages=settings.VACUUM_STEP_PAGES,
+            )
+            logging.info(f"Обслуживание базы данных {shard.db_name}: {await archiver.run_once()}")
+
+    asyncio.run(main())
@@ -0,0 +1,140 @@
+"""Изменение количества шардов базы данных.
+
+Выполняется при остановленном боте:
+    DB_SHARDS=1 python -m resharding --to 4
+
+Пользователи и их задачи переписываются из текущих файлов (`DB_SHARDS` из настроек)
+в файлы нового набора шардов по `telegram_id % <новое количество>`. Новые файлы сначала
+пишутся рядом с суффиксом `.new`, затем старые файлы переименовываются в `.old`, а новые
+встают на их место. После проверки работы бота с новым `DB_SHARDS` файлы `.old` можно удалить.
+
+ID задач при разбиении одного файла сохраняются. При переносе из нескольких шардов
+ID в разных шардах могут совпадать, поэтому задачи нумеруются заново в прежнем порядке
+внутри каждого пользователя; кнопки в уже отправленных сообщениях после этого устаревают.
+Файлы архива старого набора шардов тоже переименовываются в `.old`: новые шарды начинают
+свой архив с нуля, и старые записи архива не перезаписываются задачами с новыми ID.
+"""
+import itertools
+import logging
+import os
+import sqlite3
+from operator import itemgetter
+
+from config import settings
+from database import Connection, shards
+from utils import get_shard_db_names
+
+USER_COLUMNS = "name, login, telegram_id"
+TASK_COLUMNS = "title, description, status, is_deleted, telegram_user_id, closed_at"
+OLD_SUFFIX = ".old"
+NEW_SUFFIX = ".new"
+
+
+def create_shard(db_name: str) -> sqlite3.Connection:
+    """Создает пустой файл шарда со схемой бота и открывает его для переноса."""
+    if os.path.exists(db_name):
+        os.remove(db_name)
+    # Схему (таблицы, индексы, триггеры поиска, auto_vacuum) создает само соединение бота
+    Connection(db_name=db_name).close()
+    return sqlite3.connect(db_name)
+
+
+def copy_shard(source: sqlite3.Connection, targets: list, keep_ids: bool) -> None:
+    """Переносит пользователей и задачи одного шарда в новые шарды.
+
+    :param source: Соединение со старым шардом;
+    :param targets: Соединения с новыми шардами по порядку номеров;
+    :param keep_ids: Сохранять ли ID пользователей и задач.
+    """
+    id_column = "id, " if keep_ids else ""
+    placeholders = ", ".join("?" * (len(TASK_COLUMNS.split(",")) + bool(keep_ids)))
+    insert_task = f"INSERT INTO tasks ({id_column}{TASK_COLUMNS}) VALUES ({placeholders});"
+    users = source.execute(f"SELECT {id_column}{USER_COLUMNS} FROM users ORDER BY id;")
+    for user in users:
+        telegram_id = user[-1]
+        targets[telegram_id % len(targets)].execute(
+            f"INSERT INTO users ({id_column}{USER_COLUMNS}) VALUES ({', '.join('?' * len(user))});",
+            user,
+        )
+
+    # Задачи читаются одним проходом по таблице. Все задачи пользователя лежат в одном шарде,
+    # поэтому порядок по ID внутри пользователя сохраняется и при новой нумерации
+    owner_column = TASK_COLUMNS.split(", ").index("telegram_user_id") + bool(keep_ids)
+    tasks = source.execute(
+        f"SELECT {id_column}{TASK_COLUMNS} FROM tasks ORDER BY telegram_user_id, id;"
+    )
+    for telegram_id, user_tasks in itertools.groupby(tasks, key=itemgetter(owner_column)):
+        targets[telegram_id % len(targets)].executemany(insert_task, user_tasks)
+
+
+def count_rows(db: sqlite3.Connection) -> tuple:
+    """Количество пользователей и задач в шарде."""
+    return (
+        db.execute("SELECT COUNT(*) FROM users;").fetchone()[0],
+        db.execute("SELECT COUNT(*) FROM tasks;").fetchone()[0],
+    )
+
+
+def rename(db_name: str, new_name: str) -> None:
+    """Переименовывает файл базы данных вместе с файлами журнала, если они есть."""
+    for suffix in ("", "-wal", "-shm", "-journal"):
+        if os.path.exists(db_name + suffix):
+            os.replace(db_name + suffix, new_name + suffix)
+
+
+def reshard(db_name: str, archive_db_name: str, source_count: int, target_count: int) -> dict:
+    """Переносит данные из `source_count` шардов в `target_count` шардов.
+
+    :param db_name: Имя файла базы данных из настроек;
+    :param archive_db_name: Имя файла архива из настроек;
+    :param source_count: Текущее количество шардов;
+    :param target_count: Новое количество шардов.
+    :return: Отчет: количество пользователей и задач до и после переноса.
+    """
+    source_names = get_shard_db_names(db_name, source_count)
+    target_names = get_shard_db_names(db_name, target_count)
+    for name in source_names + get_shard_db_names(archive_db_name, source_count):
+        if os.path.exists(name + OLD_SUFFIX):
+            raise FileExistsError(f"{name + OLD_SUFFIX} остался от прошлого переноса, удалите его")
+
+    sources = [sqlite3.connect(name) for name in source_names]
+    targets = [create_shard(name + NEW_SUFFIX) for name in target_names]
+    try:
+        # ID уникальны только внутри шарда: сохранить их можно, лишь если шард один
+        for source in sources:
+            copy_shard(source, targets, keep_ids=source_count == 1)
+        for target in targets:
+            target.commit()
+            # Задачи попали в поисковый индекс триггерами при вставке
+            target.execute("INSERT INTO tasks_fts(tasks_fts) VALUES('integrity-check');")
+
+        before = [sum(counts) for counts in zip(*map(count_rows, sources))]
+        after = [sum(counts) for counts in zip(*map(count_rows, targets))]
+        if before != after:
+            raise RuntimeError(f"Перенесено не все: было {before}, стало {after}")
+    finally:
+        for db in sources + targets:
+            db.close()
+
+    for name in source_names + get_shard_db_names(archive_db_name, source_count):
+        rename(name, name + OLD_SUFFIX)
+    for name in target_names:
+        rename(name + NEW_SUFFIX, name)
+    return {"users": after[0], "tasks": after[1], "shards": target_names}
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Изменение количества шардов базы данных (бот должен быть остановлен)")
+    parser.add_argument("--to", type=int, required=True, help="Новое количество шардов")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    if args.to < 1 or args.to == settings.DB_SHARDS:
+        parser.error(f"Новое количество шардов должно быть положительным и отличаться от DB_SHARDS={settings.DB_SHARDS}")
+    # Соединения бота со старыми шардами открываются при импорте database
+    for shard in shards:
+        shard.close()
+    report = reshard(settings.DB_NAME, settings.ARCHIVE_DB_NAME, settings.DB_SHARDS, args.to)
+    logging.info(f"Шарды перестроены: {report}. Запускайте бота с DB_SHARDS={args.to}")
@@ -8,3 +8,15 @@ TASK_SUCCESSFULLY_DELETED = "Задача удалена🗑"
 TASK_SUCCESSFULLY_COMPLETED = "Поздравляем🎉\n\n ✅Задача выполнена успешно✅"
 
 YOU_HAVE_NOT_ANY_TASK = "У вас пока нет задач."
+TASK_LIST_HEADER = "Ваши задачи:"
+TASK_NOT_FOUND = "Задача не найдена. Откройте список задач заново."
+TASK_KEYBOARD_IS_OUTDATED = "Эта карточка устарела. Откройте список задач заново."
+
+REQUEST_FOR_SEARCH_QUERY = "Введите слова, которые есть в заголовке или описании задачи🔎"
+NOTHING_FOUND = "По вашему запросу задач не найдено."
+
+SELECT_TASKS = "Выберите задачи (выбрано: {count})"
+NOTHING_SELECTED = "Сначала выберите задачи."
+CONFIRM_BULK_DELETE = "Вы уверены, что хотите удалить выбранные задачи ({count}) ?"
+TASKS_SUCCESSFULLY_COMPLETED = "Выполнено задач: {count}✅"
+TASKS_SUCCESSFULLY_DELETED = "Удалено задач: {count}🗑"
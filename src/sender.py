@@ -0,0 +1,336 @@
+import asyncio
+import contextvars
+import logging
+import time
+from collections import deque
+from datetime import datetime
+from typing import Any, Dict, Hashable, Optional
+
+from aiogram import Bot
+from aiogram.client.session.middlewares.base import BaseRequestMiddleware, NextRequestMiddlewareType
+from aiogram.exceptions import TelegramRetryAfter
+from aiogram.methods import (
+    AnswerCallbackQuery,
+    DeleteMessage,
+    EditMessageReplyMarkup,
+    EditMessageText,
+    SendMessage,
+    TelegramMethod,
+)
+from aiogram.types import Chat, Message
+
+# Методы, которые проходят через очередь. Остальные (getUpdates, setWebhook, ...) отправляются сразу
+QUEUED_METHODS = (SendMessage, EditMessageText, EditMessageReplyMarkup, DeleteMessage, AnswerCallbackQuery)
+# Правки одного сообщения: из нескольких ожидающих имеет смысл отправить только последнюю
+EDIT_METHODS = (EditMessageText, EditMessageReplyMarkup)
+# Как часто удалять ведра чатов, которые снова полны, в секундах
+BUCKET_SWEEP_INTERVAL = 60
+
+
+class TokenBucket:
+    """Ведро токенов: не больше `rate` операций в секунду с запасом `burst` операций подряд."""
+
+    def __init__(self, rate: float, burst: float = 1):
+        """
+        :param rate: Скорость пополнения в токенах в секунду (0 - без ограничения);
+        :param burst: Вместимость ведра.
+        """
+        self.rate = rate
+        self.burst = max(burst, 1)
+        self.tokens = self.burst
+        self.updated_at = time.monotonic()
+        self.paused_until = 0.0  # До какого момента отправка запрещена (retry_after)
+
+    def delay(self) -> float:
+        """Сколько секунд ждать до появления токена (0 - токен есть)."""
+        now = time.monotonic()
+        if now < self.paused_until:
+            return self.paused_until - now
+        if not self.rate:
+            return 0.0
+
+        self.tokens = min(self.burst, self.tokens + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+        return 0.0 if self.tokens >= 1 else (1 - self.tokens) / self.rate
+
+    def consume(self) -> None:
+        """Забирает токен (после того как `delay` вернул 0)."""
+        if self.rate:
+            self.tokens -= 1
+
+    def pause(self, seconds: float) -> None:
+        """Запрещает отправку на `seconds` секунд."""
+        self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+
+    def is_full(self, now: float) -> bool:
+        """Полно ли ведро к моменту `now` и не на паузе ли оно - тогда оно не отличается от нового."""
+        if now < self.paused_until:
+            return False
+        return not self.rate or self.tokens + (now - self.updated_at) * self.rate >= self.burst
+
+
+class _Job:
+    """Ожидающий отправки вызов Bot API."""
+
+    __slots__ = ("method", "future", "enqueued_at", "attempts")
+
+    def __init__(self, method: TelegramMethod):
+        self.method = method
+        self.future = asyncio.get_running_loop().create_future()
+        self.enqueued_at = time.monotonic()
+        self.attempts = 0
+
+
+class OutgoingQueue(BaseRequestMiddleware):
+    """Очередь исходящих вызовов Bot API с учетом лимитов Telegram.
+
+    Мидлварь сессии бота. Вызовы из `QUEUED_METHODS` раскладываются по очередям чатов
+    и отправляются воркерами с ограничением глобальной скорости и скорости в каждом чате
+    (ведра токенов). Порядок вызовов внутри одного чата сохраняется. При ответе 429
+    чат (или весь бот, если чат неизвестен) ставится на паузу на retry_after секунд,
+    и вызов повторяется.
+
+    Ожидающая правка сообщения заменяется более новой правкой того же сообщения.
+    Новые сообщения отправляются всегда, даже если такое же уже ждет в очереди:
+    одинаковые ответы на повторенное действие - это разные сообщения для пользователя.
+
+    Если `wait` выключен, хэндлер не ждет отправку: он сразу получает предварительный
+    результат (сообщение с message_id=0 или True), а ошибки отправки пишутся в лог.
+    """
+
+    def __init__(
+        self,
+        global_rate: float = 30,
+        chat_rate: float = 1,
+        chat_burst: float = 3,
+        workers: int = 16,
+        max_retries: int = 3,
+        wait: bool = False,
+    ):
+        """
+        :param global_rate: Максимум вызовов в секунду на бота (0 - без ограничения);
+        :param chat_rate: Максимум сообщений в секунду в одном чате (0 - без ограничения);
+        :param chat_burst: Сколько сообщений в чат можно отправить подряд без ожидания;
+        :param workers: Количество одновременно выполняемых вызовов;
+        :param max_retries: Сколько раз повторять вызов после ответа 429;
+        :param wait: Ждать ли хэндлеру фактической отправки.
+        """
+        self.chat_rate = chat_rate
+        self.chat_burst = chat_burst
+        self.workers = workers
+        self.max_retries = max_retries
+        self.wait = wait
+        self._global_bucket = TokenBucket(rate=global_rate, burst=global_rate or 1)
+        # Ведра создаются при отправке в чат и удаляются, когда снова полны (см. `_sweep_chat_buckets`)
+        self._chat_buckets: Dict[Hashable, TokenBucket] = {}
+        self._swept_at = time.monotonic()
+        self._lanes: Dict[Hashable, deque] = {}  # ключ очереди -> ожидающие вызовы
+        self._ready: Optional[asyncio.Queue] = None  # Ключи очередей, в которых есть вызовы
+        self._workers = []
+        self._make_request: Optional[NextRequestMiddlewareType] = None
+        self._bot: Optional[Bot] = None
+        # Метрики
+        self.depth = 0  # Вызовов в очереди сейчас
+        self.max_depth = 0
+        self.sent = 0
+        self.coalesced = 0  # Правок, замененных более новыми правками того же сообщения
+        self.retried = 0
+        self.failed = 0
+        self._latencies = deque(maxlen=10_000)  # Время от постановки в очередь до отправки
+
+    # ------------------- region Постановка в очередь -------------------
+    @staticmethod
+    def _lane_key(method: TelegramMethod) -> Hashable:
+        """Ключ очереди: чат, а для ответа на callback - сам callback-запрос."""
+        if isinstance(method, AnswerCallbackQuery):
+            return "callback", method.callback_query_id
+        return method.chat_id
+
+    def _coalesce(self, lane: deque, method: TelegramMethod) -> Optional[_Job]:
+        """Находит ожидающую правку того же сообщения и заменяет ее новой правкой."""
+        if not isinstance(method, EDIT_METHODS):
+            return None
+        for job in lane:
+            if job.attempts:
+                continue
+            pending = job.method
+            if type(pending) is type(method) and pending.message_id == method.message_id:
+                job.method = method
+                return job
+        return None
+
+    def _enqueue(self, method: TelegramMethod) -> _Job:
+        key = self._lane_key(method)
+        lane = self._lanes.get(key)
+        if lane is None:
+            lane = self._lanes[key] = deque()
+            self._ready.put_nowait(key)
+
+        job = self._coalesce(lane, method)
+        if job is not None:
+            self.coalesced += 1
+            return job
+
+        job = _Job(method)
+        lane.append(job)
+        self.depth += 1
+        self.max_depth = max(self.max_depth, self.depth)
+        return job
+
+    @staticmethod
+    def _provisional_result(method: TelegramMethod) -> Any:
+        """Результат, который хэндлер получает до фактической отправки."""
+        if isinstance(method, SendMessage):
+            return Message(
+                message_id=0,
+                date=datetime.now(),
+                chat=Chat(id=method.chat_id, type="private"),
+                text=method.text,
+            )
+        return True
+
+    async def __call__(self, make_request: NextRequestMiddlewareType, bot: Bot, method: TelegramMethod) -> Any:
+        if not isinstance(method, QUEUED_METHODS):
+            return await make_request(bot, method)
+
+        self._make_request, self._bot = make_request, bot
+        self._ensure_workers()
+        job = self._enqueue(method)
+        if self.wait:
+            return await asyncio.shield(job.future)
+        return self._provisional_result(method)
+
+    # ------------------- endregion Постановка в очередь -------------------
+
+    # ------------------- region Отправка -------------------
+    def _ensure_workers(self) -> None:
+        if self._ready is None:
+            self._ready = asyncio.Queue()
+        if not self._workers:
+            # Воркеры запускаются в пустом контексте, чтобы не унаследовать трейс обновления,
+            # во время которого очередь была создана
+            self._workers = [
+                asyncio.create_task(self._worker(), context=contextvars.Context())
+                for _ in range(self.workers)
+            ]
+
+    def _chat_bucket(self, key: Hashable) -> Optional[TokenBucket]:
+        if isinstance(key, tuple):
+            # Ответы на callback-запросы не являются сообщениями и лимитом чата не ограничены
+            return None
+        bucket = self._chat_buckets.get(key)
+        if bucket is None:
+            bucket = self._chat_buckets[key] = TokenBucket(rate=self.chat_rate, burst=self.chat_burst)
+        return bucket
+
+    def _sweep_chat_buckets(self) -> None:
+        """Удаляет ведра чатов без ожидающих вызовов, которые успели наполниться.
+
+        Такое ведро ничем не отличается от нового, поэтому память не растет с каждым
+        чатом, в который бот когда-либо писал. Выполняется не чаще раза в `BUCKET_SWEEP_INTERVAL`.
+        """
+        now = time.monotonic()
+        if now - self._swept_at < BUCKET_SWEEP_INTERVAL:
+            return
+        self._swept_at = now
+        idle = [
+            key for key, bucket in self._chat_buckets.items()
+            if key not in self._lanes and bucket.is_full(now)
+        ]
+        for key in idle:
+            del self._chat_buckets[key]
+
+    async def _send(self, key: Hashable, job: _Job, chat_bucket: Optional[TokenBucket]) -> bool:
+        """Отправляет вызов. Возвращает False, если его нужно повторить после паузы."""
+        while delay := self._global_bucket.delay():
+            await asyncio.sleep(delay)
+        self._global_bucket.consume()
+        if chat_bucket:
+            chat_bucket.consume()
+
+        job.attempts += 1
+        try:
+            result = await self._make_request(self._bot, job.method)
+        except TelegramRetryAfter as error:
+            if job.attempts <= self.max_retries:
+                self.retried += 1
+                (chat_bucket or self._global_bucket).pause(error.retry_after)
+                return False
+            self._fail(job, error)
+        except Exception as error:
+            self._fail(job, error)
+        else:
+            self.sent += 1
+            self._latencies.append(time.monotonic() - job.enqueued_at)
+            if not job.future.done():
+                job.future.set_result(result)
+        return True
+
+    def _fail(self, job: _Job, error: Exception) -> None:
+        self.failed += 1
+        if self.wait:
+            if not job.future.done():
+                job.future.set_exception(error)
+        else:
+            logging.error(f"Не удалось отправить {type(job.method).__name__}: {error}")
+
+    async def _worker(self) -> None:
+        """Берет очередь чата и отправляет из нее один вызов.
+
+        Ключ чата находится в общей очереди не больше одного раза, поэтому вызовы
+        одного чата отправляются по порядку. После каждого вызова чат уходит в конец
+        общей очереди, а чат, исчерпавший лимит, возвращается в нее по таймеру и
+        не занимает воркер.
+        """
+        loop = asyncio.get_running_loop()
+        while True:
+            key = await self._ready.get()
+            lane = self._lanes[key]
+            chat_bucket = self._chat_bucket(key)
+            delay = chat_bucket.delay() if chat_bucket else 0.0
+            if delay:
+                loop.call_later(delay, self._ready.put_nowait, key)
+                continue
+
+            try:
+                if await self._send(key, lane[0], chat_bucket):
+                    lane.popleft()
+                    self.depth -= 1
+            finally:
+                if lane:
+                    self._ready.put_nowait(key)
+                else:
+                    del self._lanes[key]
+                    self._sweep_chat_buckets()
+
+    async def close(self) -> None:
+        """Дожидается отправки всех вызовов из очереди и останавливает воркеров."""
+        while self._lanes and self._workers:
+            await asyncio.sleep(0.01)
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+
+    # ------------------- endregion Отправка -------------------
+
+    def stats(self) -> dict:
+        """Метрики очереди: глубина, количество отправок и задержка отправки в мс."""
+        latencies = sorted(self._latencies)
+
+        def percentile(pct: float) -> float:
+            if not latencies:
+                return 0.0
+            return round(latencies[min(len(latencies) - 1, int(pct / 100 * len(latencies)))] * 1000, 2)
+
+        return {
+            "depth": self.depth,
+            "max_depth": self.max_depth,
+            "sent": self.sent,
+            "coalesced": self.coalesced,
+            "retried": self.retried,
+            "failed": self.failed,
+            "chat_buckets": len(self._chat_buckets),
+            "latency_p50_ms": percentile(50),
+            "latency_p99_ms": percentile(99),
+        }
@@ -1,3 +1,4 @@
+from fsm_storages import state_codes
 from utils import singleton
 
 
@@ -30,7 +31,12 @@ class TaskStates:
 
     LOOK_AT_TASKS = "LOOK_AT_TASKS"
 
+    WAIT_FOR_SEARCH_QUERY = "WAIT_FOR_SEARCH_QUERY"
+
 
 base_states = BaseStates()
 reg_states = RegistrationStates()
 task_states = TaskStates()
+
+# Коды состояний в сессиях машины состояний назначаются в порядке объявления
+state_codes.register(base_states, reg_states, task_states)
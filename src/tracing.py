@@ -0,0 +1,210 @@
+import bisect
+import contextvars
+import logging
+import random
+import time
+from collections import defaultdict
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from aiogram import BaseMiddleware, Bot
+from aiogram.client.session.middlewares.base import BaseRequestMiddleware, NextRequestMiddlewareType
+from aiogram.methods import TelegramMethod
+from aiogram.types import TelegramObject, Update
+from aiohttp import web
+
+# Границы корзин гистограмм в секундах
+BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+METRICS_PREFIX = "tgtodo"
+
+
+class Histogram:
+    """Гистограмма в формате Prometheus с одной меткой."""
+
+    def __init__(self, name: str, description: str, label: str):
+        self.name = f"{METRICS_PREFIX}_{name}"
+        self.description = description
+        self.label = label
+        self._series = defaultdict(lambda: [[0] * (len(BUCKETS) + 1), 0.0])  # значение метки -> [корзины, сумма]
+
+    def observe(self, label_value: str, value: float) -> None:
+        series = self._series[label_value]
+        series[0][bisect.bisect_left(BUCKETS, value)] += 1
+        series[1] += value
+
+    def render(self) -> list:
+        lines = [f"# HELP {self.name} {self.description}", f"# TYPE {self.name} histogram"]
+        for label_value, (buckets, total) in sorted(self._series.items()):
+            label = f'{self.label}="{label_value}"'
+            cumulative = 0
+            for bound, count in zip(BUCKETS, buckets):
+                cumulative += count
+                lines.append(f'{self.name}_bucket{{{label},le="{bound}"}} {cumulative}')
+            cumulative += buckets[-1]
+            lines.append(f'{self.name}_bucket{{{label},le="+Inf"}} {cumulative}')
+            lines.append(f"{self.name}_sum{{{label}}} {total}")
+            lines.append(f"{self.name}_count{{{label}}} {cumulative}")
+        return lines
+
+
+class Trace:
+    """Время обработки одного обновления по частям."""
+
+    __slots__ = ("update_id", "handler", "started", "handler_time", "db_time", "db_calls", "api_time", "api_calls", "spans")
+
+    def __init__(self, update_id: int, sampled: bool):
+        self.update_id = update_id
+        self.handler = "unhandled"
+        self.started = time.perf_counter()
+        self.handler_time = 0.0
+        self.db_time = 0.0
+        self.db_calls = 0
+        self.api_time = 0.0
+        self.api_calls = 0
+        self.spans = [] if sampled else None  # [(вид, название, длительность), ...] для лога
+
+
+# Трейс обновления, которое обрабатывается в текущей задаче
+current_trace: contextvars.ContextVar[Optional[Trace]] = contextvars.ContextVar("current_trace", default=None)
+
+update_seconds = Histogram("update_seconds", "Полное время обработки обновления", "handler")
+dispatch_seconds = Histogram(
+    "update_dispatch_seconds", "Время обработки обновления вне хэндлера (мидлвари, фильтры)", "handler"
+)
+db_seconds = Histogram("update_db_seconds", "Время запросов к БД за обновление", "handler")
+api_seconds = Histogram("update_api_seconds", "Время вызовов Bot API за обновление", "handler")
+api_request_seconds = Histogram("bot_api_request_seconds", "Время вызова Bot API с точки зрения хэндлера", "method")
+HISTOGRAMS = (update_seconds, dispatch_seconds, db_seconds, api_seconds, api_request_seconds)
+
+
+def record_db(query: str, duration: float) -> None:
+    """Учитывает запрос к БД в трейсе текущего обновления."""
+    trace = current_trace.get()
+    if trace is None:
+        return
+    trace.db_time += duration
+    trace.db_calls += 1
+    if trace.spans is not None:
+        trace.spans.append(("db", " ".join(query.split())[:60], duration))
+
+
+class TracingMiddleware(BaseMiddleware):
+    """Внешняя мидлварь обновлений, которая замеряет время обработки по частям.
+
+    Время запросов к БД и вызовов Bot API собирается в трейс текущего обновления
+    через contextvar (см. `record_db` и `TracingRequestMiddleware`), а имя и время хэндлера -
+    через `trace_handler`. После обработки значения попадают в гистограммы.
+    Доля `sample_rate` обновлений дополнительно пишется в лог со всеми запросами.
+    """
+
+    def __init__(self, sample_rate: float = 0.0):
+        """
+        :param sample_rate: Доля обновлений, трейс которых пишется в лог (0 - ни одного).
+        """
+        self.sample_rate = sample_rate
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: Update,
+        data: Dict[str, Any],
+    ) -> Any:
+        trace = Trace(event.update_id, sampled=bool(self.sample_rate) and random.random() < self.sample_rate)
+        token = current_trace.set(trace)
+        try:
+            return await handler(event, data)
+        finally:
+            current_trace.reset(token)
+            self._finish(trace)
+
+    @staticmethod
+    def _finish(trace: Trace) -> None:
+        total = time.perf_counter() - trace.started
+        update_seconds.observe(trace.handler, total)
+        dispatch_seconds.observe(trace.handler, total - trace.handler_time)
+        db_seconds.observe(trace.handler, trace.db_time)
+        api_seconds.observe(trace.handler, trace.api_time)
+
+        if trace.spans is not None:
+            spans = ", ".join(f"{kind}:{name}={duration * 1000:.2f}ms" for kind, name, duration in trace.spans)
+            logging.info(
+                f"trace update={trace.update_id} handler={trace.handler} total={total * 1000:.2f}ms "
+                f"handler={trace.handler_time * 1000:.2f}ms db={trace.db_time * 1000:.2f}ms/{trace.db_calls} "
+                f"api={trace.api_time * 1000:.2f}ms/{trace.api_calls} [{spans}]"
+            )
+
+
+async def trace_handler(handler: Callable, *args: Any, **kwargs: Any) -> Any:
+    """Вызывает хэндлер и записывает его имя и время в трейс текущего обновления."""
+    trace = current_trace.get()
+    if trace is None:
+        return await handler(*args, **kwargs)
+
+    trace.handler = handler.__name__
+    started = time.perf_counter()
+    try:
+        return await handler(*args, **kwargs)
+    finally:
+        trace.handler_time += time.perf_counter() - started
+
+
+class HandlerTracingMiddleware(BaseMiddleware):
+    """Внутренняя мидлварь роутера: записывает в трейс хэндлер, выбранный фильтрами."""
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any],
+    ) -> Any:
+        trace = current_trace.get()
+        if trace is None:
+            return await handler(event, data)
+
+        trace.handler = data["handler"].callback.__name__
+        started = time.perf_counter()
+        try:
+            return await handler(event, data)
+        finally:
+            trace.handler_time += time.perf_counter() - started
+
+
+class TracingRequestMiddleware(BaseRequestMiddleware):
+    """Мидлварь сессии бота: время вызовов Bot API, которое ждал хэндлер."""
+
+    async def __call__(self, make_request: NextRequestMiddlewareType, bot: Bot, method: TelegramMethod) -> Any:
+        started = time.perf_counter()
+        try:
+            return await make_request(bot, method)
+        finally:
+            duration = time.perf_counter() - started
+            name = type(method).__name__
+            api_request_seconds.observe(name, duration)
+            trace = current_trace.get()
+            if trace is not None:
+                trace.api_time += duration
+                trace.api_calls += 1
+                if trace.spans is not None:
+                    trace.spans.append(("api", name, duration))
+
+
+def render_metrics() -> str:
+    """Возвращает все метрики в текстовом формате Prometheus."""
+    lines = []
+    for histogram in HISTOGRAMS:
+        lines.extend(histogram.render())
+    return "\n".join(lines) + "\n"
+
+
+async def start_metrics_server(host: str, port: int) -> web.AppRunner:
+    """Запускает HTTP-сервер с метриками на /metrics."""
+
+    async def metrics(request: web.Request) -> web.Response:
+        return web.Response(text=render_metrics(), content_type="text/plain", charset="utf-8")
+
+    app = web.Application()
+    app.router.add_get("/metrics", metrics)
+    runner = web.AppRunner(app, access_log=None)
+    await runner.setup()
+    await web.TCPSite(runner, host=host, port=port).start()
+    logging.info(f"Метрики доступны на http://{host}:{port}/metrics")
+    return runner
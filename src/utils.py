@@ -1,5 +1,8 @@
+import os
 from typing import Optional
 
+from fsm_storages import BaseStorage, MemoryStorage
+
 
 def singleton(cls):
     """Реализуем декоратор синглтона, дабы предотвратить размножение одинаковых классов."""
@@ -13,41 +16,73 @@ def singleton(cls):
     return decorator
 
 
+def get_shard_db_names(db_name: str, count: int) -> list:
+    """Возвращает имена файлов шардов базы данных.
+
+    С одним шардом это сам `db_name`, с несколькими - `todo_db.0.db`, `todo_db.1.db`, ...
+
+    :param db_name: Имя файла базы данных из настроек;
+    :param count: Количество шардов.
+    """
+    if count <= 1:
+        return [db_name]
+    root, extension = os.path.splitext(db_name)
+    return [f"{root}.{index}{extension}" for index in range(count)]
+
+
 @singleton
 class FiniteStateMachine:
-    """Самописная машина состояний."""
+    """Самописная машина состояний.
+
+    Сессии пользователей хранятся в подключаемом хранилище (см. `fsm_storages`),
+    по умолчанию - в памяти процесса. Временные данные сценариев (регистрации, создания
+    задачи) удаляются, когда пользователь переходит в завершающее состояние (см. `register_flow`).
+    """
 
-    def __init__(self):
-        self._states = (
-            {}
-        )  # Хранение текущих состояний пользователей(ключ - telegram id пользователя, значение - состояние)
-        self._data = {}  # Хранение данных для каждого пользователя(ключ - telegram id)
+    def __init__(self, storage: BaseStorage = None):
+        self.storage = storage or MemoryStorage()
+        self._flow_keys = {}  # Завершающее состояние -> ключи данных, которые в нем удаляются
+
+    def set_storage(self, storage: BaseStorage) -> None:
+        """Заменяет хранилище сессий. Вызывается при запуске бота до обработки обновлений.
+
+        :param storage: Новое хранилище сессий.
+        """
+        self.storage = storage
+
+    def register_flow(self, keys: tuple, finish_states: tuple) -> None:
+        """Объявляет временные данные сценария.
+
+        :param keys: Ключи данных, которые сценарий записывает в FSM;
+        :param finish_states: Состояния, переход в которые завершает сценарий и удаляет эти ключи.
+        """
+        for state in finish_states:
+            self._flow_keys[state] = self._flow_keys.get(state, frozenset()) | frozenset(keys)
 
     def set_state(self, telegram_id: int, state: str) -> None:
         """Устанавливает состояние для пользователя.
 
         :param telegram_id: Телеграм id пользователя;
         :param state: Состояние, на которое ставим пользователя."""
-        self._states[telegram_id] = state
-        if telegram_id not in self._data:
-            self._data[telegram_id] = {}
+        data = self.storage.get_data(telegram_id)
+        flow_keys = self._flow_keys.get(state)
+        if data and flow_keys and not flow_keys.isdisjoint(data):
+            data = {key: value for key, value in data.items() if key not in flow_keys}
+        self.storage.set_session(telegram_id, state, {} if data is None else data)
 
     def get_state(self, telegram_id: int) -> Optional[str]:
         """Возвращает текущее состояние пользователя. Если состояния нет, возвращает None.
 
         :param telegram_id: Телеграм id пользователя;
         """
-        return self._states.get(telegram_id)
+        return self.storage.get_state(telegram_id)
 
     def reset_state(self, telegram_id: int) -> None:
         """Сбрасывает состояние пользователя.
 
         :param telegram_id: Телеграм id пользователя;
         """
-        if telegram_id in self._states:
-            del self._states[telegram_id]
-        if telegram_id in self._data:
-            del self._data[telegram_id]
+        self.storage.delete_session(telegram_id)
 
     def set_data(self, telegram_id: int, key: str, value: any) -> None:
         """Устанавливает данные для текущего состояния пользователя.
@@ -56,9 +91,11 @@ class FiniteStateMachine:
         :param key: Ключ для хранения данных;
         :param value: Значение для ключа;
         """
-        if telegram_id not in self._data:
-            self._data[telegram_id] = {}
-        self._data[telegram_id][key] = value
+        data = self.storage.get_data(telegram_id)
+        if data is None:
+            data = {}
+        data[key] = value
+        self.storage.set_session(telegram_id, self.storage.get_state(telegram_id), data)
 
     def get_data(self, telegram_id: int, key: str = None, default=None) -> any:
         """Получает данные пользователя по ключу, если они существуют.
@@ -67,17 +104,18 @@ class FiniteStateMachine:
         :param key: ключ значения;
         :param default: Значение, которое возвращается, если данные отсутствуют;
         """
+        data = self.storage.get_data(telegram_id) or {}
         if not key:
-            return self._data.get(telegram_id, {})
-        return self._data.get(telegram_id, {}).get(key, default)
+            return data
+        return data.get(key, default)
 
     def reset_data(self, telegram_id: int) -> None:
         """Сбрасывает все данные для пользователя.
 
         :param telegram_id: Телеграм id пользователя;
         """
-        if telegram_id in self._data:
-            self._data[telegram_id] = {}
+        if self.storage.get_data(telegram_id) is not None:
+            self.storage.set_session(telegram_id, self.storage.get_state(telegram_id), {})
 
 
 fsm = FiniteStateMachine()
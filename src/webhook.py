@@ -0,0 +1,141 @@
+import asyncio
+import logging
+from typing import Any, Dict, Optional
+
+from aiogram import Bot, Dispatcher
+from aiogram.webhook.aiohttp_server import SimpleRequestHandler, setup_application
+from aiohttp import web
+
+from sender import OutgoingQueue
+
+
+class LimitedRequestHandler(SimpleRequestHandler):
+    """Обработчик вебхука с ограничением количества одновременно выполняемых хэндлеров.
+
+    Telegram получает ответ сразу, а обновление обрабатывается в фоне. Не больше
+    `max_concurrency` обновлений обрабатываются одновременно, остальные ждут своей
+    очереди. При остановке сервера обработчик дожидается обновлений, которые
+    уже приняты, затем отправки их ответов из очереди и только потом закрывает сессию бота.
+    """
+
+    def __init__(
+        self,
+        dispatcher: Dispatcher,
+        bot: Bot,
+        max_concurrency: int = 100,
+        drain_timeout: float = 30,
+        secret_token: Optional[str] = None,
+        send_queue: Optional[OutgoingQueue] = None,
+        **data: Any,
+    ):
+        """
+        :param dispatcher: Диспетчер aiogram;
+        :param bot: Бот, от имени которого обрабатываются обновления;
+        :param max_concurrency: Максимум одновременно обрабатываемых обновлений;
+        :param drain_timeout: Сколько секунд ждать принятые обновления при остановке;
+        :param secret_token: Секрет из заголовка X-Telegram-Bot-Api-Secret-Token;
+        :param send_queue: Очередь исходящих вызовов сессии бота, которую нужно отправить до ее закрытия.
+        """
+        super().__init__(
+            dispatcher=dispatcher,
+            bot=bot,
+            handle_in_background=True,
+            secret_token=secret_token,
+            **data,
+        )
+        self.drain_timeout = drain_timeout
+        self.send_queue = send_queue
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+
+    @property
+    def in_flight(self) -> int:
+        """Количество принятых, но еще не обработанных обновлений."""
+        return len(self._background_feed_update_tasks)
+
+    async def _background_feed_update(self, bot: Bot, update: Dict[str, Any]) -> None:
+        async with self._semaphore:
+            await super()._background_feed_update(bot, update)
+
+    async def drain(self) -> None:
+        """Дожидается обработки принятых обновлений."""
+        tasks = set(self._background_feed_update_tasks)
+        if not tasks:
+            return
+
+        logging.info(f"Ожидание обработки {len(tasks)} обновлений перед остановкой")
+        _, pending = await asyncio.wait(tasks, timeout=self.drain_timeout)
+        if pending:
+            logging.warning(f"Не дождались обработки {len(pending)} обновлений")
+
+    async def close(self) -> None:
+        await self.drain()
+        # Сессия бота закрывается раньше хэндлеров остановки диспетчера, поэтому ответы,
+        # которые еще в очереди, отправляются здесь
+        if self.send_queue is not None:
+            await self.send_queue.close()
+        await super().close()
+
+
+def create_webhook_app(
+    dispatcher: Dispatcher,
+    bot: Bot,
+    path: str,
+    max_concurrency: int,
+    secret_token: Optional[str] = None,
+    send_queue: Optional[OutgoingQueue] = None,
+) -> web.Application:
+    """Создает aiohttp-приложение, принимающее обновления на `path`."""
+    app = web.Application()
+    handler = LimitedRequestHandler(
+        dispatcher=dispatcher,
+        bot=bot,
+        max_concurrency=max_concurrency,
+        secret_token=secret_token,
+        send_queue=send_queue,
+    )
+    handler.register(app, path=path)
+    app["webhook_handler"] = handler
+    setup_application(app, dispatcher, bot=bot)
+    return app
+
+
+async def run_webhook(
+    dispatcher: Dispatcher,
+    bot: Bot,
+    base_url: str,
+    path: str,
+    host: str,
+    port: int,
+    max_concurrency: int,
+    secret_token: Optional[str] = None,
+    send_queue: Optional[OutgoingQueue] = None,
+) -> None:
+    """Регистрирует вебхук в Telegram и обслуживает обновления до отмены задачи.
+
+    :param base_url: Публичный адрес, по которому Telegram доступен сервер (https://...);
+    :param path: Путь вебхука;
+    :param host: Адрес, на котором слушает сервер;
+    :param port: Порт сервера;
+    :param max_concurrency: Максимум одновременно обрабатываемых обновлений;
+    :param secret_token: Секрет, который Telegram передает в заголовке запроса;
+    :param send_queue: Очередь исходящих вызовов, которая отправляется до закрытия сессии бота.
+    """
+    app = create_webhook_app(dispatcher, bot, path, max_concurrency, secret_token, send_queue)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, host=host, port=port)
+    await site.start()
+
+    await bot.set_webhook(
+        url=f"{base_url.rstrip('/')}{path}",
+        secret_token=secret_token,
+        max_connections=min(max_concurrency, 100),
+        allowed_updates=dispatcher.resolve_used_update_types(),
+    )
+    logging.info(f"Вебхук слушает {host}:{port}{path}")
+
+    try:
+        await asyncio.Event().wait()
+    finally:
+        # Останавливаем прием обновлений и дожидаемся уже принятых (см. LimitedRequestHandler.close)
+        await runner.cleanup()
@@ -0,0 +1,351 @@
+"""Многопроцессный режим бота.
+
+Главный процесс получает обновления (long polling или вебхук) и, не разбирая их в модели
+aiogram, раздает процессам-воркерам по `telegram_id % BOT_WORKERS`. Воркер - это обычный
+`main.py` с BOT_MODE=worker: он читает обновления построчно (JSON) из stdin и
+обрабатывает их своим диспетчером. Все обновления пользователя попадают в один воркер,
+поэтому его сессия машины состояний, кэши и порядок обработки остаются в одном процессе.
+
+Воркеру выделяется своя часть ресурсов:
+- файл сессий машины состояний при FSM_STORAGE=sqlite (`fsm_db.<номер>.db`);
+- доля глобального лимита отправки SEND_GLOBAL_RATE;
+- порт метрик METRICS_PORT + 1 + номер (если метрики включены);
+- обслуживание шардов базы данных с номером, сравнимым с номером воркера по модулю
+  BOT_WORKERS. Если DB_SHARDS кратно BOT_WORKERS, каждый шард пишет только один процесс.
+
+Упавший воркер перезапускается с нарастающей задержкой. Обновления, которые ждут его в
+очереди главного процесса, достаются новому процессу, а обновления, которые воркер уже
+принял, но не обработал, теряются.
+
+Запуск из директории `src`:
+    BOT_WORKERS=4 python workers.py
+"""
+import asyncio
+import json
+import logging
+import os
+import signal
+import sys
+from typing import Optional
+
+import aiohttp
+from aiohttp import web
+from aiogram import Bot, Dispatcher
+from aiogram.client.telegram import PRODUCTION, TelegramAPIServer
+
+from config import settings
+from utils import get_shard_db_names
+
+SRC_DIR = os.path.dirname(os.path.abspath(__file__))
+# Типы обновлений, которые обрабатывают хэндлеры бота
+ALLOWED_UPDATES = ["message", "callback_query"]
+# Признак остановки в очереди воркера
+STOP = object()
+# Строка, которую воркер пишет в stdout, когда готов принимать обновления
+READY_LINE = b"worker ready\n"
+
+
+# ------------------- region Главный процесс -------------------
+def get_update_user_id(update: dict) -> int:
+    """Telegram ID пользователя, от которого пришло обновление (0, если его нет)."""
+    for value in update.values():
+        if isinstance(value, dict):
+            user = value.get("from") or value.get("user") or value.get("chat")
+            if user:
+                return int(user.get("id", 0))
+    return 0
+
+
+class WorkerPool:
+    """Процессы-воркеры и очереди обновлений для них.
+
+    Для каждого воркера работает задача-надзиратель: она запускает процесс, передает ему
+    обновления из очереди в stdin и перезапускает процесс, если он завершился не по
+    команде остановки.
+    """
+
+    def __init__(
+        self,
+        count: int,
+        max_pending: int = 1000,
+        restart_delay: float = 1,
+        max_restart_delay: float = 30,
+    ):
+        """
+        :param count: Количество воркеров;
+        :param max_pending: Сколько обновлений может ждать отправки одному воркеру;
+        :param restart_delay: Задержка перед первым перезапуском упавшего воркера в секундах;
+        :param max_restart_delay: Максимальная задержка перезапуска (задержка удваивается
+                                  при каждом падении подряд).
+        """
+        self.count = max(count, 1)
+        self.restart_delay = restart_delay
+        self.max_restart_delay = max_restart_delay
+        self._queues = [asyncio.Queue(maxsize=max_pending) for _ in range(self.count)]
+        # Обновление, которое не удалось передать упавшему воркеру, - первым новому процессу
+        self._unsent: list = [None] * self.count
+        self._processes: list = [None] * self.count
+        self._ready = [asyncio.Event() for _ in range(self.count)]
+        self._supervisors = []
+        self._stopping = False
+        # Метрики
+        self.dispatched = [0] * self.count
+        self.restarts = [0] * self.count
+
+    def worker_index(self, update: dict) -> int:
+        """Номер воркера, который обрабатывает обновления пользователя."""
+        return get_update_user_id(update) % self.count
+
+    async def dispatch(self, update: dict) -> None:
+        """Ставит обновление в очередь воркера. Ждет, если очередь заполнена."""
+        await self._queues[self.worker_index(update)].put(update)
+
+    def worker_environment(self, index: int) -> dict:
+        """Переменные окружения процесса-воркера."""
+        env = dict(
+            os.environ,
+            BOT_MODE="worker",
+            BOT_WORKERS=str(self.count),
+            BOT_WORKER_INDEX=str(index),
+            FSM_DB_NAME=get_shard_db_names(settings.FSM_DB_NAME, self.count)[index],
+            SEND_GLOBAL_RATE=str(settings.SEND_GLOBAL_RATE / self.count),
+        )
+        if settings.METRICS_PORT:
+            env["METRICS_PORT"] = str(settings.METRICS_PORT + 1 + index)
+        return env
+
+    async def _feed(self, index: int, process: asyncio.subprocess.Process) -> None:
+        """Передает обновления из очереди в stdin воркера."""
+        queue = self._queues[index]
+        while True:
+            if self._unsent[index] is None:
+                self._unsent[index] = await queue.get()
+            update = self._unsent[index]
+            if update is STOP:
+                process.stdin.close()
+                return
+            try:
+                process.stdin.write(json.dumps(update).encode() + b"\n")
+                await process.stdin.drain()
+            except (BrokenPipeError, ConnectionResetError):
+                # Воркер завершился, обновление достанется следующему процессу
+                return
+            self._unsent[index] = None
+            self.dispatched[index] += 1
+
+    @staticmethod
+    async def _forward_output(process: asyncio.subprocess.Process) -> None:
+        """Переносит stdout воркера в stdout главного процесса, чтобы канал не переполнялся."""
+        while line := await process.stdout.readline():
+            sys.stdout.buffer.write(line)
+            sys.stdout.flush()
+
+    async def _supervise(self, index: int) -> None:
+        """Запускает воркер и перезапускает его после падения."""
+        loop = asyncio.get_running_loop()
+        delay = self.restart_delay
+        while True:
+            started = loop.time()
+            process = await asyncio.create_subprocess_exec(
+                sys.executable,
+                "main.py",
+                cwd=SRC_DIR,
+                env=self.worker_environment(index),
+                stdin=asyncio.subprocess.PIPE,
+                stdout=asyncio.subprocess.PIPE,
+                # Ctrl+C получает только главный процесс, воркеры останавливаются по закрытию stdin
+                start_new_session=True,
+            )
+            self._processes[index] = process
+            if await process.stdout.readline() == READY_LINE:
+                self._ready[index].set()
+            feeder = asyncio.create_task(self._feed(index, process))
+            output = asyncio.create_task(self._forward_output(process))
+            returncode = await process.wait()
+            feeder.cancel()
+            await asyncio.gather(feeder, output, return_exceptions=True)
+
+            if self._stopping and self._unsent[index] is STOP:
+                logging.info(f"Воркер {index} остановлен с кодом {returncode}")
+                return
+            self.restarts[index] += 1
+            # Воркер, проработавший дольше максимальной задержки, перезапускается сразу с начальной
+            if loop.time() - started > self.max_restart_delay:
+                delay = self.restart_delay
+            logging.error(f"Воркер {index} завершился с кодом {returncode}, перезапуск через {delay:.0f}s")
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, self.max_restart_delay)
+
+    async def start(self) -> None:
+        """Запускает воркеры и ждет, пока каждый из них запустится в первый раз."""
+        self._supervisors = [asyncio.create_task(self._supervise(index)) for index in range(self.count)]
+        await asyncio.gather(*(ready.wait() for ready in self._ready))
+
+    async def stop(self) -> None:
+        """Передает воркерам уже принятые обновления и дожидается их завершения."""
+        self._stopping = True
+        for queue in self._queues:
+            await queue.put(STOP)
+        await asyncio.gather(*self._supervisors, return_exceptions=True)
+
+    def stats(self) -> dict:
+        """Метрики раздачи обновлений."""
+        return {
+            "workers": self.count,
+            "dispatched": list(self.dispatched),
+            "pending": [queue.qsize() for queue in self._queues],
+            "restarts": list(self.restarts),
+        }
+
+
+class BotAPI:
+    """Вызовы Bot API главного процесса: ответы остаются словарями без разбора в модели aiogram."""
+
+    def __init__(self, session: aiohttp.ClientSession, token: str, api_url: Optional[str] = None):
+        """
+        :param session: HTTP-сессия;
+        :param token: Токен бота;
+        :param api_url: Адрес Bot API (по умолчанию - api.telegram.org).
+        """
+        self.session = session
+        self.token = token
+        self.server = TelegramAPIServer.from_base(api_url) if api_url else PRODUCTION
+
+    async def call(self, method: str, params: Optional[dict] = None, timeout: float = 30):
+        """Вызывает метод Bot API.
+
+        :param method: Название метода;
+        :param params: Параметры метода;
+        :param timeout: Время ожидания ответа в секундах.
+        :return: Поле result ответа.
+        """
+        async with self.session.post(
+            self.server.api_url(token=self.token, method=method),
+            json=params or {},
+            timeout=aiohttp.ClientTimeout(total=timeout),
+        ) as response:
+            payload = await response.json()
+        if not payload.get("ok"):
+            raise RuntimeError(f"{method}: {payload.get('description')}")
+        return payload["result"]
+
+
+async def poll_updates(api: BotAPI, pool: WorkerPool, polling_timeout: int = 30) -> None:
+    """Получает обновления через long polling и раздает их воркерам."""
+    await api.call("deleteWebhook")
+    offset = 0
+    while True:
+        params = {"offset": offset, "timeout": polling_timeout, "allowed_updates": ALLOWED_UPDATES}
+        try:
+            updates = await api.call("getUpdates", params, timeout=polling_timeout + 10)
+        except (aiohttp.ClientError, asyncio.TimeoutError, RuntimeError) as e:
+            logging.warning(f"Ошибка получения обновлений: {e}")
+            await asyncio.sleep(1)
+            continue
+        for update in updates:
+            offset = update["update_id"] + 1
+            await pool.dispatch(update)
+
+
+async def serve_webhook(api: BotAPI, pool: WorkerPool) -> None:
+    """Принимает обновления на вебхук и раздает их воркерам."""
+
+    async def handle(request: web.Request) -> web.Response:
+        if settings.WEBHOOK_SECRET and (
+            request.headers.get("X-Telegram-Bot-Api-Secret-Token") != settings.WEBHOOK_SECRET
+        ):
+            return web.Response(status=401)
+        # Ответ задерживается, только если очередь воркера заполнена
+        await pool.dispatch(await request.json())
+        return web.json_response({})
+
+    app = web.Application()
+    app.router.add_post(settings.WEBHOOK_PATH, handle)
+    runner = web.AppRunner(app, access_log=None)
+    await runner.setup()
+    await web.TCPSite(runner, host=settings.WEBHOOK_HOST, port=settings.WEBHOOK_PORT).start()
+    params = {
+        "url": f"{settings.WEBHOOK_BASE_URL.rstrip('/')}{settings.WEBHOOK_PATH}",
+        "max_connections": min(settings.WEBHOOK_MAX_CONCURRENCY, 100),
+        "allowed_updates": ALLOWED_UPDATES,
+    }
+    if settings.WEBHOOK_SECRET:
+        params["secret_token"] = settings.WEBHOOK_SECRET
+    await api.call("setWebhook", params)
+    logging.info(f"Вебхук слушает {settings.WEBHOOK_HOST}:{settings.WEBHOOK_PORT}{settings.WEBHOOK_PATH}")
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await runner.cleanup()
+
+
+async def run_front() -> None:
+    """Главный процесс: запускает воркеры и раздает им обновления до остановки."""
+    logging.basicConfig(level=logging.INFO)
+    # docker stop присылает SIGTERM: останавливаемся так же, как по Ctrl+C
+    main_task = asyncio.current_task()
+    asyncio.get_running_loop().add_signal_handler(signal.SIGTERM, main_task.cancel)
+
+    pool = WorkerPool(count=settings.BOT_WORKERS, max_pending=settings.BOT_WORKER_QUEUE_SIZE)
+    try:
+        # Обновления начинаем получать, когда их есть кому обработать
+        await pool.start()
+        logging.info(f"Запущено воркеров: {pool.count}")
+        async with aiohttp.ClientSession() as session:
+            api = BotAPI(session, token=settings.BOT_TOKEN, api_url=settings.TELEGRAM_API_URL)
+            if settings.BOT_MODE == "webhook":
+                await serve_webhook(api, pool)
+            else:
+                await poll_updates(api, pool)
+    finally:
+        await pool.stop()
+        logging.info(f"Раздача обновлений: {pool.stats()}")
+
+
+# ------------------- endregion Главный процесс -------------------
+
+
+# ------------------- region Процесс-воркер -------------------
+async def _process_update(dispatcher: Dispatcher, bot: Bot, update: dict) -> None:
+    try:
+        await dispatcher.feed_raw_update(bot, update)
+    except Exception:
+        logging.exception(f"Ошибка обработки обновления {update.get('update_id')}")
+
+
+async def run_worker(dispatcher: Dispatcher, bot: Bot) -> None:
+    """Обрабатывает обновления, которые главный процесс передает в stdin, до его закрытия.
+
+    Как и при long polling, каждое обновление обрабатывается отдельной задачей, а порядок
+    обновлений одного пользователя сохраняют мидлвари диспетчера.
+    """
+    loop = asyncio.get_running_loop()
+    reader = asyncio.StreamReader(limit=2 ** 24)
+    await loop.connect_read_pipe(lambda: asyncio.StreamReaderProtocol(reader), sys.stdin)
+
+    tasks = set()
+    await dispatcher.emit_startup(bot=bot)
+    sys.stdout.buffer.write(READY_LINE)
+    sys.stdout.flush()
+    logging.info(f"Воркер {settings.BOT_WORKER_INDEX} из {settings.BOT_WORKERS} запущен")
+    try:
+        while line := await reader.readline():
+            task = asyncio.create_task(_process_update(dispatcher, bot, json.loads(line)))
+            tasks.add(task)
+            task.add_done_callback(tasks.discard)
+        # stdin закрыт: главный процесс останавливается, дорабатываем принятые обновления
+        if tasks:
+            await asyncio.wait(tasks)
+    finally:
+        await dispatcher.emit_shutdown(bot=bot)
+        await bot.session.close()
+
+
+# ------------------- endregion Процесс-воркер -------------------
+
+
+if __name__ == "__main__":
+    try:
+        asyncio.run(run_front())
+    except KeyboardInterrupt:
+        pass